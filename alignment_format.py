@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🗂️ バイナリアライメント形式（.aln）
+*_alignment.json と同じ内容を列指向のバイナリで保存し、mmap でそのまま参照します。
+
+ファイル構成（リトルエンディアン、各セクションは8バイト境界）:
+    ヘッダー     magic "AMVCALN1", version, flags, 件数, audio_duration, 各セクションの (offset, size)
+    starts       float64[n]（開始時刻、なしは NaN）
+    ends         float64[n]（終了時刻、なしは NaN）
+    confidence   float64[n]（flags に HAS_CONFIDENCE がある場合のみ、なしは NaN）
+    case_codes   uint8[n]（case テーブルの番号）
+    text_offsets uint64[n + 1]（text_blob 内の word の位置）
+    text_blob    UTF-8
+    case_table   UTF-8（case 名を改行区切り）
+
+読み込み時は配列をコピーせずビューとして返すため、件数に関係なく開くのは一瞬で、
+i 番目のエントリへのアクセスは O(1) です。JSON との相互変換は値を失いません。
+
+    python alignment_format.py song_alignment.json        # → song_alignment.aln
+    python alignment_format.py song_alignment.aln         # → song_alignment.json
+
+GitHub: https://github.com/yusuke10151985/amvc
+"""
+
+import os
+import mmap
+import json
+import struct
+import numpy as np
+from typing import Dict, Iterator, List, Optional, Sequence
+
+MAGIC = b"AMVCALN1"
+VERSION = 1
+ALIGNMENT_EXTENSION = ".aln"
+
+HAS_CONFIDENCE = 0x1
+
+SECTIONS = ["starts", "ends", "confidence", "case_codes", "text_offsets", "text_blob", "case_table"]
+_HEADER = struct.Struct("<8sIIQd" + "QQ" * len(SECTIONS))
+_ALIGN = 8
+
+
+def _padding(size: int) -> int:
+    return (-size) % _ALIGN
+
+
+def write_alignment_arrays(path: str,
+                           starts: Sequence[float],
+                           ends: Sequence[float],
+                           words: Sequence[str],
+                           audio_duration: float,
+                           confidence: Optional[Sequence[float]] = None,
+                           cases: Optional[Sequence[str]] = None) -> str:
+    """配列からバイナリアライメントを書き込み（一時ファイルに書いてからアトミックに配置）"""
+    count = len(words)
+    starts = np.asarray(starts, dtype='<f8')
+    ends = np.asarray(ends, dtype='<f8')
+    if len(starts) != count or len(ends) != count:
+        raise ValueError("starts, ends and words must have the same length")
+
+    case_index: Dict[str, int] = {}
+    if cases is None:
+        case_index["success"] = 0
+        case_codes = np.zeros(count, dtype=np.uint8)
+    else:
+        codes = [case_index.setdefault(case, len(case_index)) for case in cases]
+        if len(case_index) > 256:
+            raise ValueError("Too many distinct alignment cases (max 256)")
+        case_codes = np.array(codes, dtype=np.uint8)
+    case_names = list(case_index)
+
+    encoded = [word.encode('utf-8') for word in words]
+    text_offsets = np.zeros(count + 1, dtype='<u8')
+    np.cumsum([len(word) for word in encoded], out=text_offsets[1:])
+
+    sections = {
+        "starts": starts.tobytes(),
+        "ends": ends.tobytes(),
+        "confidence": np.asarray(confidence, dtype='<f8').tobytes() if confidence is not None else b"",
+        "case_codes": case_codes.tobytes(),
+        "text_offsets": text_offsets.tobytes(),
+        "text_blob": b"".join(encoded),
+        "case_table": "\n".join(case_names).encode('utf-8'),
+    }
+
+    layout = []
+    position = _HEADER.size + _padding(_HEADER.size)
+    for name in SECTIONS:
+        layout += [position, len(sections[name])]
+        position += len(sections[name]) + _padding(len(sections[name]))
+
+    flags = HAS_CONFIDENCE if confidence is not None else 0
+    staging = f"{path}.tmp"
+    with open(staging, 'wb') as f:
+        f.write(_HEADER.pack(MAGIC, VERSION, flags, count, float(audio_duration), *layout))
+        f.write(b"\0" * _padding(_HEADER.size))
+        for name in SECTIONS:
+            f.write(sections[name])
+            f.write(b"\0" * _padding(len(sections[name])))
+    os.replace(staging, path)
+    return path
+
+
+def _optional_float(entry: Dict, key: str) -> float:
+    value = entry.get(key)
+    return float("nan") if value is None else value
+
+
+def write_alignment_binary(path: str, alignment: Dict) -> str:
+    """JSON スキーマ（{"words": [...], "audio_duration": ...}）の辞書をバイナリで書き込み"""
+    words = alignment.get("words", [])
+    has_confidence = any("confidence" in entry for entry in words)
+    return write_alignment_arrays(
+        path,
+        [_optional_float(entry, "start") for entry in words],
+        [_optional_float(entry, "end") for entry in words],
+        [entry.get("word", "") for entry in words],
+        alignment.get("audio_duration", 0),
+        confidence=[_optional_float(entry, "confidence") for entry in words] if has_confidence else None,
+        cases=[entry.get("case", "success") for entry in words],
+    )
+
+
+class AlignmentFile:
+    """mmap したバイナリアライメント（starts / ends / confidence はコピーなしの NumPy ビュー）"""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        header = _HEADER.unpack_from(self._mmap, 0)
+        magic, version, self.flags, self.count, self.audio_duration = header[:5]
+        if magic != MAGIC:
+            raise ValueError(f"Not an alignment file: {path}")
+        if version > VERSION:
+            raise ValueError(f"Unsupported alignment file version: {version}")
+        self._sections = {name: (header[5 + 2 * i], header[6 + 2 * i]) for i, name in enumerate(SECTIONS)}
+
+        self.starts = self._array("starts", '<f8')
+        self.ends = self._array("ends", '<f8')
+        self.confidence = self._array("confidence", '<f8') if self.flags & HAS_CONFIDENCE else None
+        self.case_codes = self._array("case_codes", np.uint8)
+        self.text_offsets = self._array("text_offsets", '<u8')
+        self.cases = self._bytes("case_table").decode('utf-8').split("\n") if self.count else []
+
+    def _array(self, name: str, dtype) -> np.ndarray:
+        offset, size = self._sections[name]
+        return np.frombuffer(self._mmap, dtype=dtype, count=size // np.dtype(dtype).itemsize, offset=offset)
+
+    def _bytes(self, name: str) -> bytes:
+        offset, size = self._sections[name]
+        return self._mmap[offset:offset + size]
+
+    def __len__(self) -> int:
+        return self.count
+
+    def word(self, i: int) -> str:
+        blob_offset = self._sections["text_blob"][0]
+        start, end = int(self.text_offsets[i]), int(self.text_offsets[i + 1])
+        return self._mmap[blob_offset + start:blob_offset + end].decode('utf-8')
+
+    @property
+    def words(self) -> List[str]:
+        blob = self._bytes("text_blob")
+        offsets = self.text_offsets.tolist()
+        return [blob[offsets[i]:offsets[i + 1]].decode('utf-8') for i in range(self.count)]
+
+    def entry(self, i: int) -> Dict:
+        """i 番目のエントリを JSON スキーマの辞書で取得（NaN のフィールドは省略）"""
+        if i < 0:
+            i += self.count
+        if not 0 <= i < self.count:
+            raise IndexError(i)
+        entry = {"case": self.cases[self.case_codes[i]]}
+        for key, values in (("start", self.starts), ("end", self.ends)):
+            value = float(values[i])
+            if value == value:
+                entry[key] = value
+        entry["word"] = self.word(i)
+        if self.confidence is not None and self.confidence[i] == self.confidence[i]:
+            entry["confidence"] = float(self.confidence[i])
+        return entry
+
+    def __getitem__(self, i: int) -> Dict:
+        return self.entry(i)
+
+    def __iter__(self) -> Iterator[Dict]:
+        for i in range(self.count):
+            yield self.entry(i)
+
+    def to_dict(self) -> Dict:
+        """JSON スキーマの辞書に変換"""
+        return {"words": list(self), "audio_duration": self.audio_duration}
+
+    def close(self):
+        # NumPy ビューが残っていると mmap を閉じられないため、先に参照を外す
+        self.starts = self.ends = self.confidence = self.case_codes = self.text_offsets = None
+        self._mmap.close()
+
+    def __enter__(self) -> "AlignmentFile":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def read_alignment(path: str) -> Dict:
+    """.aln または .json のアライメントを JSON スキーマの辞書で読み込み"""
+    if path.endswith(ALIGNMENT_EXTENSION):
+        with AlignmentFile(path) as alignment:
+            return alignment.to_dict()
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def json_to_binary(json_path: str, binary_path: Optional[str] = None) -> str:
+    """*_alignment.json を .aln に変換"""
+    binary_path = binary_path or os.path.splitext(json_path)[0] + ALIGNMENT_EXTENSION
+    with open(json_path, 'r', encoding='utf-8') as f:
+        return write_alignment_binary(binary_path, json.load(f))
+
+
+def binary_to_json(binary_path: str, json_path: Optional[str] = None) -> str:
+    """.aln を *_alignment.json に変換"""
+    json_path = json_path or os.path.splitext(binary_path)[0] + ".json"
+    with open(json_path, 'w', encoding='utf-8') as f:
+        json.dump(read_alignment(binary_path), f, ensure_ascii=False, indent=2)
+    return json_path
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) not in (2, 3):
+        print("使い方: python alignment_format.py <input.json|input.aln> [output]")
+        sys.exit(1)
+    source = sys.argv[1]
+    target = sys.argv[2] if len(sys.argv) == 3 else None
+    converted = binary_to_json(source, target) if source.endswith(ALIGNMENT_EXTENSION) else json_to_binary(source, target)
+    print(f"✅ 変換完了: {converted}")
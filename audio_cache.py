@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🔊 エンコード済み音声トラックのキャッシュ
+元のWAVを一度だけAACにエンコードし、内容ハッシュで再利用します。
+以降のレンダリングではストリームコピーで映像と結合するため、音声のエンコードコストはかかりません。
+
+GitHub: https://github.com/yusuke10151985/amvc
+"""
+
+import os
+import tempfile
+from pathlib import Path
+from typing import Optional
+
+from content_hash import file_content_hash
+from ffmpeg_utils import run_ffmpeg
+from pipeline_metrics import stage_timer, increment
+
+AUDIO_CACHE_ENV = "AMVC_AUDIO_CACHE"
+DEFAULT_AUDIO_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "amvc", "audio")
+AAC_BITRATE = "192k"
+
+# PCM（WAVの中身）をそのまま格納できるコンテナ - 再エンコードなしで音声をパススルー
+PCM_PASSTHROUGH_CONTAINERS = {".mov", ".mkv"}
+
+
+def get_audio_cache_dir(cache_dir: Optional[str] = None) -> str:
+    """キャッシュディレクトリ（引数 > 環境変数 > ~/.cache/amvc/audio）"""
+    cache_dir = cache_dir or os.environ.get(AUDIO_CACHE_ENV) or DEFAULT_AUDIO_CACHE_DIR
+    os.makedirs(cache_dir, exist_ok=True)
+    return cache_dir
+
+
+def get_encoded_audio(wav_file: str, cache_dir: Optional[str] = None, bitrate: str = AAC_BITRATE) -> str:
+    """
+    WAVをAACにエンコード（内容ハッシュでキャッシュ）
+
+    Returns:
+        キャッシュ済み .m4a ファイルのパス
+    """
+    cache_dir = get_audio_cache_dir(cache_dir)
+    cached_file = os.path.join(cache_dir, f"{file_content_hash(wav_file)}_aac_{bitrate}.m4a")
+
+    if os.path.exists(cached_file):
+        increment("amvc_audio_cache_total", result="hit")
+        print(f"♻️ エンコード済み音声を再利用: {os.path.basename(cached_file)}")
+        return cached_file
+
+    increment("amvc_audio_cache_total", result="miss")
+    print(f"🔊 音声をAACにエンコード中: {os.path.basename(wav_file)}")
+    # 同時実行でも壊れたファイルが見えないよう、一時ファイルに書いてからアトミックに配置
+    fd, staging = tempfile.mkstemp(prefix=".encoding_", suffix=".m4a", dir=cache_dir)
+    os.close(fd)
+    try:
+        with stage_timer("audio_encode"):
+            run_ffmpeg(["-i", wav_file, "-vn", "-c:a", "aac", "-b:a", bitrate, staging])
+        os.replace(staging, cached_file)
+    finally:
+        if os.path.exists(staging):
+            os.remove(staging)
+    return cached_file
+
+
+def prepare_audio_track(wav_file: str, output_file: str, cache_dir: Optional[str] = None) -> str:
+    """出力コンテナに合わせた音声トラック（PCMパススルー可能ならWAVそのもの）"""
+    if Path(output_file).suffix.lower() in PCM_PASSTHROUGH_CONTAINERS and Path(wav_file).suffix.lower() == ".wav":
+        return wav_file
+    return get_encoded_audio(wav_file, cache_dir)
+
+
+def mux_audio(video_file: str, audio_track: str, output_file: str) -> str:
+    """映像と音声をストリームコピーで結合（再エンコードなし）"""
+    args = [
+        "-i", video_file,
+        "-i", audio_track,
+        "-map", "0:v:0",
+        "-map", "1:a:0",
+        "-c", "copy",
+        "-shortest",
+    ]
+    if Path(output_file).suffix.lower() in (".mp4", ".mov", ".m4v"):
+        args += ["-movflags", "+faststart"]
+    run_ffmpeg(args + [output_file])
+    return output_file
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🎚️ オーディオリアクティブ背景
+レンダリング前に、動画の各フレーム時刻の帯域エネルギーを1回の STFT でまとめて計算し（WAV はメモリマップ・チャンク処理）、
+描画時はフレーム番号で表を引いて、使い回すバッファに NumPy で塗るだけにします。
+
+背景の種類:
+    gradient  従来の正弦波グラデーション（音声に反応しない）
+    pulse     グラデーションの明るさ・色味が音量と低音/高音のバランスに反応
+    spectrum  帯域ごとのスペクトラムバー
+
+    python audio_visualizer.py song.wav --render-mode proxy   # 背景ごとの1フレームあたりの描画時間を計測
+
+GitHub: https://github.com/yusuke10151985/amvc
+"""
+
+import numpy as np
+from typing import Callable, Dict
+
+from beat_analysis import WavMemmap
+from pipeline_metrics import stage_timer
+
+BACKGROUNDS = ("gradient", "pulse", "spectrum")
+DEFAULT_BACKGROUND = "gradient"
+
+N_FFT = 2048
+BAND_COUNT = 32
+MIN_FREQUENCY = 40.0
+MAX_FREQUENCY = 16000.0
+CHUNK_FRAMES = 1024           # 1回に STFT する動画フレーム数
+NORMALIZE_PERCENTILE = 95     # 帯域ごとにこのパーセンタイルを 1.0 とする
+RELEASE_SECONDS = 0.25        # バーが下がる速さ（エネルギーが 1/e になるまでの秒数）
+
+BAR_FILL_RATIO = 0.8          # バーの最大の高さ（画面の高さに対する割合）
+BAR_GAP_RATIO = 0.2           # バーの間隔（バー幅に対する割合）
+
+
+class AudioFeatures:
+    """動画フレームごとの音声特徴量（bands: float32[frames][bands]、level: float32[frames]、値は 0〜1）"""
+
+    def __init__(self, bands: np.ndarray, level: np.ndarray, fps: float):
+        self.bands = bands
+        self.level = level
+        self.fps = fps
+
+    def __len__(self) -> int:
+        return len(self.level)
+
+    def index(self, t: float) -> int:
+        return min(len(self.level) - 1, max(0, int(t * self.fps)))
+
+
+def _band_edges(sample_rate: int, n_fft: int, band_count: int) -> np.ndarray:
+    """対数間隔の帯域境界（FFT ビン番号、重複しない単調増加）"""
+    top = min(MAX_FREQUENCY, sample_rate / 2)
+    frequencies = np.geomspace(MIN_FREQUENCY, top, band_count + 1)
+    edges = np.round(frequencies * n_fft / sample_rate).astype(np.int64)
+    # 低域でビンが重ならないよう、各帯域に最低 1 ビンずつ確保（狭義単調増加にする）
+    steps = np.arange(len(edges))
+    edges = np.maximum.accumulate(np.maximum(edges, 1) - steps) + steps
+    if edges[-1] > n_fft // 2 + 1:
+        raise ValueError(f"Too many bands for n_fft={n_fft}: {band_count}")
+    return edges
+
+
+def _release(values: np.ndarray, decay: float) -> np.ndarray:
+    """立ち上がりはそのまま、下がるときは指数減衰（バーのちらつきを抑える）"""
+    smoothed = np.empty_like(values)
+    current = np.zeros(values.shape[1:], dtype=values.dtype)
+    for i, frame in enumerate(values):
+        current = np.maximum(frame, current * decay)
+        smoothed[i] = current
+    return smoothed
+
+
+def compute_audio_features(wav_file: str, fps: float, band_count: int = BAND_COUNT,
+                           n_fft: int = N_FFT) -> AudioFeatures:
+    """動画フレーム時刻ごとの帯域エネルギーと音量を計算"""
+    with stage_timer("audio_features"):
+        wav = WavMemmap(wav_file)
+        frame_count = max(1, int(np.ceil(wav.duration * fps)))
+        edges = _band_edges(wav.sample_rate, n_fft, band_count)
+        window = np.hanning(n_fft).astype(np.float32)
+        # 各動画フレームの時刻を窓の中心にする
+        centers = np.round(np.arange(frame_count) * wav.sample_rate / fps).astype(np.int64)
+
+        bands = np.empty((frame_count, band_count), dtype=np.float32)
+        level = np.empty(frame_count, dtype=np.float32)
+        for first in range(0, frame_count, CHUNK_FRAMES):
+            chunk_centers = centers[first:first + CHUNK_FRAMES]
+            start = max(0, int(chunk_centers[0]) - n_fft // 2)
+            stop = min(wav.frames, int(chunk_centers[-1]) + n_fft // 2)
+            samples = wav.mono(start, stop)
+            # 範囲外（先頭・末尾）は無音で埋める
+            offset = n_fft // 2 - (int(chunk_centers[0]) - start)
+            padded = np.zeros(offset + len(samples) + n_fft, dtype=np.float32)
+            padded[offset:offset + len(samples)] = samples
+            frames = np.lib.stride_tricks.sliding_window_view(padded, n_fft)[chunk_centers - chunk_centers[0]]
+
+            magnitude = np.abs(np.fft.rfft(frames * window, axis=1))
+            bands[first:first + len(chunk_centers)] = (
+                np.add.reduceat(magnitude[:, :edges[-1]], edges[:-1], axis=1) / np.diff(edges)
+            )
+            level[first:first + len(chunk_centers)] = np.sqrt(np.mean(frames ** 2, axis=1))
+
+        bands = np.log1p(bands)
+        bands /= np.maximum(np.percentile(bands, NORMALIZE_PERCENTILE, axis=0), 1e-6)
+        level /= max(float(np.percentile(level, NORMALIZE_PERCENTILE)), 1e-6)
+
+        decay = float(np.exp(-1.0 / (RELEASE_SECONDS * fps)))
+        bands = _release(np.clip(bands, 0, 1), decay)
+        level = _release(np.clip(level, 0, 1)[:, None], decay)[:, 0]
+        return AudioFeatures(bands, level, fps)
+
+
+def gradient_background(width: int, height: int) -> Callable:
+    """従来の正弦波グラデーション（R = 128 + 127 sin(2πt/4), G = 100, B = 255 - R）"""
+    frame = np.empty((height, width, 3), dtype=np.uint8)
+
+    def make_frame(t):
+        color_value = int(128 + 127 * np.sin(2 * np.pi * t / 4))
+        frame[:] = (color_value, 100, 255 - color_value)
+        return frame
+
+    return make_frame
+
+
+def pulse_background(features: AudioFeatures, width: int, height: int) -> Callable:
+    """グラデーションの明るさを音量、赤/青のバランスを低音/高音の比で変化"""
+    frame = np.empty((height, width, 3), dtype=np.uint8)
+    half = features.bands.shape[1] // 2
+    low = features.bands[:, :half].mean(axis=1)
+    high = features.bands[:, half:].mean(axis=1)
+    balance = low / np.maximum(low + high, 1e-6)
+    brightness = 0.35 + 0.65 * features.level
+
+    # フレームごとの色を事前に計算しておき、描画時は表を引くだけ
+    phase = np.sin(2 * np.pi * np.arange(len(features)) / features.fps / 4)
+    red = np.clip(128 + 127 * (0.5 * phase + (balance - 0.5)), 0, 255)
+    colors = np.stack([red, np.full_like(red, 100), 255 - red], axis=1) * brightness[:, None]
+    colors = np.clip(colors, 0, 255).astype(np.uint8)
+
+    def make_frame(t):
+        frame[:] = colors[features.index(t)]
+        return frame
+
+    return make_frame
+
+
+def spectrum_background(features: AudioFeatures, width: int, height: int) -> Callable:
+    """帯域ごとのスペクトラムバー（下端から伸びる、背景は音量に反応する単色）"""
+    band_count = features.bands.shape[1]
+    frame = np.empty((height, width, 3), dtype=np.uint8)
+
+    # 帯域ごとのバーの列範囲（右端 BAR_GAP_RATIO は隙間）
+    slot = width / band_count
+    spans = [(int(round(b * slot)), int(round(b * slot + slot * (1 - BAR_GAP_RATIO)))) for b in range(band_count)]
+
+    # 点灯したバーの色（下から上へ青 → マゼンタ）と背景色
+    vertical = np.linspace(0, 1, height, dtype=np.float32)[:, None, None]
+    lit = np.empty((height, width, 3), dtype=np.uint8)
+    lit[:] = (np.array([80, 60, 200], dtype=np.float32) + vertical * np.array([175, 0, 55], dtype=np.float32))
+    base = np.clip(np.stack([20 + 40 * features.level, 10 + 20 * features.level, 40 + 60 * features.level], axis=1),
+                   0, 255).astype(np.uint8)
+
+    # フレームごとのバーの上端の行を事前に計算
+    tops = height - (features.bands * (height * BAR_FILL_RATIO)).astype(np.int32)
+
+    def make_frame(t):
+        index = features.index(t)
+        frame[:] = base[index]
+        # 点灯部分だけを事前に塗ったバー画像からコピー（コピー量はバーの面積だけ）
+        for (left, right), top in zip(spans, tops[index]):
+            frame[top:, left:right] = lit[top:, left:right]
+        return frame
+
+    return make_frame
+
+
+def make_background(background: str, wav_file: str, width: int, height: int, fps: float) -> Callable:
+    """背景の make_frame(t) を作成（音声に反応する背景はここで特徴量を計算）"""
+    if background not in BACKGROUNDS:
+        raise ValueError(f"Unknown background: {background} (choose from {', '.join(BACKGROUNDS)})")
+    if background == "gradient":
+        return gradient_background(width, height)
+    features = compute_audio_features(wav_file, fps)
+    if background == "pulse":
+        return pulse_background(features, width, height)
+    return spectrum_background(features, width, height)
+
+
+def benchmark_backgrounds(wav_file: str, render_mode: str = "full", frames: int = 200) -> Dict[str, float]:
+    """背景ごとの1フレームあたりの描画時間（ミリ秒、特徴量の計算時間は含まない）"""
+    import time
+    from render_settings import get_render_mode
+
+    mode = get_render_mode(render_mode)
+    results = {}
+    for background in BACKGROUNDS:
+        make_frame = make_background(background, wav_file, mode["width"], mode["height"], mode["fps"])
+        start = time.perf_counter()
+        for i in range(frames):
+            make_frame(i / mode["fps"])
+        results[background] = (time.perf_counter() - start) / frames * 1000
+    return results
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="オーディオリアクティブ背景の描画時間を計測")
+    parser.add_argument("wav_file")
+    parser.add_argument("--render-mode", default="full")
+    parser.add_argument("--frames", type=int, default=200)
+    args = parser.parse_args()
+
+    from render_settings import get_render_mode
+    mode = get_render_mode(args.render_mode)
+    start = time.perf_counter()
+    compute_audio_features(args.wav_file, mode["fps"])
+    print(f"🎚️ 特徴量の計算: {time.perf_counter() - start:.2f}秒")
+    for background, milliseconds in benchmark_backgrounds(args.wav_file, args.render_mode, args.frames).items():
+        print(f"   {background}: {milliseconds:.2f}ms/フレーム")
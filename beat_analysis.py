@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🥁 ビート・テンポ解析モジュール
+WAV をメモリマップしてチャンク単位で STFT（ストライド配列）→ スペクトルフラックス（オンセット強度）を求め、
+自己相関でテンポ、櫛形フィルターで拍の位相を推定します。長い曲でもメモリ使用量はチャンク分だけです。
+
+シーンの切り替えを小節の頭に揃え、合計が音声の長さと厳密に一致するシーン長を作れます:
+    python beat_analysis.py song.wav --scenes 8
+
+GitHub: https://github.com/yusuke10151985/amvc
+"""
+
+import struct
+import numpy as np
+from typing import Dict, List, Optional, Sequence
+
+from pipeline_metrics import stage_timer
+
+N_FFT = 2048
+HOP_SECONDS = 0.0116          # 44.1kHz で hop 512 相当
+CHUNK_FRAMES = 4096           # 1回に STFT するフレーム数
+MIN_BPM = 60
+MAX_BPM = 180
+PREFERRED_BPM = 120           # テンポ候補の重み付けの中心（倍テンポ・半テンポの取り違えを抑える）
+BEATS_PER_BAR = 4
+MAX_SNAP_FRACTION = 0.25      # 小節頭に寄せる最大距離（均等分割のシーン長に対する割合、半小節も上限）
+MIN_SCENE_FRACTION = 0.5      # 最短のシーン長（均等分割のシーン長に対する割合）
+
+_WAVE_FORMAT_PCM = 1
+_WAVE_FORMAT_IEEE_FLOAT = 3
+_WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+
+class WavMemmap:
+    """WAV のサンプルデータをメモリマップで参照（ヘッダーを直接解析、8/16/24/32bit PCM と float に対応）"""
+
+    def __init__(self, path: str):
+        with open(path, 'rb') as f:
+            riff, _, wave_id = struct.unpack("<4sI4s", f.read(12))
+            if riff not in (b"RIFF", b"RF64") or wave_id != b"WAVE":
+                raise ValueError(f"Not a WAV file: {path}")
+            fmt = None
+            while True:
+                header = f.read(8)
+                if len(header) < 8:
+                    raise ValueError(f"WAV data chunk not found: {path}")
+                chunk_id, size = struct.unpack("<4sI", header)
+                if chunk_id == b"fmt ":
+                    fmt = f.read(size)
+                elif chunk_id == b"data":
+                    data_offset = f.tell()
+                    data_size = size
+                    break
+                else:
+                    f.seek(size + (size & 1), 1)
+            file_size = f.seek(0, 2)
+
+        if fmt is None:
+            raise ValueError(f"WAV fmt chunk not found: {path}")
+        format_tag, self.channels, self.sample_rate = struct.unpack("<HHI", fmt[:8])
+        bits = struct.unpack("<H", fmt[14:16])[0]
+        if format_tag == _WAVE_FORMAT_EXTENSIBLE:
+            format_tag = struct.unpack("<H", fmt[24:26])[0]
+
+        # RF64 やストリーミング書き込みで data のサイズが不正な場合はファイル末尾まで
+        data_size = min(data_size, file_size - data_offset) if data_size else file_size - data_offset
+        self.sample_width = bits // 8
+        self.frames = data_size // (self.sample_width * self.channels)
+        self._float = format_tag == _WAVE_FORMAT_IEEE_FLOAT
+
+        if self.sample_width == 3:
+            dtype = np.uint8
+            shape = (self.frames, self.channels * 3)
+        else:
+            dtype = {(1, False): np.uint8, (2, False): '<i2', (4, False): '<i4',
+                     (4, True): '<f4', (8, True): '<f8'}[(self.sample_width, self._float)]
+            shape = (self.frames, self.channels)
+        self.data = np.memmap(path, dtype=dtype, mode='r', offset=data_offset, shape=shape)
+
+    @property
+    def duration(self) -> float:
+        return self.frames / self.sample_rate
+
+    def samples(self, start: int, stop: int) -> np.ndarray:
+        """[start, stop) のサンプルを float32（-1〜1）の (フレーム, チャンネル) 配列で取得"""
+        block = self.data[start:stop]
+        if self.sample_width == 3:
+            raw = block.reshape(len(block), self.channels, 3).astype(np.int32)
+            samples = (raw[..., 0] | (raw[..., 1] << 8) | (raw[..., 2] << 16))
+            samples = np.where(samples >= 1 << 23, samples - (1 << 24), samples) / float(1 << 23)
+        elif self._float:
+            samples = block
+        elif self.sample_width == 1:
+            samples = (block.astype(np.float32) - 128) / 128
+        else:
+            samples = block / float(1 << (8 * self.sample_width - 1))
+        return np.asarray(samples, dtype=np.float32)
+
+    def mono(self, start: int, stop: int) -> np.ndarray:
+        """[start, stop) のサンプルをモノラル float32 で取得"""
+        return self.samples(start, stop).mean(axis=1)
+
+
+def onset_envelope(wav: WavMemmap, n_fft: int = N_FFT, hop_seconds: float = HOP_SECONDS,
+                   chunk_frames: int = CHUNK_FRAMES):
+    """
+    オンセット強度（対数振幅スペクトルの正の差分の合計）をチャンクごとに計算
+
+    Returns:
+        (envelope, frame_rate) - envelope[i] は窓の開始が i / frame_rate のフレームのオンセット強度
+    """
+    hop = max(1, int(round(hop_seconds * wav.sample_rate)))
+    window = np.hanning(n_fft).astype(np.float32)
+    total_frames = max(0, (wav.frames - n_fft) // hop + 1)
+    envelope = np.zeros(total_frames, dtype=np.float32)
+    previous = None
+
+    for first in range(0, total_frames, chunk_frames):
+        last = min(total_frames, first + chunk_frames)
+        samples = wav.mono(first * hop, (last - 1) * hop + n_fft)
+        # コピーなしでフレーム行列を作成（ストライド配列）
+        frames = np.lib.stride_tricks.as_strided(
+            samples, shape=(last - first, n_fft), strides=(samples.strides[0] * hop, samples.strides[0])
+        )
+        spectrum = np.log1p(100 * np.abs(np.fft.rfft(frames * window, axis=1)))
+        if previous is None:
+            previous = spectrum[:1]
+        flux = np.diff(np.concatenate([previous, spectrum]), axis=0)
+        envelope[first:last] = np.maximum(flux, 0).sum(axis=1)
+        previous = spectrum[-1:]
+
+    return envelope, wav.sample_rate / hop
+
+
+def estimate_tempo(envelope: np.ndarray, frame_rate: float,
+                   min_bpm: float = MIN_BPM, max_bpm: float = MAX_BPM) -> Optional[float]:
+    """オンセット強度の自己相関（FFT）からビート周期（フレーム数）を推定"""
+    if len(envelope) < 4:
+        return None
+    centered = envelope - envelope.mean()
+    size = 1 << int(np.ceil(np.log2(2 * len(centered))))
+    spectrum = np.fft.rfft(centered, size)
+    autocorrelation = np.fft.irfft(spectrum * np.conj(spectrum), size)[:len(centered)]
+
+    min_lag = max(1, int(frame_rate * 60 / max_bpm))
+    max_lag = min(len(autocorrelation) - 2, int(frame_rate * 60 / min_bpm))
+    if max_lag <= min_lag:
+        return None
+
+    lags = np.arange(min_lag, max_lag + 1)
+    bpm = 60 * frame_rate / lags
+    weight = np.exp(-0.5 * (np.log2(bpm / PREFERRED_BPM)) ** 2)
+    scores = autocorrelation[lags] * weight
+    best = int(np.argmax(scores))
+    if scores[best] <= 0:
+        return None
+
+    # 放物線補間で小数フレームの周期に
+    lag = float(lags[best])
+    if 0 < best < len(scores) - 1:
+        left, center, right = scores[best - 1], scores[best], scores[best + 1]
+        denominator = left - 2 * center + right
+        if denominator != 0:
+            lag += 0.5 * (left - right) / denominator
+    return lag
+
+
+def beat_grid(envelope: np.ndarray, frame_rate: float, period: float, duration: float,
+              beats_per_bar: int = BEATS_PER_BAR, latency: float = 0.0) -> Dict:
+    """
+    拍の位相（オンセット強度の櫛形和が最大になるオフセット）と小節頭を推定
+
+    Args:
+        latency: フレーム開始から窓の中心までの秒数（拍の時刻に加算）
+    """
+    count = int(len(envelope) / period)
+    positions = np.arange(count) * period
+    offsets = np.arange(int(np.ceil(period)))
+    # (オフセット, 拍) の位置のオンセット強度をまとめて補間
+    strength = np.interp(offsets[:, None] + positions[None, :], np.arange(len(envelope)), envelope)
+    best_offset = int(np.argmax(strength.sum(axis=1)))
+
+    beat_frames = best_offset + positions
+    beats = beat_frames / frame_rate + latency
+    beats = beats[beats < duration]
+
+    # 小節頭: 拍 k, k+4, k+8... の強度の合計が最大になる k
+    beat_strength = strength[best_offset, :len(beats)]
+    downbeat = int(np.argmax([beat_strength[k::beats_per_bar].sum() for k in range(beats_per_bar)])) \
+        if len(beats) >= beats_per_bar else 0
+
+    return {
+        "bpm": 60 * frame_rate / period,
+        "beats": beats,
+        "downbeats": beats[downbeat::beats_per_bar],
+    }
+
+
+def analyze_beats(wav_file: str, beats_per_bar: int = BEATS_PER_BAR) -> Dict:
+    """WAV のテンポ・拍・小節頭（秒）を解析"""
+    with stage_timer("beat_analysis"):
+        wav = WavMemmap(wav_file)
+        envelope, frame_rate = onset_envelope(wav)
+        period = estimate_tempo(envelope, frame_rate)
+        if period is None:
+            return {"bpm": None, "beats": np.zeros(0), "downbeats": np.zeros(0), "duration": wav.duration}
+        grid = beat_grid(envelope, frame_rate, period, wav.duration, beats_per_bar,
+                         latency=N_FFT / 2 / wav.sample_rate)
+        grid["duration"] = wav.duration
+        return grid
+
+
+def snap_scene_durations(duration: float, scene_count: int, boundaries: np.ndarray) -> List[float]:
+    """
+    均等分割の境界を近くの小節頭に寄せたシーン長（合計は duration と厳密に一致）
+
+    寄せるのは境界から半小節以内（かつシーン長の MAX_SNAP_FRACTION 以内）の小節頭だけで、
+    近くに小節頭がない・シーンが MIN_SCENE_FRACTION より短くなる場合は均等分割の境界を使います。
+    """
+    if scene_count <= 0:
+        return []
+    scene_length = duration / scene_count
+    targets = np.arange(1, scene_count) * scene_length
+    candidates = np.asarray(boundaries, dtype=np.float64)
+    candidates = candidates[(candidates > 0) & (candidates < duration)]
+
+    max_shift = scene_length * MAX_SNAP_FRACTION
+    if len(candidates) > 1:
+        max_shift = min(max_shift, float(np.median(np.diff(candidates))) / 2)
+    min_scene = scene_length * MIN_SCENE_FRACTION
+
+    cuts = []
+    for target in targets:
+        lower = cuts[-1] if cuts else 0.0
+        cut = float(target)
+        if len(candidates):
+            nearest = float(candidates[np.argmin(np.abs(candidates - target))])
+            if abs(nearest - target) <= max_shift and nearest - lower >= min_scene:
+                cut = nearest
+        cuts.append(cut)
+
+    edges = np.concatenate([[0.0], cuts, [duration]])
+    durations = np.diff(edges).tolist()
+    # 浮動小数点の誤差を最後のシーンで吸収
+    durations[-1] = duration - sum(durations[:-1])
+    return durations
+
+
+def absorb_failed_scenes(scene_durations: Sequence[float], kept: Sequence[int],
+                         boundaries: Sequence[float] = ()) -> List[float]:
+    """
+    生成に失敗したシーンの時間を前後の残ったシーンに割り当てたシーン長（kept の順、合計は元の合計と一致）
+
+    残ったシーンは元の区間をそのまま含み（生成済みのクリップとずれない）、失敗したシーンの区間だけを前後で分け合います。
+    分け目はその区間の中央に最も近い小節頭（区間内になければ中央）です。先頭・末尾の失敗は隣のシーンが引き受けます。
+    """
+    kept = sorted(kept)
+    if not kept:
+        return []
+    edges = np.concatenate([[0.0], np.cumsum(np.asarray(scene_durations, dtype=np.float64))])
+    duration = float(edges[-1])
+    candidates = np.asarray(boundaries, dtype=np.float64)
+
+    starts = [float(edges[k]) for k in kept]
+    ends = [float(edges[k + 1]) for k in kept]
+    starts[0], ends[-1] = 0.0, duration
+    for j in range(len(kept) - 1):
+        gap_start, gap_end = ends[j], starts[j + 1]
+        if gap_end <= gap_start:
+            continue
+        cut = (gap_start + gap_end) / 2
+        inside = candidates[(candidates > gap_start) & (candidates < gap_end)]
+        if len(inside):
+            cut = float(inside[np.argmin(np.abs(inside - cut))])
+        ends[j] = starts[j + 1] = cut
+
+    durations = [end - start for start, end in zip(starts, ends)]
+    # 浮動小数点の誤差を最後のシーンで吸収
+    durations[-1] = duration - sum(durations[:-1])
+    return durations
+
+
+def beat_scene_durations(wav_file: str, scene_count: int, duration: Optional[float] = None) -> List[float]:
+    """
+    シーンの切り替えを小節頭に揃えたシーン長（秒）
+
+    Args:
+        duration: 音声の長さ（省略時は WAV から取得）- 解析できない場合はこの長さを均等分割
+    """
+    try:
+        analysis = analyze_beats(wav_file)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"⚠️ ビート解析エラー（均等分割します）: {e}")
+        if duration is None:
+            raise
+        return snap_scene_durations(duration, scene_count, np.zeros(0))
+
+    if analysis["bpm"]:
+        print(f"🥁 テンポ: {analysis['bpm']:.1f} BPM / 小節 {len(analysis['downbeats'])} 個")
+    else:
+        print("🥁 テンポを検出できなかったため均等分割します")
+    return snap_scene_durations(duration if duration is not None else analysis["duration"],
+                                scene_count, analysis["downbeats"])
+
+
+def beat_absorb_failed_scenes(wav_file: str, scene_durations: Sequence[float], kept: Sequence[int]) -> List[float]:
+    """absorb_failed_scenes の分け目を小節頭に揃える版（解析できない場合は区間の中央で分ける）"""
+    try:
+        downbeats = analyze_beats(wav_file)["downbeats"]
+    except (OSError, ValueError, KeyError) as e:
+        print(f"⚠️ ビート解析エラー（区間の中央で分けます）: {e}")
+        downbeats = np.zeros(0)
+    return absorb_failed_scenes(scene_durations, kept, downbeats)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="ビート解析と小節に揃えたシーン長")
+    parser.add_argument("wav_file")
+    parser.add_argument("--scenes", type=int, default=4)
+    args = parser.parse_args()
+
+    result = analyze_beats(args.wav_file)
+    print(f"BPM: {result['bpm']}")
+    print(f"拍: {len(result['beats'])} / 小節: {len(result['downbeats'])}")
+    durations = snap_scene_durations(result["duration"], args.scenes, result["downbeats"])
+    print("シーン長: " + ", ".join(f"{d:.3f}" for d in durations) + f" (合計 {sum(durations):.3f} / {result['duration']:.3f}秒)")
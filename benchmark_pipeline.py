@@ -0,0 +1,348 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+⏱️ パイプライン ベンチマーク
+アライメント・レンダリングの各ステージについて、入力規模ごとの処理時間・fps・ピークRSSを計測します。
+
+使い方:
+    python benchmark_pipeline.py --suite quick
+    python benchmark_pipeline.py --suite standard --baseline benchmarks/baseline.json
+    python benchmark_pipeline.py --suite quick --save-baseline benchmarks/baseline.json
+    python benchmark_pipeline.py --transcription-benchmark song.wav song_ground_truth.json --backends whisper faster-whisper
+
+GitHub: https://github.com/yusuke10151985/amvc
+"""
+
+import os
+import sys
+import json
+import re
+import math
+import time
+import wave
+import difflib
+import shutil
+import platform
+import tempfile
+import importlib.util
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional
+
+from memory_guard import PeakRssSampler
+from audio_cache import AUDIO_CACHE_ENV
+from transcription_cache import TRANSCRIPTION_CACHE_ENV
+
+# (音声の長さ[秒], 歌詞行数)
+BENCHMARK_SUITES = {
+    "quick": [(6, 6), (30, 12)],
+    "standard": [(6, 6), (30, 12), (120, 40), (600, 200)],
+    "full": [(6, 6), (30, 12), (120, 40), (600, 200), (1800, 600), (1800, 2000)],
+}
+
+STAGES = ["simple_align", "whisper_align", "add_subtitles", "generate_video", "combine_runway"]
+
+# この割合を超えて遅くなった場合に回帰として報告
+DEFAULT_TOLERANCE = 1.2
+
+DEFAULT_WORK_DIR = "./benchmarks/work"
+DEFAULT_RESULTS_FILE = "./benchmarks/results.json"
+
+
+def measure(fn: Callable, frames: Optional[int] = None) -> Dict:
+    """関数を1回実行して時間・fps・ピークRSSを計測"""
+    error = None
+    with PeakRssSampler() as sampler:
+        start = time.perf_counter()
+        try:
+            result = fn()
+            if result is None or result == (None, None):
+                error = "stage returned no output"
+        except Exception as e:
+            error = str(e)
+        elapsed = time.perf_counter() - start
+    return {
+        "elapsed": elapsed,
+        "fps": frames / elapsed if frames and elapsed > 0 else None,
+        "peak_rss_mb": sampler.peak_mb,
+        "error": error,
+    }
+
+
+@contextmanager
+def cold_caches():
+    """文字起こし・AAC 音声のキャッシュを空の一時ディレクトリに向ける（計測ごとにキャッシュなしの状態から実行）"""
+    cache_root = tempfile.mkdtemp(prefix="amvc_bench_cache_")
+    saved = {name: os.environ.get(name) for name in (TRANSCRIPTION_CACHE_ENV, AUDIO_CACHE_ENV)}
+    os.environ[TRANSCRIPTION_CACHE_ENV] = os.path.join(cache_root, "transcriptions")
+    os.environ[AUDIO_CACHE_ENV] = os.path.join(cache_root, "audio")
+    try:
+        yield cache_root
+    finally:
+        for name, value in saved.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+        shutil.rmtree(cache_root, ignore_errors=True)
+
+
+def _make_scene_clips(work_dir: str, duration: float, scene_count: int) -> List[str]:
+    """combine_runway_videos 用の合成シーン映像（ffmpeg testsrc2）"""
+    from ffmpeg_utils import run_ffmpeg
+
+    scene_duration = duration / scene_count
+    paths = []
+    for i in range(scene_count):
+        path = os.path.join(work_dir, f"bench_scene_{duration:g}s_{i:02d}.mp4")
+        if not os.path.exists(path):
+            run_ffmpeg([
+                "-f", "lavfi", "-i", f"testsrc2=size=1280x720:rate=24:duration={scene_duration:.3f}",
+                "-c:v", "libx264", "-preset", "ultrafast", "-pix_fmt", "yuv420p", path
+            ])
+        paths.append(path)
+    return paths
+
+
+def run_benchmarks(suite: str = "quick",
+                   stages: Optional[List[str]] = None,
+                   work_dir: str = DEFAULT_WORK_DIR,
+                   render_mode: str = "full") -> Dict:
+    """ベンチマークを実行して結果を返す（各ステージはキャッシュなしの状態から計測 - cold_caches）"""
+    import moviepy.editor as mp
+    import music_video_pipeline as pipeline
+    import runway_api_integration as runway
+    from render_settings import get_render_mode
+    from sample_data import create_sample_audio, create_sample_lyrics
+
+    stages = stages or STAGES
+    mode = get_render_mode(render_mode)
+    fps = mode["fps"]
+    os.makedirs(work_dir, exist_ok=True)
+
+    if "whisper_align" in stages and importlib.util.find_spec("whisper") is None:
+        print("⚠️ whisper がインストールされていないため whisper_align をスキップします")
+        stages = [stage for stage in stages if stage != "whisper_align"]
+
+    results = []
+    for duration, line_count in BENCHMARK_SUITES[suite]:
+        print(f"\n⏱️ ケース: {duration}秒 / {line_count}行")
+        wav_file = os.path.join(work_dir, f"bench_{duration}s.wav")
+        lyrics_file = os.path.join(work_dir, f"bench_{line_count}lines.txt")
+        if not os.path.exists(wav_file):
+            create_sample_audio(wav_file, duration=duration)
+        create_sample_lyrics(lyrics_file, line_count=line_count)
+
+        align_dir = os.path.join(work_dir, "align")
+        srt_file, _ = pipeline.simple_align_subtitles(wav_file, lyrics_file, align_dir)
+        frames = int(math.ceil(duration * fps))
+
+        def add_subtitles():
+            background = mp.ColorClip(size=(mode["width"], mode["height"]), color=(0, 0, 0), duration=duration)
+            return pipeline.add_subtitles_to_video(background, srt_file, render_mode)
+
+        def combine_runway():
+            scene_paths = _make_scene_clips(work_dir, duration, min(12, max(1, int(duration // 10))))
+            return runway.combine_runway_videos(scene_paths, duration, render_mode,
+                                                output_dir=os.path.join(work_dir, "runway"))
+
+        stage_functions = {
+            "simple_align": (lambda: pipeline.simple_align_subtitles(wav_file, lyrics_file, align_dir), None),
+            "whisper_align": (lambda: pipeline.advanced_align_with_whisper(wav_file, lyrics_file, align_dir), None),
+            "add_subtitles": (add_subtitles, None),
+            "generate_video": (lambda: pipeline.generate_video(wav_file, srt_file, os.path.join(work_dir, "render"),
+                                                               render_mode=render_mode), frames),
+            "combine_runway": (combine_runway, frames),
+        }
+
+        for stage in stages:
+            fn, stage_frames = stage_functions[stage]
+            # 同じ入力を使い回すので、前の計測のキャッシュに当たらないようにする
+            with cold_caches():
+                measurement = measure(fn, stage_frames)
+            measurement.update({"stage": stage, "duration": duration, "lines": line_count})
+            results.append(measurement)
+            fps_text = f"{measurement['fps']:.1f} fps" if measurement["fps"] else "-"
+            status = f"❌ {measurement['error']}" if measurement["error"] else "✅"
+            print(f"   {status} {stage}: {measurement['elapsed']:.2f}秒, {fps_text}, "
+                  f"ピークRSS {measurement['peak_rss_mb']:.0f} MB")
+
+    return {
+        "suite": suite,
+        "render_mode": render_mode,
+        "machine": platform.node(),
+        "python": platform.python_version(),
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "results": results,
+    }
+
+
+def _normalize_text(text: str) -> str:
+    return re.sub(r"[^\w']+", " ", text.lower()).strip()
+
+
+def alignment_error(hypothesis: List[Dict], ground_truth: List[Dict]) -> Dict:
+    """
+    認識結果と正解タイミングの誤差
+
+    テキストを正規化して difflib で対応付け、一致したエントリの開始・終了時刻の差（秒）を集計します。
+    """
+    matcher = difflib.SequenceMatcher(
+        a=[_normalize_text(entry["word"]) for entry in hypothesis],
+        b=[_normalize_text(entry["word"]) for entry in ground_truth],
+        autojunk=False,
+    )
+    start_errors, end_errors = [], []
+    for block in matcher.get_matching_blocks():
+        for k in range(block.size):
+            hyp, truth = hypothesis[block.a + k], ground_truth[block.b + k]
+            start_errors.append(abs(hyp["start"] - truth["start"]))
+            end_errors.append(abs(hyp["end"] - truth["end"]))
+
+    return {
+        "matched": len(start_errors),
+        "match_ratio": len(start_errors) / len(ground_truth) if ground_truth else None,
+        "mean_start_error": sum(start_errors) / len(start_errors) if start_errors else None,
+        "mean_end_error": sum(end_errors) / len(end_errors) if end_errors else None,
+        "max_start_error": max(start_errors) if start_errors else None,
+    }
+
+
+def compare_transcription_backends(wav_file: str, ground_truth_file: str, backends: Optional[List[str]] = None,
+                                   model_name: str = "base") -> Dict:
+    """
+    音声認識バックエンドの実時間係数（RTF = 認識時間 / 音声の長さ）とアライメント誤差を比較
+
+    正解ファイルはアライメントJSON形式（sample_data.create_synthetic_song の *_ground_truth.json など）。
+    各エントリが1単語なら単語タイミング、複数単語の行ならセグメントタイミングと比較します。
+    """
+    from alignment_format import read_alignment
+    from transcription_backends import TRANSCRIPTION_BACKENDS, get_transcription_backend
+
+    backends = backends or list(TRANSCRIPTION_BACKENDS)
+    with wave.open(wav_file, 'rb') as wav:
+        audio_duration = wav.getnframes() / wav.getframerate()
+
+    ground_truth = [entry for entry in read_alignment(ground_truth_file)["words"] if "start" in entry and "end" in entry]
+    word_level = all(len(entry["word"].split()) <= 1 for entry in ground_truth)
+
+    results = []
+    for name in backends:
+        backend = get_transcription_backend(name, model_name)
+        record = {"backend": name, "model": model_name, "audio_duration": audio_duration}
+        try:
+            start = time.perf_counter()
+            backend.load()
+            record["load_seconds"] = time.perf_counter() - start
+
+            with PeakRssSampler() as sampler:
+                start = time.perf_counter()
+                result = backend.transcribe(wav_file, word_timestamps=True)
+                record["transcribe_seconds"] = time.perf_counter() - start
+            record["rtf"] = record["transcribe_seconds"] / audio_duration if audio_duration else None
+            record["peak_rss_mb"] = sampler.peak_mb
+
+            if word_level:
+                hypothesis = [word for segment in result["segments"] for word in segment.get("words", [])]
+            else:
+                hypothesis = [{"word": segment["text"], "start": segment["start"], "end": segment["end"]}
+                              for segment in result["segments"]]
+            record.update(alignment_error(hypothesis, ground_truth))
+            error_text = f"{record['mean_start_error']:.3f}秒" if record["mean_start_error"] is not None else "-"
+            print(f"   ✅ {name}: RTF {record['rtf']:.3f}, 一致 {record['matched']}/{len(ground_truth)}, "
+                  f"平均開始誤差 {error_text}")
+        except Exception as e:
+            record["error"] = str(e)
+            print(f"   ❌ {name}: {e}")
+        results.append(record)
+
+    return {
+        "wav_file": wav_file,
+        "ground_truth": ground_truth_file,
+        "level": "word" if word_level else "segment",
+        "machine": platform.node(),
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "results": results,
+    }
+
+
+def _result_key(result: Dict) -> str:
+    return f"{result['stage']}@{result['duration']}s/{result['lines']}lines"
+
+
+def compare_with_baseline(report: Dict, baseline: Dict, tolerance: float = DEFAULT_TOLERANCE) -> List[Dict]:
+    """ベースラインと比較し、時間またはピークRSSが tolerance 倍を超えたものを返す"""
+    baseline_results = {_result_key(r): r for r in baseline.get("results", []) if not r.get("error")}
+    regressions = []
+
+    for result in report["results"]:
+        previous = baseline_results.get(_result_key(result))
+        if not previous or result.get("error"):
+            continue
+        for metric in ("elapsed", "peak_rss_mb"):
+            if previous[metric] and result[metric] > previous[metric] * tolerance:
+                regressions.append({
+                    "case": _result_key(result),
+                    "metric": metric,
+                    "baseline": previous[metric],
+                    "current": result[metric],
+                    "ratio": result[metric] / previous[metric],
+                })
+    return regressions
+
+
+def save_report(report: Dict, path: str) -> str:
+    """結果をJSONで保存"""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    return path
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="アライメント・レンダリングのベンチマーク")
+    parser.add_argument("--suite", choices=list(BENCHMARK_SUITES), default="quick")
+    parser.add_argument("--stages", nargs="+", choices=STAGES, help="計測するステージ（省略時は全て）")
+    parser.add_argument("--render-mode", default="full", help="full または proxy")
+    parser.add_argument("--work-dir", default=DEFAULT_WORK_DIR)
+    parser.add_argument("--output", default=DEFAULT_RESULTS_FILE, help="結果JSONの保存先")
+    parser.add_argument("--baseline", help="比較するベースラインJSON")
+    parser.add_argument("--save-baseline", help="今回の結果をベースラインとして保存")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument("--transcription-benchmark", nargs=2, metavar=("WAV", "GROUND_TRUTH"),
+                        help="音声認識バックエンドの RTF と誤差を比較")
+    parser.add_argument("--backends", nargs="+", help="比較するバックエンド（省略時は全て）")
+    parser.add_argument("--model", default="base", help="音声認識モデル")
+    args = parser.parse_args(argv)
+
+    if args.transcription_benchmark:
+        wav_file, ground_truth_file = args.transcription_benchmark
+        print(f"🗣️ 音声認識バックエンド比較: {wav_file}")
+        report = compare_transcription_backends(wav_file, ground_truth_file, args.backends, args.model)
+        print(f"\n💾 結果を保存: {save_report(report, args.output)}")
+        return 0
+
+    report = run_benchmarks(args.suite, args.stages, args.work_dir, args.render_mode)
+    print(f"\n💾 結果を保存: {save_report(report, args.output)}")
+
+    if args.save_baseline:
+        print(f"📌 ベースラインを保存: {save_report(report, args.save_baseline)}")
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare_with_baseline(report, baseline, args.tolerance)
+        if regressions:
+            print(f"\n❌ {len(regressions)} 件の性能回帰:")
+            for regression in regressions:
+                print(f"   • {regression['case']} {regression['metric']}: "
+                      f"{regression['baseline']:.2f} → {regression['current']:.2f} (x{regression['ratio']:.2f})")
+            return 1
+        print("\n✅ ベースラインからの性能回帰はありません")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+📐 シーンクリップの正規化
+Runway などで生成したクリップを ffprobe で調べ、出力の形式（コーデック・解像度・fps・画素形式）と異なるクリップ、
+シーン長より短いクリップだけを ffmpeg で変換します。変換は並列に実行し、1 クリップにつき ffmpeg を 1 プロセス使います。
+
+- シーン長より長いクリップ（Runway には切り上げた秒数で依頼する）は変換せず、結合時の outpoint で余りを切ります
+- concat demuxer のストリームコピーでは最初のクリップの SPS/PPS（H.264 のパラメーターセット）が全体に使われるため、
+  変換したクリップの H.264 パラメーターが変換しないクリップと異なる場合は、混在させずに残りのクリップも変換します
+
+    python clip_normalizer.py scene_00.mp4 scene_01.mp4 --render-mode proxy    # 変換が必要なクリップと理由を表示
+
+GitHub: https://github.com/yusuke10151985/amvc
+"""
+
+import os
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from fractions import Fraction
+from typing import Dict, List, Optional, Sequence
+
+from render_settings import get_render_mode
+from encoding_profiles import ffmpeg_encode_args, resolve_encoding_profile
+from ffmpeg_utils import probe_video, run_ffmpeg
+from pipeline_metrics import stage_timer, increment
+
+CONFORM_WORKERS_ENV = "AMVC_CONFORM_WORKERS"
+TARGET_CODEC = "h264"
+TARGET_PIX_FMT = "yuv420p"
+DEFAULT_TIMESCALE = 90000
+MAX_SLOWDOWN = 1.25           # これ以上引き伸ばす必要がある短いクリップはスローにせずループで埋める
+
+
+def target_spec(render_mode: str, infos: Sequence[Dict]) -> Dict:
+    """
+    揃える形式（解像度・fps はレンダリングモードから）
+
+    タイムスケールと H.264 のパラメーター（プロファイル・レベル・B フレーム・SPS/PPS）は、形式が合っているクリップで
+    最も多い組み合わせに合わせます（Runway のクリップは通常すべて同じなので、変換なしで結合できる）。
+    """
+    mode = get_render_mode(render_mode)
+    spec = {
+        "codec": TARGET_CODEC,
+        "width": mode["width"],
+        "height": mode["height"],
+        "fps": Fraction(mode["fps"]).limit_denominator(1001),
+        "pix_fmt": TARGET_PIX_FMT,
+        "timescale": DEFAULT_TIMESCALE,
+        "stream_params": None,
+    }
+    candidates = Counter((info["timescale"], _stream_params(info)) for info in infos
+                         if not mismatch_reasons(info, spec, ignore_stream=True))
+    if candidates:
+        spec["timescale"], spec["stream_params"] = candidates.most_common(1)[0][0]
+    return spec
+
+
+def _stream_params(info: Dict) -> tuple:
+    """ストリームコピーで結合するために一致が必要な H.264 のパラメーター"""
+    return info["profile"], info["level"], info["has_b_frames"], info["extradata_hash"]
+
+
+def mismatch_reasons(info: Dict, spec: Dict, duration: Optional[float] = None,
+                     ignore_stream: bool = False) -> List[str]:
+    """
+    クリップを変換する必要がある理由（空ならそのまま結合できる）
+
+    Args:
+        duration: シーン長 - 半フレーム以上短いクリップは変換で引き伸ばす（長い分は結合時に outpoint で切る）
+        ignore_stream: タイムスケールと H.264 のパラメーターを比較しない（target_spec 用）
+    """
+    reasons = []
+    if info["codec"] != spec["codec"]:
+        reasons.append(f"codec {info['codec']}")
+    if (info["width"], info["height"]) != (spec["width"], spec["height"]):
+        reasons.append(f"{info['width']}x{info['height']}")
+    if info["fps"] != spec["fps"]:
+        reasons.append(f"{float(info['fps']):.3f}fps")
+    if info["pix_fmt"] != spec["pix_fmt"]:
+        reasons.append(info["pix_fmt"] or "pix_fmt ?")
+    if info["sar"] not in ("1:1", "0:1", None):
+        reasons.append(f"SAR {info['sar']}")
+    if not ignore_stream and info["timescale"] != spec["timescale"]:
+        reasons.append(f"timescale {info['timescale']}")
+    if not ignore_stream and _stream_params(info) != spec["stream_params"]:
+        profile, level, b_frames, _ = _stream_params(info)
+        reasons.append(f"H.264 パラメーター（{profile} / level {level} / B {b_frames}）")
+    if duration is not None and info["duration"] + 0.5 / float(spec["fps"]) < duration:
+        reasons.append(f"{info['duration']:.2f}秒 < {duration:.2f}秒")
+    return reasons
+
+
+def conform_clip(source: str, destination: str, info: Dict, spec: Dict, duration: Optional[float],
+                 profile: str, threads: int) -> str:
+    """
+    クリップを形式に合わせて再エンコード
+
+    短いクリップはわずかにスローにしてシーン長に合わせます。MAX_SLOWDOWN を超える場合
+    （失敗したシーンの時間を引き受けたクリップなど）はスローにせず、クリップをループして埋めます。
+    """
+    width, height = spec["width"], spec["height"]
+    filters = [
+        f"scale={width}:{height}:force_original_aspect_ratio=decrease",
+        f"pad={width}:{height}:(ow-iw)/2:(oh-ih)/2",
+        "setsar=1",
+    ]
+    loop = duration is not None and 0 < info["duration"] and duration / info["duration"] > MAX_SLOWDOWN
+    if duration is not None and 0 < info["duration"] < duration and not loop:
+        filters.append(f"setpts=PTS*{duration / info['duration']:.6f}")
+    filters += [f"fps={spec['fps']}", f"format={spec['pix_fmt']}"]
+
+    args = (["-stream_loop", "-1"] if loop else []) + ["-i", source, "-an", "-vf", ",".join(filters)]
+    if duration is not None:
+        args += ["-t", f"{duration:.6f}"]
+    args += ffmpeg_encode_args(profile) + ["-threads", str(threads),
+                                           "-video_track_timescale", str(spec["timescale"])]
+
+    staging = f"{destination}.part.mp4"
+    run_ffmpeg(args + [staging])
+    os.replace(staging, destination)
+    return destination
+
+
+def _conform_all(video_paths: Sequence[str], indices: Sequence[int], infos: Sequence[Dict], spec: Dict,
+                 durations: Sequence[Optional[float]], profile: str, output_dir: str,
+                 workers: Optional[int]) -> Dict[int, str]:
+    """指定したクリップを並列に変換（{インデックス: 変換後のパス}）"""
+    # ffmpeg 1 プロセスごとにスレッドを割り当て、合計が CPU 数を超えないようにする
+    cpu_count = os.cpu_count() or 1
+    workers = workers or int(os.environ.get(CONFORM_WORKERS_ENV, 0)) or max(1, min(len(indices), cpu_count // 2))
+    threads = max(1, cpu_count // workers)
+
+    os.makedirs(output_dir, exist_ok=True)
+    with stage_timer("clip_conform"), ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            i: pool.submit(conform_clip, video_paths[i], os.path.join(output_dir, f"conformed_{i:03d}.mp4"),
+                           infos[i], spec, durations[i], profile, threads)
+            for i in indices
+        }
+        return {i: future.result() for i, future in futures.items()}
+
+
+def normalize_clips(video_paths: Sequence[str], scene_durations: Optional[Sequence[float]] = None,
+                    render_mode: str = "full", encoding_profile: Optional[str] = None,
+                    output_dir: str = "./outputs", workers: Optional[int] = None) -> List[str]:
+    """
+    全クリップを調べ、形式が異なる・シーン長より短いクリップだけを並列に変換
+
+    変換したクリップの H.264 パラメーター（SPS/PPS など）が変換しないクリップと異なる場合は、
+    ストリームコピーで混ぜると壊れるため、残りのクリップも同じ設定で変換します。
+
+    Returns:
+        結合に使うクリップのパス（変換不要なものは元のパス - シーン長より長い場合は結合時に outpoint で切る）
+    """
+    profile = resolve_encoding_profile(render_mode, encoding_profile)
+    durations = list(scene_durations) if scene_durations is not None else [None] * len(video_paths)
+
+    with stage_timer("clip_probe"), ThreadPoolExecutor(max_workers=min(8, len(video_paths)) or 1) as pool:
+        infos = list(pool.map(probe_video, video_paths))
+
+    spec = target_spec(render_mode, infos)
+    pending = []
+    for i, (path, info, duration) in enumerate(zip(video_paths, infos, durations)):
+        reasons = mismatch_reasons(info, spec, duration)
+        if reasons:
+            print(f"📐 シーン {i + 1} を変換: {', '.join(reasons)}")
+            pending.append(i)
+
+    normalized = list(video_paths)
+    if not pending:
+        increment("amvc_clips_passthrough_total", len(video_paths))
+        print(f"✅ {len(video_paths)} 個のクリップはすべて同じ形式です（変換なし）")
+        return normalized
+
+    conformed = _conform_all(video_paths, pending, infos, spec, durations, profile, output_dir, workers)
+    passthrough = [i for i in range(len(video_paths)) if i not in conformed]
+    if passthrough and spec["stream_params"] is not None:
+        sample = probe_video(conformed[pending[0]])
+        if (sample["timescale"], _stream_params(sample)) != (spec["timescale"], spec["stream_params"]):
+            print(f"📐 H.264 のパラメーターを揃えるため、残り {len(passthrough)} 個のクリップも変換します")
+            conformed.update(_conform_all(video_paths, passthrough, infos, spec, durations, profile, output_dir,
+                                          workers))
+    for i, path in conformed.items():
+        normalized[i] = path
+
+    increment("amvc_clips_conformed_total", len(conformed))
+    increment("amvc_clips_passthrough_total", len(video_paths) - len(conformed))
+    print(f"✅ {len(conformed)}/{len(video_paths)} 個のクリップを変換しました")
+    return normalized
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="シーンクリップの形式を確認")
+    parser.add_argument("video_files", nargs="+")
+    parser.add_argument("--render-mode", default="full")
+    args = parser.parse_args()
+
+    infos = [probe_video(path) for path in args.video_files]
+    spec = target_spec(args.render_mode, infos)
+    print(f"🎯 {spec['width']}x{spec['height']} {float(spec['fps']):.3f}fps {spec['codec']} {spec['pix_fmt']} "
+          f"timescale {spec['timescale']}")
+    for path, info in zip(args.video_files, infos):
+        reasons = mismatch_reasons(info, spec)
+        print(f"   {'📐' if reasons else '✅'} {path}: {', '.join(reasons) or 'そのまま結合可能'}")
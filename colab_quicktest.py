@@ -3,10 +3,28 @@
 print("🚀 AI音楽ビデオジェネレーター - クイックテスト開始")
 print("=" * 60)
 
+import os
+from google.colab import files
+
+# アライメント・字幕プレビュー・動画生成はパイプラインモジュールと共通（Colabスクリプトで取得済みのリポジトリ）
+from music_video_pipeline import simple_align_subtitles, preview_subtitles, generate_video
+from sample_data import create_sample_audio, create_sample_lyrics
+
+
+def download_file(file_path: str):
+    """ファイルダウンロード"""
+    if os.path.exists(file_path):
+        print(f"📥 ダウンロード: {os.path.basename(file_path)}")
+        files.download(file_path)
+
+
 try:
+    sample_audio = create_sample_audio()
+    sample_lyrics = create_sample_lyrics()
+
     # サンプルファイルでアライメント実行
     print("\n1️⃣ アライメント実行中...")
-    test_srt, test_json = align_subtitles(sample_audio, sample_lyrics)
+    test_srt, test_json = simple_align_subtitles(sample_audio, sample_lyrics)
     
     # 字幕プレビュー
     print("\n2️⃣ 字幕プレビュー:")
@@ -33,4 +51,4 @@ try:
     
 except Exception as e:
     print(f"❌ テストエラー: {e}")
-    print("💡 パッケージインストールと関数定義が完了していることを確認してください") 
\ No newline at end of file
+    print("💡 パッケージインストールとリポジトリの取得（セル2）が完了していることを確認してください") 
\ No newline at end of file
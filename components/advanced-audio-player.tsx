@@ -6,18 +6,72 @@ import type { Subtitle } from '../types';
 interface AdvancedAudioPlayerProps {
   audioFile: File | null;
   subtitles: Subtitle[];
+  // バックエンドが作成した波形ピーク（*_waveform.peaks）の URL またはファイル - 指定時は音声をデコードしない
+  peaksSource?: Blob | string | null;
   onTimeUpdate?: (currentTime: number) => void;
   onSubtitleClick?: (subtitle: Subtitle) => void;
 }
 
 interface WaveformData {
-  peaks: number[];
+  min: Float32Array;
+  max: Float32Array;
   duration: number;
 }
 
+const WAVEFORM_RESOLUTION = 1000; // 波形の解像度
+
+// 波形ピークファイルの構成（waveform_peaks.py と同じ）
+const PEAKS_MAGIC = 'AMVCPKS1';
+const PEAKS_HEADER_SIZE = 40;
+const PEAKS_LEVEL_SIZE = 16;
+const PEAKS_MAX_LEVELS = 32;
+
+// 範囲読み込み（URL は Range リクエスト、File / Blob は slice）
+const readRange = async (source: Blob | string, start: number, end: number): Promise<ArrayBuffer> => {
+  if (typeof source !== 'string') {
+    return source.slice(start, end).arrayBuffer();
+  }
+  const response = await fetch(source, { headers: { Range: `bytes=${start}-${end - 1}` } });
+  if (!response.ok) {
+    throw new Error(`波形ピークの取得に失敗しました: ${response.status}`);
+  }
+  const buffer = await response.arrayBuffer();
+  // Range 非対応のサーバーはファイル全体を返す
+  return response.status === 206 ? buffer : buffer.slice(start, end);
+};
+
+// ヘッダーとレベル表を読み、minPeaks 以上のピークを持つ最も粗いレベルだけを読み込む
+const loadPeakLevel = async (source: Blob | string, minPeaks: number): Promise<WaveformData> => {
+  const head = new DataView(await readRange(source, 0, PEAKS_HEADER_SIZE + PEAKS_LEVEL_SIZE * PEAKS_MAX_LEVELS));
+  const magic = new TextDecoder().decode(new Uint8Array(head.buffer, 0, 8));
+  if (magic !== PEAKS_MAGIC) {
+    throw new Error('波形ピークファイルではありません');
+  }
+
+  const levelCount = head.getUint32(12, true);
+  const duration = head.getFloat64(32, true);
+  let selected = { count: 0, offset: 0 };
+  for (let i = 0; i < levelCount; i++) {
+    const base = PEAKS_HEADER_SIZE + PEAKS_LEVEL_SIZE * i;
+    const level = { count: head.getUint32(base + 4, true), offset: Number(head.getBigUint64(base + 8, true)) };
+    // レベル 0 が最も細かい
+    if (i === 0 || level.count >= minPeaks) selected = level;
+  }
+
+  const data = new Int8Array(await readRange(source, selected.offset, selected.offset + selected.count * 2));
+  const min = new Float32Array(selected.count);
+  const max = new Float32Array(selected.count);
+  for (let i = 0; i < selected.count; i++) {
+    min[i] = data[2 * i] / 127;
+    max[i] = data[2 * i + 1] / 127;
+  }
+  return { min, max, duration };
+};
+
 const AdvancedAudioPlayer: React.FC<AdvancedAudioPlayerProps> = ({
   audioFile,
   subtitles,
+  peaksSource,
   onTimeUpdate,
   onSubtitleClick
 }) => {
@@ -60,8 +114,12 @@ const AdvancedAudioPlayer: React.FC<AdvancedAudioPlayerProps> = ({
     audio.addEventListener('timeupdate', handleTimeUpdate);
     audio.addEventListener('ended', handleEnded);
 
-    // 波形データ生成
-    generateWaveform(audioFile);
+    // 波形データ生成（事前計算したピークがあれば必要なレベルだけ読み込む）
+    if (peaksSource) {
+      loadWaveformPeaks(peaksSource, audioFile);
+    } else {
+      generateWaveform(audioFile);
+    }
 
     return () => {
       audio.removeEventListener('loadedmetadata', handleLoadedMetadata);
@@ -69,7 +127,20 @@ const AdvancedAudioPlayer: React.FC<AdvancedAudioPlayerProps> = ({
       audio.removeEventListener('ended', handleEnded);
       URL.revokeObjectURL(audioUrl);
     };
-  }, [audioFile, onTimeUpdate]);
+  }, [audioFile, peaksSource, onTimeUpdate]);
+
+  // 波形ピークファイルから読み込み（失敗時はブラウザでデコード）
+  const loadWaveformPeaks = useCallback(async (source: Blob | string, file: File) => {
+    setIsLoadingWaveform(true);
+
+    try {
+      setWaveformData(await loadPeakLevel(source, WAVEFORM_RESOLUTION));
+      setIsLoadingWaveform(false);
+    } catch (error) {
+      console.warn('波形ピーク読み込みエラー（音声をデコードします）:', error);
+      generateWaveform(file);
+    }
+  }, []);
 
   // 波形データ生成
   const generateWaveform = useCallback(async (file: File) => {
@@ -83,25 +154,24 @@ const AdvancedAudioPlayer: React.FC<AdvancedAudioPlayerProps> = ({
       const audioBuffer = await audioContext.decodeAudioData(arrayBuffer);
       
       const channelData = audioBuffer.getChannelData(0);
-      const samples = 1000; // 波形の解像度
-      const blockSize = Math.floor(channelData.length / samples);
-      const peaks: number[] = [];
+      const blockSize = Math.floor(channelData.length / WAVEFORM_RESOLUTION);
+      const min = new Float32Array(WAVEFORM_RESOLUTION);
+      const max = new Float32Array(WAVEFORM_RESOLUTION);
 
-      for (let i = 0; i < samples; i++) {
+      for (let i = 0; i < WAVEFORM_RESOLUTION; i++) {
         const start = i * blockSize;
         const end = start + blockSize;
-        let max = 0;
         
         for (let j = start; j < end; j++) {
-          const value = Math.abs(channelData[j]);
-          if (value > max) max = value;
+          const value = channelData[j];
+          if (value < min[i]) min[i] = value;
+          if (value > max[i]) max[i] = value;
         }
-        
-        peaks.push(max);
       }
 
       setWaveformData({
-        peaks,
+        min,
+        max,
         duration: audioBuffer.duration
       });
     } catch (error) {
@@ -119,27 +189,27 @@ const AdvancedAudioPlayer: React.FC<AdvancedAudioPlayerProps> = ({
     const ctx = canvas.getContext('2d');
     if (!ctx) return;
 
-    const { peaks } = waveformData;
+    const { min, max } = waveformData;
     const width = canvas.width;
     const height = canvas.height;
-    const barWidth = width / peaks.length;
+    const barWidth = width / max.length;
 
     // キャンバスクリア
     ctx.clearRect(0, 0, width, height);
 
-    // 波形描画
-    peaks.forEach((peak, index) => {
-      const barHeight = peak * height;
+    // 波形描画（min〜max の範囲を縦棒で表示）
+    for (let index = 0; index < max.length; index++) {
       const x = index * barWidth;
-      const y = (height - barHeight) / 2;
+      const y = (1 - max[index]) / 2 * height;
+      const barHeight = Math.max(1, (max[index] - min[index]) / 2 * height);
 
       // 現在の再生位置より前は青、後はグレー
       const progress = currentTime / duration;
-      const isPlayed = index < progress * peaks.length;
+      const isPlayed = index < progress * max.length;
       
       ctx.fillStyle = isPlayed ? '#3b82f6' : '#d1d5db';
-      ctx.fillRect(x, y, barWidth - 1, barHeight);
-    });
+      ctx.fillRect(x, y, Math.max(1, barWidth - 1), barHeight);
+    }
 
     // 字幕位置マーカー
     subtitles.forEach((subtitle) => {
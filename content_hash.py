@@ -0,0 +1,29 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🔑 コンテンツハッシュユーティリティ
+ファイル内容・パラメータからキャッシュキーを作成
+
+GitHub: https://github.com/yusuke10151985/amvc
+"""
+
+import json
+import hashlib
+from typing import Any
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def file_content_hash(path: str) -> str:
+    """ファイル内容のSHA-256（固定サイズのチャンクで読み込み）"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def params_hash(params: Any) -> str:
+    """JSON化可能なパラメータのSHA-256（キー順に依存しない）"""
+    encoded = json.dumps(params, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+⚙️ エンコードプロファイルモジュール
+名前付きエンコード設定（draft / standard / archive）と実機キャリブレーション
+
+使い方:
+    python encoding_profiles.py --calibrate
+
+GitHub: https://github.com/yusuke10151985/amvc
+"""
+
+import os
+import json
+import time
+import platform
+import tempfile
+from typing import Dict, List, Optional
+
+from render_settings import get_render_mode
+
+# 品質の低い順
+PROFILE_ORDER = ["draft", "standard", "archive"]
+
+# libx264 エンコード設定
+# threads: None の場合は ffmpeg の自動設定（全コア）
+ENCODING_PROFILES = {
+    "draft": {
+        "preset": "ultrafast",
+        "crf": 30,
+        "threads": None,
+        "tune": "fastdecode",
+    },
+    "standard": {
+        "preset": "medium",
+        "crf": 23,
+        "threads": None,
+        "tune": None,
+    },
+    "archive": {
+        "preset": "slow",
+        "crf": 18,
+        "threads": None,
+        "tune": "film",
+    },
+}
+
+DEFAULT_CALIBRATION_FILE = "./outputs/encoding_calibration.json"
+
+
+def get_encoding_profile(name: str) -> Dict:
+    """プロファイル名から設定を取得"""
+    if name not in ENCODING_PROFILES:
+        raise ValueError(f"Unknown encoding profile: {name} (choose from {', '.join(PROFILE_ORDER)})")
+    return dict(ENCODING_PROFILES[name], name=name)
+
+
+def write_videofile_kwargs(name: str) -> Dict:
+    """write_videofile に渡す映像エンコード引数を生成"""
+    profile = get_encoding_profile(name)
+    ffmpeg_params = ["-crf", str(profile["crf"])]
+    if profile["tune"]:
+        ffmpeg_params += ["-tune", profile["tune"]]
+    return {
+        "codec": "libx264",
+        "preset": profile["preset"],
+        "threads": profile["threads"],
+        "ffmpeg_params": ffmpeg_params,
+    }
+
+
+def ffmpeg_encode_args(name: str) -> List[str]:
+    """ffmpeg を直接呼び出す場合の映像エンコード引数（write_videofile_kwargs と同じ設定）"""
+    kwargs = write_videofile_kwargs(name)
+    args = ["-c:v", kwargs["codec"], "-preset", kwargs["preset"]] + kwargs["ffmpeg_params"]
+    if kwargs["threads"]:
+        args += ["-threads", str(kwargs["threads"])]
+    return args + ["-pix_fmt", "yuv420p"]
+
+
+def load_calibration(calibration_file: str = DEFAULT_CALIBRATION_FILE) -> Optional[Dict]:
+    """キャリブレーション結果を読み込み"""
+    if not os.path.exists(calibration_file):
+        return None
+    try:
+        with open(calibration_file, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"⚠️ キャリブレーション読み込みエラー: {e}")
+        return None
+
+
+def select_encoding_profile(duration: Optional[float] = None,
+                            target_render_time: Optional[float] = None,
+                            quality: Optional[str] = None,
+                            render_mode: str = "full",
+                            calibration_file: str = DEFAULT_CALIBRATION_FILE) -> str:
+    """
+    目標レンダリング時間または品質からプロファイルを選択
+
+    Args:
+        duration: 動画の長さ（秒）
+        target_render_time: 許容するエンコード時間（秒）
+        quality: プロファイル名を直接指定
+        render_mode: レンダリングモード（キャリブレーション結果の参照先）
+        calibration_file: キャリブレーション結果ファイル
+
+    Returns:
+        プロファイル名（目標時間内に収まる最高品質のもの）
+    """
+    if quality:
+        return get_encoding_profile(quality)["name"]
+
+    default = get_render_mode(render_mode)["encoding_profile"]
+    if target_render_time is None or not duration:
+        return default
+
+    calibration = load_calibration(calibration_file)
+    results = (calibration or {}).get("modes", {}).get(render_mode)
+    if not results:
+        print(f"⚠️ {render_mode} のキャリブレーション結果がありません - {default} を使用します")
+        print("   python encoding_profiles.py --calibrate を実行してください")
+        return default
+
+    fps = get_render_mode(render_mode)["fps"]
+    for name in reversed(PROFILE_ORDER):
+        result = results.get(name)
+        if not result or not result.get("encode_fps"):
+            continue
+        estimated = duration * fps / result["encode_fps"]
+        if estimated <= target_render_time:
+            print(f"⚙️ エンコードプロファイル: {name} (推定 {estimated:.1f}秒 / 目標 {target_render_time:.1f}秒)")
+            return name
+
+    print("⚠️ 目標時間内に収まるプロファイルがありません - draft を使用します")
+    return "draft"
+
+
+def resolve_encoding_profile(render_mode: str = "full",
+                             encoding_profile: Optional[str] = None,
+                             target_render_time: Optional[float] = None,
+                             duration: Optional[float] = None) -> str:
+    """レンダリング関数用: 明示指定 > 目標時間 > モード既定値 の順で決定"""
+    if encoding_profile:
+        return get_encoding_profile(encoding_profile)["name"]
+    return select_encoding_profile(duration=duration,
+                                   target_render_time=target_render_time,
+                                   render_mode=render_mode)
+
+
+def calibrate_encoding_profiles(calibration_file: str = DEFAULT_CALIBRATION_FILE,
+                                duration: float = 6,
+                                render_mode: str = "full") -> Dict:
+    """
+    各プロファイルを実機で計測（エンコード速度とファイルサイズ）
+
+    create_sample_audio の合成音声とグラデーション背景で計測用クリップを作成し、
+    プロファイルごとにエンコード時間を測定します。
+    """
+    import numpy as np
+    import moviepy.editor as mp
+    from sample_data import create_sample_audio
+
+    mode = get_render_mode(render_mode)
+    width, height, fps = mode["width"], mode["height"], mode["fps"]
+    print(f"⏱️ エンコードキャリブレーション開始... ({render_mode}: {width}x{height} @ {fps}fps, {duration}秒)")
+
+    calibration = load_calibration(calibration_file) or {}
+    calibration.update({
+        "machine": platform.node(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+        "calibrated_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    })
+    results = {}
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        wav_file = create_sample_audio(os.path.join(tmp_dir, "calibration.wav"), duration=duration)
+
+        def make_gradient_frame(t):
+            color_value = int(128 + 127 * np.sin(2 * np.pi * t / 4))
+            return np.full((height, width, 3), [color_value, 100, 255-color_value], dtype=np.uint8)
+
+        for name in PROFILE_ORDER:
+            output_file = os.path.join(tmp_dir, f"calibration_{name}.mp4")
+            audio = mp.AudioFileClip(wav_file)
+            clip = mp.VideoClip(make_gradient_frame, duration=audio.duration).set_audio(audio)
+            try:
+                start = time.perf_counter()
+                clip.write_videofile(
+                    output_file,
+                    fps=fps,
+                    audio_codec='aac',
+                    temp_audiofile=os.path.join(tmp_dir, "calibration-audio.m4a"),
+                    remove_temp=True,
+                    verbose=False,
+                    logger=None,
+                    **write_videofile_kwargs(name)
+                )
+                elapsed = time.perf_counter() - start
+            except Exception as e:
+                print(f"❌ {name} 計測エラー: {e}")
+                continue
+            finally:
+                clip.close()
+                audio.close()
+
+            frames = int(round(duration * fps))
+            size = os.path.getsize(output_file)
+            results[name] = {
+                "elapsed": elapsed,
+                "frames": frames,
+                "encode_fps": frames / elapsed if elapsed > 0 else None,
+                "file_size": size,
+                "bytes_per_second": size / duration,
+            }
+            fps_text = f"{results[name]['encode_fps']:.1f} fps" if results[name]["encode_fps"] else "-"
+            print(f"   • {name}: {fps_text}, {size / 1024:.0f} KB")
+
+    calibration.setdefault("modes", {})[render_mode] = results
+
+    os.makedirs(os.path.dirname(calibration_file) or ".", exist_ok=True)
+    with open(calibration_file, 'w', encoding='utf-8') as f:
+        json.dump(calibration, f, ensure_ascii=False, indent=2)
+    print(f"✅ キャリブレーション完了: {calibration_file}")
+    return calibration
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="エンコードプロファイルのキャリブレーション")
+    parser.add_argument("--calibrate", action="store_true", help="各プロファイルを実機で計測")
+    parser.add_argument("--duration", type=float, default=6, help="計測用クリップの長さ（秒）")
+    parser.add_argument("--render-mode", default="full", help="full または proxy")
+    parser.add_argument("--output", default=DEFAULT_CALIBRATION_FILE, help="結果ファイル")
+    args = parser.parse_args()
+
+    if args.calibrate:
+        calibrate_encoding_profiles(args.output, args.duration, args.render_mode)
+    else:
+        for profile_name in PROFILE_ORDER:
+            print(f"{profile_name}: {ENCODING_PROFILES[profile_name]}")
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🎞️ ffmpeg ユーティリティ
+MoviePy と同じ ffmpeg バイナリを直接呼び出すためのヘルパー
+
+GitHub: https://github.com/yusuke10151985/amvc
+"""
+
+import os
+import json
+import shutil
+import tempfile
+import subprocess
+from fractions import Fraction
+from typing import Dict, List, Optional, Sequence
+
+
+def get_ffmpeg_exe() -> str:
+    """MoviePy が使用している ffmpeg バイナリのパス"""
+    try:
+        from moviepy.config import get_setting
+        return get_setting("FFMPEG_BINARY")
+    except Exception:
+        return shutil.which("ffmpeg") or "ffmpeg"
+
+
+def get_ffprobe_exe() -> str:
+    """ffmpeg と同じ場所にある ffprobe（なければ PATH 上の ffprobe）"""
+    ffmpeg = get_ffmpeg_exe()
+    directory, name = os.path.split(ffmpeg)
+    candidate = os.path.join(directory, name.replace("ffmpeg", "ffprobe"))
+    if directory and os.path.exists(candidate):
+        return candidate
+    return shutil.which("ffprobe") or "ffprobe"
+
+
+def probe_video(path: str) -> Dict:
+    """
+    最初の映像ストリームの情報を ffprobe で取得
+
+    Returns:
+        {"codec", "profile", "level", "has_b_frames", "extradata_hash", "width", "height", "fps" (Fraction),
+         "pix_fmt", "sar", "timescale", "duration", "has_audio"}
+
+        extradata_hash は SPS/PPS（avcC）の SHA-256 - ストリームコピーで結合できるのはこれが一致するクリップだけです
+    """
+    command = [get_ffprobe_exe(), "-v", "error", "-show_data_hash", "sha256", "-show_entries",
+               "stream=codec_type,codec_name,profile,level,has_b_frames,extradata_hash,width,height,pix_fmt,"
+               "r_frame_rate,sample_aspect_ratio,time_base:format=duration", "-of", "json", path]
+    result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    if result.returncode != 0:
+        raise RuntimeError(f"ffprobe failed ({result.returncode}): {result.stderr.decode('utf-8', 'replace').strip()}")
+
+    data = json.loads(result.stdout)
+    streams = data.get("streams", [])
+    video = next((stream for stream in streams if stream.get("codec_type") == "video"), None)
+    if video is None:
+        raise RuntimeError(f"No video stream: {path}")
+    time_base = Fraction(video.get("time_base", "1/90000"))
+    return {
+        "codec": video.get("codec_name"),
+        "profile": video.get("profile"),
+        "level": video.get("level"),
+        "has_b_frames": video.get("has_b_frames"),
+        "extradata_hash": video.get("extradata_hash"),
+        "width": video.get("width"),
+        "height": video.get("height"),
+        "fps": Fraction(video.get("r_frame_rate", "0/1")),
+        "pix_fmt": video.get("pix_fmt"),
+        "sar": video.get("sample_aspect_ratio", "1:1"),
+        "timescale": time_base.denominator // max(1, time_base.numerator),
+        "duration": float(data.get("format", {}).get("duration") or 0),
+        "has_audio": any(stream.get("codec_type") == "audio" for stream in streams),
+    }
+
+
+def run_ffmpeg(args: List[str]) -> None:
+    """ffmpeg を実行（失敗時は標準エラー出力付きで RuntimeError）"""
+    command = [get_ffmpeg_exe(), "-y", "-hide_banner", "-loglevel", "error"] + list(args)
+    result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg failed ({result.returncode}): {result.stderr.decode('utf-8', 'replace').strip()}")
+
+
+def read_ffmpeg_output(args: List[str]) -> bytes:
+    """ffmpeg を実行して標準出力（パイプ出力 "-"）を返す"""
+    command = [get_ffmpeg_exe(), "-hide_banner", "-loglevel", "error"] + list(args)
+    result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg failed ({result.returncode}): {result.stderr.decode('utf-8', 'replace').strip()}")
+    return result.stdout
+
+
+def raw_video_input_args(width: int, height: int, fps: float) -> List[str]:
+    """FFmpegPipe で書き込む raw フレーム（uint8 RGB）を入力 0 にする引数"""
+    return ["-f", "rawvideo", "-pix_fmt", "rgb24", "-s", f"{width}x{height}", "-r", str(fps), "-i", "pipe:0"]
+
+
+class FFmpegPipe:
+    """
+    標準入力に raw フレームを書き込む ffmpeg プロセス（with で使用、終了時に完了を待つ）
+
+    標準エラー出力は一時ファイルに逃がすので、パイプが詰まってデッドロックすることはありません。
+    """
+
+    def __init__(self, args: List[str]):
+        command = [get_ffmpeg_exe(), "-y", "-hide_banner", "-loglevel", "error"] + list(args)
+        self._stderr = tempfile.TemporaryFile()
+        self.process = subprocess.Popen(command, stdin=subprocess.PIPE, stderr=self._stderr)
+
+    def write(self, frame) -> None:
+        """1フレームを書き込み（C 連続な配列などバッファプロトコル対応のオブジェクト）"""
+        try:
+            self.process.stdin.write(frame)
+        except BrokenPipeError:
+            # ffmpeg が先に終了した - 終了コードと標準エラー出力で報告
+            self.close()
+            raise RuntimeError("ffmpeg exited before all frames were written")
+
+    def close(self) -> None:
+        if self.process.stdin and not self.process.stdin.closed:
+            try:
+                self.process.stdin.close()
+            except BrokenPipeError:
+                pass
+        returncode = self.process.wait()
+        self._stderr.seek(0)
+        stderr = self._stderr.read().decode('utf-8', 'replace').strip()
+        self._stderr.close()
+        if returncode != 0:
+            raise RuntimeError(f"ffmpeg failed ({returncode}): {stderr}")
+
+    def __enter__(self) -> "FFmpegPipe":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            # 書き込み途中の失敗 - 不完全な出力を作らないよう ffmpeg を止める
+            self.process.kill()
+            self.process.wait()
+            self._stderr.close()
+            return False
+        self.close()
+        return False
+
+
+def concat_videos(video_files: List[str], output_file: str, durations: Optional[Sequence[float]] = None,
+                  video_only: bool = False) -> str:
+    """
+    同じエンコード設定の動画を concat demuxer でストリームコピー結合（再エンコードなし）
+
+    Args:
+        durations: 各ファイルの使用する長さ（秒）- outpoint で打ち切る。ストリームコピーでは outpoint 以降の
+                   パケットを捨てるだけなので、B フレームの並べ替えがあると 1〜2 フレームずれることがあります
+        video_only: 映像ストリームだけを結合（音声の有無が混在するクリップ用）
+    """
+    list_file = f"{output_file}.concat.txt"
+    with open(list_file, 'w', encoding='utf-8') as f:
+        for i, video_file in enumerate(video_files):
+            escaped = os.path.abspath(video_file).replace("'", "'\\''")
+            f.write(f"file '{escaped}'\n")
+            if durations is not None:
+                f.write(f"outpoint {durations[i]:.6f}\n")
+    try:
+        run_ffmpeg(["-f", "concat", "-safe", "0", "-i", list_file]
+                   + (["-map", "0:v:0"] if video_only else []) + ["-c", "copy", output_file])
+    finally:
+        os.remove(list_file)
+    return output_file
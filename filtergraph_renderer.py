@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🧵 ffmpeg フィルターグラフ レンダラー
+generate_video と同じ構成（グラデーション背景 + 字幕 + 音声）を1本の ffmpeg フィルターグラフで描画します。
+フレームは Python を通らず、背景は geq、字幕は SRT から作った ASS を libass で焼き込み、音声はそのままマップします。
+
+使い方:
+    python filtergraph_renderer.py song.wav song_subtitles.srt --render-mode proxy   # moviepy との速度・画質比較
+
+GitHub: https://github.com/yusuke10151985/amvc
+"""
+
+import os
+import json
+import time
+from typing import Dict, Optional
+
+from render_settings import get_render_mode, subtitle_style
+from encoding_profiles import ffmpeg_encode_args
+from subtitle_timeline import SubtitleTimeline
+from audio_cache import get_encoded_audio, prepare_audio_track
+from ffmpeg_utils import run_ffmpeg
+from hls_output import hls_output_args, remux_hls_to_mp4
+from pipeline_metrics import stage_timer
+
+# moviepy 版の make_gradient_frame と同じ式: R = int(128 + 127 sin(2πt/4)), G = 100, B = 255 - R
+GRADIENT_RED = "trunc(128+127*sin(2*PI*T/4))"
+
+# 背景は全画素同じ色なので、小さい画像で式を評価してから拡大する
+GRADIENT_SOURCE_SIZE = 16
+
+DEFAULT_REPORT_FILE = "./outputs/filtergraph_speedup.json"
+
+
+def escape_filter_value(value: str) -> str:
+    """フィルターオプション値のエスケープ（オプション値レベル → フィルターグラフレベルの2段階）"""
+    for char in ("\\", "'", ":"):
+        value = value.replace(char, "\\" + char)
+    for char in ("\\", "'", "[", "]", ",", ";"):
+        value = value.replace(char, "\\" + char)
+    return value
+
+
+def write_ass_subtitles(srt_file: str, ass_file: str, render_mode: str = "full") -> str:
+    """SRT を出力解像度・字幕スタイルに合わせた ASS に変換"""
+    mode = get_render_mode(render_mode)
+    style = subtitle_style(mode)
+    return SubtitleTimeline.read(srt_file).write_ass(
+        ass_file,
+        play_res=(mode["width"], mode["height"]),
+        # moviepy 版と同じく下端に揃える（set_position(('center', 'bottom')) 相当）
+        style={"fontsize": style["fontsize"], "stroke_width": style["stroke_width"], "margin_v": 0},
+    )
+
+
+def build_filtergraph(render_mode: str, ass_file: Optional[str] = None) -> str:
+    """背景生成 → 拡大 → 字幕焼き込み → yuv420p のフィルターグラフ（入力 [0:v]、出力 [v]）"""
+    mode = get_render_mode(render_mode)
+    filters = [
+        "format=rgb24",
+        f"geq=r='{GRADIENT_RED}':g='100':b='255-{GRADIENT_RED}'",
+        f"scale={mode['width']}:{mode['height']}:flags=neighbor",
+    ]
+    if ass_file:
+        filters.append(f"ass=filename={escape_filter_value(os.path.abspath(ass_file))}")
+    filters.append("format=yuv420p")
+    return "[0:v]" + ",".join(filters) + "[v]"
+
+
+def render_filtergraph(wav_file: str, srt_file: Optional[str], output_file: str, duration: float,
+                       render_mode: str, profile: str, workspace, hls_playlist: Optional[str] = None) -> str:
+    """
+    フィルターグラフで動画を1パスで書き出し（映像エンコード + キャッシュ済み音声のストリームコピー）
+
+    Args:
+        workspace: 字幕 ASS を置く JobWorkspace
+        hls_playlist: 指定するとエンコード中はこのプレイリストへ HLS を書き出し、完成後に output_file へリマックス
+    """
+    mode = get_render_mode(render_mode)
+    ass_file = None
+    if srt_file:
+        with stage_timer("subtitle_rasterize"):
+            ass_file = write_ass_subtitles(srt_file, workspace.file("subtitles.ass"), render_mode)
+
+    audio_track = get_encoded_audio(wav_file) if hls_playlist else prepare_audio_track(wav_file, output_file)
+    args = [
+        "-f", "lavfi",
+        "-i", f"color=c=black:s={GRADIENT_SOURCE_SIZE}x{GRADIENT_SOURCE_SIZE}:r={mode['fps']}:d={duration:.3f}",
+        "-i", audio_track,
+        "-filter_complex", build_filtergraph(render_mode, ass_file),
+        "-map", "[v]",
+        "-map", "1:a:0",
+    ] + ffmpeg_encode_args(profile) + ["-c:a", "copy", "-shortest"]
+    if hls_playlist:
+        with stage_timer("encode"):
+            run_ffmpeg(args + hls_output_args(hls_playlist))
+        return remux_hls_to_mp4(hls_playlist, output_file)
+
+    if output_file.lower().endswith((".mp4", ".mov", ".m4v")):
+        args += ["-movflags", "+faststart"]
+    with stage_timer("encode"):
+        run_ffmpeg(args + [output_file])
+    return output_file
+
+
+def measure_psnr(reference_file: str, distorted_file: str) -> Optional[float]:
+    """2つの動画の平均PSNR（dB）- 同じ構成を描画できているかの確認用"""
+    stats_file = f"{distorted_file}.psnr.log"
+    try:
+        run_ffmpeg([
+            "-i", reference_file, "-i", distorted_file,
+            "-lavfi", f"[0:v][1:v]psnr=stats_file={escape_filter_value(os.path.abspath(stats_file))}",
+            "-f", "null", "-"
+        ])
+        values = []
+        with open(stats_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                fields = dict(item.split(":", 1) for item in line.split() if ":" in item)
+                if "psnr_avg" in fields:
+                    values.append(float(fields["psnr_avg"]))
+        return sum(values) / len(values) if values else None
+    except Exception as e:
+        print(f"⚠️ PSNR計測エラー: {e}")
+        return None
+    finally:
+        if os.path.exists(stats_file):
+            os.remove(stats_file)
+
+
+def speedup_report(wav_file: str, srt_file: str, render_mode: str = "full", output_dir: str = "./outputs",
+                   encoding_profile: Optional[str] = None) -> Dict:
+    """moviepy 版とフィルターグラフ版で同じ動画を生成し、処理時間と PSNR を比較"""
+    from music_video_pipeline import generate_video
+
+    results = {}
+    for renderer in ("moviepy", "ffmpeg"):
+        renderer_dir = os.path.join(output_dir, f"renderer_{renderer}")
+        start = time.perf_counter()
+        output_file = generate_video(wav_file, srt_file, renderer_dir, render_mode=render_mode,
+                                     encoding_profile=encoding_profile, renderer=renderer)
+        results[renderer] = {"elapsed": time.perf_counter() - start, "output": output_file}
+
+    moviepy_output, ffmpeg_output = results["moviepy"]["output"], results["ffmpeg"]["output"]
+    report = {
+        "wav_file": wav_file,
+        "render_mode": render_mode,
+        "renderers": results,
+        "speedup": results["moviepy"]["elapsed"] / results["ffmpeg"]["elapsed"] if results["ffmpeg"]["elapsed"] else None,
+        "psnr_db": measure_psnr(moviepy_output, ffmpeg_output) if moviepy_output and ffmpeg_output else None,
+    }
+
+    print(f"\n🧵 moviepy: {results['moviepy']['elapsed']:.2f}秒 / ffmpeg: {results['ffmpeg']['elapsed']:.2f}秒")
+    if report["speedup"]:
+        print(f"   速度比: x{report['speedup']:.1f}")
+    if report["psnr_db"] is not None:
+        # 字幕のフォントレンダリング（ImageMagick / libass）の差があるため完全一致にはなりません
+        print(f"   PSNR: {report['psnr_db']:.1f} dB")
+    return report
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="moviepy とフィルターグラフ レンダラーの比較")
+    parser.add_argument("wav_file")
+    parser.add_argument("srt_file")
+    parser.add_argument("--render-mode", default="full")
+    parser.add_argument("--encoding-profile")
+    parser.add_argument("--output-dir", default="./outputs")
+    parser.add_argument("--report", default=DEFAULT_REPORT_FILE)
+    args = parser.parse_args()
+
+    report = speedup_report(args.wav_file, args.srt_file, args.render_mode, args.output_dir, args.encoding_profile)
+    os.makedirs(os.path.dirname(args.report) or ".", exist_ok=True)
+    with open(args.report, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"💾 レポートを保存: {args.report}")
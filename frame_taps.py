@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🖼️ レンダリング中のフレームタップ
+書き出し中に合成されたフレームを指定時刻で取り出し、サムネイル・コンタクトシート・プレビュー GIF を作成します。
+完成した MP4 を開き直してデコードする必要はありません。
+
+- 取り出す時刻は指定するか、字幕から自動で選択（繰り返される歌詞ブロックの先頭 = サビなど + 等間隔）
+- 取り出したフレームはその場で縮小してコピーするだけなので、書き出しへの影響はほぼありません
+- GIF は ffmpeg の palettegen / paletteuse で最適化したパレットを使います
+
+出力（動画ファイル名が song_final_video.mp4 の場合）:
+    song_final_video_thumb_00.jpg ...   サムネイル
+    song_final_video_contact.jpg        コンタクトシート
+    song_final_video_preview.gif        プレビュー GIF
+
+GitHub: https://github.com/yusuke10151985/amvc
+"""
+
+import os
+import numpy as np
+from collections import Counter
+from typing import Dict, List, Optional, Sequence
+
+from ffmpeg_utils import FFmpegPipe, raw_video_input_args
+from subtitle_timeline import SubtitleTimeline
+from pipeline_metrics import stage_timer
+
+THUMBNAIL_COUNT = 6
+THUMBNAIL_WIDTH = 640
+CONTACT_SHEET_COLUMNS = 3
+JPEG_QUALITY = 3              # ffmpeg の -q:v（2〜31、小さいほど高画質）
+GIF_SECONDS = 3.0
+GIF_FPS = 10
+GIF_WIDTH = 480
+
+
+def chorus_starts(subtitles: SubtitleTimeline) -> List[float]:
+    """繰り返される歌詞ブロックの開始時刻（サビなど - 2回以上出てくる行が続く区間の先頭）"""
+    texts = [" ".join(text.lower().split()) for text in subtitles.texts]
+    counts = Counter(text for text in texts if text)
+    repeated = [bool(text) and counts[text] > 1 for text in texts]
+    return [float(subtitles.starts[i]) for i in range(len(texts)) if repeated[i] and (i == 0 or not repeated[i - 1])]
+
+
+def default_tap_times(srt_file: Optional[str], duration: float, count: int = THUMBNAIL_COUNT) -> List[float]:
+    """サムネイルの時刻（サビの開始を優先し、残りは等間隔）"""
+    times = chorus_starts(SubtitleTimeline.read(srt_file))[:count] if srt_file else []
+    spacing = duration / (count + 1)
+    for k in range(1, count + 1):
+        if len(times) >= count:
+            break
+        candidate = k * spacing
+        # サビの時刻と近すぎる場合は飛ばす
+        if all(abs(candidate - t) > spacing / 2 for t in times):
+            times.append(candidate)
+    return sorted(t for t in times if 0 <= t < duration)
+
+
+def _downscale(frame: np.ndarray, width: int) -> np.ndarray:
+    """整数倍の縮小はブロック平均、それ以外は最近傍（幅・高さは偶数に揃える）"""
+    height, source_width = frame.shape[:2]
+    factor = source_width // width
+    if width >= source_width:
+        small = frame.copy()
+    elif factor >= 2 and source_width % width == 0:
+        rows = height // factor * factor
+        blocks = frame[:rows].reshape(rows // factor, factor, width, factor, 3)
+        small = blocks.mean(axis=(1, 3), dtype=np.float32).astype(np.uint8)
+    else:
+        target_height = max(2, round(height * width / source_width))
+        small = frame[np.linspace(0, height - 1, target_height).astype(np.int64)][
+            :, np.linspace(0, source_width - 1, width).astype(np.int64)]
+    return np.ascontiguousarray(small[:small.shape[0] // 2 * 2, :small.shape[1] // 2 * 2])
+
+
+def _write_images(frames: Sequence[np.ndarray], path: str, fps: Optional[float] = None) -> str:
+    """フレーム（同じ大きさの RGB）を ffmpeg で画像 / GIF に変換（一時ファイルに書いてから置き換え）"""
+    height, width = frames[0].shape[:2]
+    staging = f"{os.path.splitext(path)[0]}.part{os.path.splitext(path)[1]}"
+    args = raw_video_input_args(width, height, fps or 1)
+    if path.lower().endswith(".gif"):
+        args += ["-filter_complex", "[0:v]split[a][b];[a]palettegen=stats_mode=diff[p];[b][p]paletteuse=dither=bayer",
+                 "-loop", "0"]
+    else:
+        args += ["-frames:v", "1", "-q:v", str(JPEG_QUALITY)]
+    with FFmpegPipe(args + [staging]) as pipe:
+        for frame in frames:
+            pipe.write(frame)
+    os.replace(staging, path)
+    return path
+
+
+class FrameTaps:
+    """
+    書き出し中のフレームから指定時刻のフレームを取り出す
+
+        taps = FrameTaps(times, fps, gif_start=...)
+        clip = taps.attach(clip)        # 以降、書き出しで生成されたフレームを取り込む
+        ... write_videofile / iter_frames ...
+        taps.write(output_file)
+    """
+
+    def __init__(self, times: Sequence[float], fps: float, gif_start: Optional[float] = None,
+                 thumbnail_width: int = THUMBNAIL_WIDTH, gif_seconds: float = GIF_SECONDS):
+        self.fps = fps
+        self.thumbnail_width = thumbnail_width
+        self.thumbnail_indices = {int(round(t * fps)) for t in times}
+        self.gif_fps = min(GIF_FPS, fps)
+        self.gif_indices = set()
+        if gif_start is not None:
+            steps = np.arange(int(gif_seconds * self.gif_fps)) / self.gif_fps
+            self.gif_indices = set(np.round((gif_start + steps) * fps).astype(np.int64).tolist())
+        self.thumbnails: Dict[int, np.ndarray] = {}
+        self.gif_frames: Dict[int, np.ndarray] = {}
+
+    def capture(self, frame: np.ndarray, t: float) -> np.ndarray:
+        """フレームが取り出し対象なら縮小コピーを保存（フレームはそのまま返す）"""
+        index = int(round(t * self.fps))
+        if index in self.gif_indices and index not in self.gif_frames:
+            self.gif_frames[index] = _downscale(frame, GIF_WIDTH)
+        if index not in self.thumbnails and index in self.thumbnail_indices:
+            self.thumbnails[index] = _downscale(frame, self.thumbnail_width)
+        return frame
+
+    def attach(self, clip, offset: float = 0.0):
+        """クリップのフレーム生成に割り込む（offset: クリップの先頭の動画内の時刻 - チャンク書き出し用）"""
+        return clip.fl(lambda get_frame, t: self.capture(get_frame(t), t + offset), keep_duration=True)
+
+    def contact_sheet(self, columns: int = CONTACT_SHEET_COLUMNS) -> Optional[np.ndarray]:
+        """サムネイルを時刻順に並べた1枚の画像"""
+        if not self.thumbnails:
+            return None
+        tiles = [self.thumbnails[index] for index in sorted(self.thumbnails)]
+        height, width = tiles[0].shape[:2]
+        rows = -(-len(tiles) // columns)
+        sheet = np.zeros((rows * height, min(columns, len(tiles)) * width, 3), dtype=np.uint8)
+        for i, tile in enumerate(tiles):
+            row, column = divmod(i, columns)
+            sheet[row * height:(row + 1) * height, column * width:(column + 1) * width] = tile
+        return sheet
+
+    def write(self, output_file: str) -> List[str]:
+        """サムネイル・コンタクトシート・プレビュー GIF を動画と同じディレクトリに書き出し"""
+        stem = os.path.splitext(output_file)[0]
+        written = []
+        with stage_timer("previews"):
+            for i, index in enumerate(sorted(self.thumbnails)):
+                written.append(_write_images([self.thumbnails[index]], f"{stem}_thumb_{i:02d}.jpg"))
+            sheet = self.contact_sheet()
+            if sheet is not None:
+                written.append(_write_images([sheet], f"{stem}_contact.jpg"))
+            if self.gif_frames:
+                frames = [self.gif_frames[index] for index in sorted(self.gif_frames)]
+                written.append(_write_images(frames, f"{stem}_preview.gif", self.gif_fps))
+        print(f"🖼️ サムネイル {len(self.thumbnails)} 枚・コンタクトシート・プレビュー GIF を保存しました")
+        return written
+
+
+def preview_taps(srt_file: Optional[str], duration: float, fps: float,
+                 times: Optional[Sequence[float]] = None) -> FrameTaps:
+    """
+    字幕から時刻を選んだ FrameTaps（GIF は最初のサビ、なければ全体の 1/3 の位置から）
+
+    Args:
+        times: サムネイルの時刻（省略時は default_tap_times）
+    """
+    if times is None:
+        times = default_tap_times(srt_file, duration)
+    choruses = chorus_starts(SubtitleTimeline.read(srt_file)) if srt_file else []
+    gif_start = choruses[0] if choruses else duration / 3
+    gif_start = max(0.0, min(gif_start, duration - GIF_SECONDS))
+    return FrameTaps(times, fps, gif_start=gif_start)
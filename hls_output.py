@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+📡 HLS（fMP4 セグメント）出力
+エンコードしながら数秒ごとのセグメントとプレイリスト（.m3u8）を書き出し、レンダリング中から再生できるようにします。
+完成後はセグメントをストリームコピーで1本の MP4 にまとめます（再エンコードなし）。
+
+出力（動画ファイル名が song_final_video.mp4 の場合、同じディレクトリに）:
+    song_final_video.m3u8           プレイリスト（EVENT - セグメントが増えるたびに更新、完了時に ENDLIST）
+    song_final_video_init.mp4       初期化セグメント
+    song_final_video_00000.m4s ...  メディアセグメント
+    song_final_video.mp4            完成後にリマックスした MP4
+
+    python hls_output.py outputs/song_final_video.m3u8 song_final_video.mp4   # 既存の HLS 出力から MP4 を作成
+
+GitHub: https://github.com/yusuke10151985/amvc
+"""
+
+import os
+import shutil
+from typing import Iterable, List, Optional
+
+from encoding_profiles import ffmpeg_encode_args
+from ffmpeg_utils import FFmpegPipe, raw_video_input_args, run_ffmpeg
+from pipeline_metrics import stage_timer, increment
+
+SEGMENT_SECONDS = 2           # セグメントの長さ（= キーフレーム間隔）- 再生開始までの遅れの目安
+PLAYLIST_EXTENSION = ".m3u8"
+INIT_SUFFIX = "_init.mp4"
+SEGMENT_PATTERN = "_%05d.m4s"
+
+
+def hls_playlist_path(output_file: str) -> str:
+    """動画ファイルに対応するプレイリストのパス（song_final_video.mp4 → song_final_video.m3u8）"""
+    return os.path.splitext(output_file)[0] + PLAYLIST_EXTENSION
+
+
+def hls_output_args(playlist_file: str, segment_seconds: float = SEGMENT_SECONDS) -> List[str]:
+    """
+    ffmpeg の出力を HLS（fMP4）にする引数（エンコード引数の後、出力ファイルの代わりに置く）
+
+    キーフレームをセグメント境界に強制するので、各セグメントは単独でデコードでき、プレイリストに載った時点で再生できます。
+    セグメント・プレイリストは一時ファイルに書いてから置き換えるため、書き込み途中のファイルは見えません。
+    """
+    stem = os.path.splitext(os.path.basename(playlist_file))[0]
+    directory = os.path.dirname(os.path.abspath(playlist_file))
+    return [
+        "-force_key_frames", f"expr:gte(t,n_forced*{segment_seconds})",
+        "-f", "hls",
+        "-hls_time", str(segment_seconds),
+        "-hls_playlist_type", "event",
+        "-hls_segment_type", "fmp4",
+        "-hls_fmp4_init_filename", f"{stem}{INIT_SUFFIX}",
+        "-hls_segment_filename", os.path.join(directory, f"{stem}{SEGMENT_PATTERN}"),
+        "-hls_flags", "independent_segments+temp_file",
+        playlist_file,
+    ]
+
+
+def write_hls_frames(frames: Iterable, width: int, height: int, fps: float, audio_track: str,
+                     playlist_file: str, profile: str, segment_seconds: float = SEGMENT_SECONDS) -> str:
+    """
+    合成済みフレーム（uint8 RGB）をパイプで ffmpeg に送り、音声付きの HLS を書き出し
+
+    Args:
+        frames: フレームのイテレーター（moviepy の iter_frames など）
+        audio_track: AAC の音声トラック（ストリームコピー）
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(playlist_file)), exist_ok=True)
+    args = raw_video_input_args(width, height, fps) + [
+        "-i", audio_track,
+        "-map", "0:v:0",
+        "-map", "1:a:0",
+    ] + ffmpeg_encode_args(profile) + ["-c:a", "copy", "-shortest"] + hls_output_args(playlist_file, segment_seconds)
+
+    print(f"📡 HLS を書き出し中: {playlist_file}（{segment_seconds}秒ごとにセグメントを追加）")
+    with FFmpegPipe(args) as pipe:
+        for frame in frames:
+            pipe.write(frame)
+    return playlist_file
+
+
+def hls_segment_files(playlist_file: str) -> List[str]:
+    """プレイリストに載っている初期化セグメントとメディアセグメント（再生順）"""
+    directory = os.path.dirname(os.path.abspath(playlist_file))
+    files = []
+    with open(playlist_file, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line.startswith("#EXT-X-MAP:"):
+                uri = line.split("URI=", 1)[1].split(",", 1)[0].strip('"')
+                files.append(os.path.join(directory, uri))
+            elif line and not line.startswith("#"):
+                files.append(os.path.join(directory, line))
+    return files
+
+
+def is_hls_complete(playlist_file: str) -> bool:
+    with open(playlist_file, 'r', encoding='utf-8') as f:
+        return "#EXT-X-ENDLIST" in f.read()
+
+
+def remux_hls_to_mp4(playlist_file: str, output_file: str, staging_dir: Optional[str] = None) -> str:
+    """
+    HLS のセグメントを1本の MP4 にストリームコピーで変換（再エンコードなし）
+
+    初期化セグメントとメディアセグメントを連結すると1本の fragmented MP4 になるので、
+    それを通常の MP4（moov を先頭に置いた faststart）に書き直します。
+    """
+    if not is_hls_complete(playlist_file):
+        raise RuntimeError(f"HLS output is not complete (no #EXT-X-ENDLIST): {playlist_file}")
+    segments = hls_segment_files(playlist_file)
+    staging_dir = staging_dir or os.path.dirname(os.path.abspath(output_file))
+    fragmented = os.path.join(staging_dir, f".{os.path.basename(output_file)}.fmp4")
+    staging = os.path.join(staging_dir, f".{os.path.basename(output_file)}.remux{os.path.splitext(output_file)[1]}")
+
+    try:
+        with stage_timer("hls_remux"):
+            with open(fragmented, 'wb') as out:
+                for segment in segments:
+                    with open(segment, 'rb') as f:
+                        shutil.copyfileobj(f, out)
+            args = ["-i", fragmented, "-map", "0", "-c", "copy"]
+            if output_file.lower().endswith((".mp4", ".mov", ".m4v")):
+                args += ["-movflags", "+faststart"]
+            run_ffmpeg(args + [staging])
+        os.replace(staging, output_file)
+    finally:
+        for path in (fragmented, staging):
+            if os.path.exists(path):
+                os.remove(path)
+    increment("amvc_hls_segments_total", len(segments) - 1)
+    return output_file
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="HLS 出力から MP4 を作成（ストリームコピー）")
+    parser.add_argument("playlist_file")
+    parser.add_argument("output_file")
+    args = parser.parse_args()
+
+    print(f"✅ {remux_hls_to_mp4(args.playlist_file, args.output_file)}")
@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🔁 インクリメンタルビルド
+各ステージの入力（ファイル内容ハッシュ + パラメータ）と出力をビルド記録に保存し、
+入力が変わっていないステージは前回の成果物を再利用してスキップします（make と同じ考え方）。
+
+使い方:
+    python incremental_build.py song.wav lyrics.txt --aligner whisper --render-mode proxy
+    python incremental_build.py song.wav lyrics.txt --explain      # 各ステージを再実行した理由を表示
+    python incremental_build.py song.wav lyrics.txt --force        # すべて再実行
+
+ビルド記録: {output_dir}/.amvc_build/{音声ファイル名}.json
+
+ステージ: align（SRT・JSON・.aln・単語 .aln・.peaks）→ render → runway
+    render は背景の合成・字幕の焼き込み・エンコードを 1 パスでストリーミング処理するため（中間の動画を書き出さない）、
+    1 つのステージとして扱います。背景・字幕・エンコード設定のどれが変わっても render 全体を再実行します。
+
+GitHub: https://github.com/yusuke10151985/amvc
+"""
+
+import os
+import json
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence
+
+from alignment_format import ALIGNMENT_EXTENSION
+from content_hash import file_content_hash, params_hash
+from pipeline_metrics import increment
+from transcription_backends import get_transcription_backend
+from waveform_peaks import waveform_peaks_path
+
+BUILD_RECORD_DIR = ".amvc_build"
+
+# パラメータ以外でステージの出力に影響する変更（処理内容の変更時に上げる）
+BUILD_FORMAT_VERSION = 1
+
+
+def _file_state(path: str, previous: Optional[Dict] = None) -> Dict:
+    """
+    ファイルの状態（サイズ・更新時刻・SHA-256）
+
+    サイズと更新時刻が前回と同じならハッシュを再計算しません（大きな音声・動画の再ハッシュを避ける）。
+    """
+    stat = os.stat(path)
+    if previous and previous.get("size") == stat.st_size and previous.get("mtime_ns") == stat.st_mtime_ns:
+        digest = previous["sha256"]
+    else:
+        digest = file_content_hash(path)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": digest}
+
+
+class BuildRecord:
+    """ステージごとの入力・出力の記録（JSON、アトミックに保存）"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.stages: Dict[str, Dict] = {}
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                if data.get("version") == BUILD_FORMAT_VERSION:
+                    self.stages = data.get("stages", {})
+            except (OSError, ValueError) as e:
+                print(f"⚠️ ビルド記録の読み込みエラー（全ステージを再実行します）: {e}")
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        staging = f"{self.path}.tmp"
+        with open(staging, 'w', encoding='utf-8') as f:
+            json.dump({"version": BUILD_FORMAT_VERSION, "stages": self.stages}, f, ensure_ascii=False, indent=2)
+        os.replace(staging, self.path)
+
+
+class IncrementalBuild:
+    """
+    ステージを入力が変わった場合だけ実行するビルド
+
+        build = IncrementalBuild(record_path, explain=True)
+        srt_file, json_file = build.stage("align", align_fn, inputs=[wav, lyrics], params={"aligner": "simple"})
+    """
+
+    def __init__(self, record_path: str, explain: bool = False, force: bool = False):
+        self.record = BuildRecord(record_path)
+        self.explain = explain
+        self.force = force
+        self.summary: List[Dict] = []
+
+    def _input_states(self, inputs: Sequence[str], previous: Dict) -> Dict[str, Dict]:
+        return {path: _file_state(path, previous.get(path)) for path in inputs}
+
+    def _reasons(self, name: str, input_states: Dict[str, Dict], params: Dict, params_digest: str) -> List[str]:
+        """ステージを再実行する理由（空なら最新）"""
+        if self.force:
+            return ["--force が指定されました"]
+        previous = self.record.stages.get(name)
+        if previous is None:
+            return ["ビルド記録がありません"]
+
+        reasons = []
+        if previous.get("params_hash") != params_digest:
+            changed = sorted(
+                key for key in set(previous.get("params", {})) | set(params)
+                if previous.get("params", {}).get(key) != params.get(key)
+            )
+            reasons.append(f"パラメータが変更されました: {', '.join(changed) or '(内容)'}")
+
+        previous_inputs = previous.get("inputs", {})
+        for path, state in input_states.items():
+            if path not in previous_inputs:
+                reasons.append(f"新しい入力: {path}")
+            elif previous_inputs[path]["sha256"] != state["sha256"]:
+                reasons.append(f"入力が変更されました: {path}")
+        for path in previous_inputs:
+            if path not in input_states:
+                reasons.append(f"入力が削除されました: {path}")
+
+        for path, state in previous.get("outputs", {}).items():
+            if not os.path.exists(path):
+                reasons.append(f"出力がありません: {path}")
+            elif _file_state(path, state)["sha256"] != state["sha256"]:
+                reasons.append(f"出力が変更されました: {path}")
+        return reasons
+
+    def stage(self, name: str, fn: Callable, inputs: Sequence[str], params: Optional[Dict] = None,
+              output_paths: Optional[Callable] = None):
+        """
+        ステージを実行（入力・パラメータ・出力が前回と同じならスキップして前回の戻り値を返す）
+
+        Args:
+            name: ステージ名（ビルド記録のキー）
+            fn: 引数なしで呼ぶ処理関数
+            inputs: 入力ファイル（内容ハッシュで比較）
+            params: 出力に影響するパラメータ（JSON化可能な値）
+            output_paths: 戻り値から出力ファイルのリストを取り出す関数（省略時は戻り値中の文字列）
+        """
+        params = params or {}
+        previous = self.record.stages.get(name, {})
+        input_states = self._input_states([path for path in inputs if path], previous.get("inputs", {}))
+        params_digest = params_hash(params)
+
+        reasons = self._reasons(name, input_states, params, params_digest)
+        if not reasons:
+            increment("amvc_build_stages_total", stage=name, result="skipped")
+            self.summary.append({"stage": name, "skipped": True, "reasons": []})
+            print(f"⏭️ {name}: 入力に変更がないためスキップ")
+            # JSON で保存した戻り値はタプルがリストになるため戻す
+            result = previous["result"]
+            return tuple(result) if isinstance(result, list) else result
+
+        if self.explain:
+            print(f"🔍 {name} を再実行する理由:")
+            for reason in reasons:
+                print(f"   • {reason}")
+
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+
+        outputs = (output_paths or _result_paths)(result)
+        if not outputs:
+            # 失敗（出力なし）は記録しない - 次回も再実行される
+            self.record.stages.pop(name, None)
+            self.record.save()
+            self.summary.append({"stage": name, "skipped": False, "reasons": reasons, "failed": True})
+            return result
+
+        self.record.stages[name] = {
+            "inputs": input_states,
+            "params": params,
+            "params_hash": params_digest,
+            "outputs": {path: _file_state(path) for path in outputs},
+            "result": result,
+            "elapsed": elapsed,
+            "built_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        }
+        self.record.save()
+        increment("amvc_build_stages_total", stage=name, result="built")
+        self.summary.append({"stage": name, "skipped": False, "reasons": reasons, "elapsed": elapsed})
+        return result
+
+
+def _result_paths(result) -> List[str]:
+    """戻り値（パス、またはパスのタプル・リスト）から存在する出力ファイルを取り出す"""
+    values = result if isinstance(result, (list, tuple)) else [result]
+    if any(value is None for value in values):
+        return []
+    return [value for value in values if isinstance(value, str) and os.path.exists(value)]
+
+
+def _alignment_outputs(result, wav_file: str, output_dir: str, aligner: str) -> List[str]:
+    """
+    align ステージの出力（SRT・JSON とサイドカー）
+
+    サイドカー（.aln・単語 .aln・.peaks）も記録するので、削除された場合は align を再実行します
+    （単語 .aln がないまま render がカラオケなしで実行されるのを防ぐ）。
+    """
+    outputs = _result_paths(result)
+    if not outputs:
+        return []
+    srt_file, json_file = result
+    sidecars = [os.path.splitext(json_file)[0] + ALIGNMENT_EXTENSION, waveform_peaks_path(wav_file, output_dir)]
+    if aligner == "whisper":
+        sidecars.append(_words_path(wav_file, output_dir))
+    return outputs + [path for path in sidecars if os.path.exists(path)]
+
+
+def _words_path(wav_file: str, output_dir: str) -> str:
+    return os.path.join(output_dir, f"{Path(wav_file).stem}_whisper_words{ALIGNMENT_EXTENSION}")
+
+
+def build_music_video(wav_file: str, lyrics_file: str, output_dir: str = "./outputs", aligner: str = "simple",
+                      render_mode: str = "full", encoding_profile: Optional[str] = None, renderer: str = "moviepy",
+                      runway_prompts: Optional[List[str]] = None, runway_api_key: Optional[str] = None,
+                      transcription_backend: Optional[str] = None, explain: bool = False, force: bool = False,
+                      background: str = "gradient") -> Dict:
+    """
+    アライメント → 動画生成（→ Runway 統合）をインクリメンタルに実行
+
+    歌詞だけを変更した場合はアライメントから、SRT の内容が変わらなければ動画生成もスキップされます。
+    動画生成（背景・字幕の焼き込み・エンコード）は 1 パスで行うため 1 つのステージです。
+    """
+    import music_video_pipeline as pipeline
+
+    record_path = os.path.join(output_dir, BUILD_RECORD_DIR, f"{Path(wav_file).stem}.json")
+    build = IncrementalBuild(record_path, explain=explain, force=force)
+
+    if aligner == "whisper":
+        align = lambda: pipeline.advanced_align_with_whisper(wav_file, lyrics_file, output_dir, transcription_backend)
+        # 環境変数で既定値が変わった場合も検出できるよう、解決後のバックエンド名で比較
+        align_params = {"aligner": aligner, "backend": get_transcription_backend(transcription_backend).cache_name}
+    else:
+        align = lambda: pipeline.simple_align_subtitles(wav_file, lyrics_file, output_dir)
+        align_params = {"aligner": aligner}
+    srt_file, json_file = build.stage("align", align, inputs=[wav_file, lyrics_file], params=align_params,
+                                      output_paths=lambda result: _alignment_outputs(result, wav_file, output_dir,
+                                                                                     aligner))
+    words_file = None
+    if srt_file and aligner == "whisper":
+        candidate = _words_path(wav_file, output_dir)
+        words_file = candidate if os.path.exists(candidate) else None
+
+    video_file = None
+    if srt_file:
+        video_file = build.stage(
+            "render",
+            lambda: pipeline.generate_video(wav_file, srt_file, output_dir, render_mode=render_mode,
+                                            encoding_profile=encoding_profile, renderer=renderer,
+                                            words_file=words_file, background=background),
+            inputs=[wav_file, srt_file, words_file],
+            params={"render_mode": render_mode, "encoding_profile": encoding_profile, "renderer": renderer,
+                    "background": background},
+        )
+
+    runway_file = None
+    if srt_file and runway_prompts and runway_api_key:
+        from runway_api_integration import create_runway_integrated_video
+
+        # API キーは出力に影響しないためパラメータに含めない
+        runway_file = build.stage(
+            "runway",
+            lambda: create_runway_integrated_video(runway_prompts, wav_file, srt_file, runway_api_key,
+                                                   output_dir=output_dir, render_mode=render_mode,
+                                                   encoding_profile=encoding_profile),
+            inputs=[wav_file, srt_file],
+            params={"prompts": runway_prompts, "render_mode": render_mode, "encoding_profile": encoding_profile},
+        )
+
+    skipped = sum(1 for stage in build.summary if stage["skipped"])
+    print(f"\n🔁 {len(build.summary)} ステージ中 {skipped} ステージをスキップしました")
+    return {
+        "srt_file": srt_file,
+        "json_file": json_file,
+        "video_file": video_file,
+        "runway_file": runway_file,
+        "stages": build.summary,
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="入力が変わったステージだけを再実行するビルド")
+    parser.add_argument("wav_file")
+    parser.add_argument("lyrics_file")
+    parser.add_argument("--output-dir", default="./outputs")
+    parser.add_argument("--aligner", choices=["simple", "whisper"], default="simple")
+    parser.add_argument("--render-mode", default="full")
+    parser.add_argument("--encoding-profile")
+    parser.add_argument("--renderer", default="moviepy")
+    parser.add_argument("--background", choices=["gradient", "pulse", "spectrum"], default="gradient")
+    parser.add_argument("--transcription-backend", help="whisper または faster-whisper")
+    parser.add_argument("--explain", action="store_true", help="各ステージを再実行した理由を表示")
+    parser.add_argument("--force", action="store_true", help="すべてのステージを再実行")
+    args = parser.parse_args()
+
+    build_music_video(args.wav_file, args.lyrics_file, args.output_dir, args.aligner, args.render_mode,
+                      args.encoding_profile, args.renderer, transcription_backend=args.transcription_backend,
+                      explain=args.explain, force=args.force, background=args.background)
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+📒 ジョブジャーナル（SQLite）
+長いジョブの完了した単位（ステージ・シーン）を成果物のパスと内容ハッシュ付きで記録し、
+ランタイムのリセットなどで中断したジョブを最後に完了した単位から再開できるようにします。
+
+- 単位ごとに状態（submitted / done）、成果物、SHA-256、Runway のタスクID、戻り値を保存
+- 完了済みの単位は、成果物が存在しハッシュが一致する場合だけ再利用（途中で壊れたファイルは再実行）
+- 投入済みで未完了の Runway タスクはタスクIDで再接続し、再投入しません
+- 書き込みは単位ごとにコミット（WAL）- どの時点で中断しても、それまでの記録は残ります
+
+ジャーナルの場所: 引数 > 環境変数 AMVC_JOB_JOURNAL > {output_dir}/.amvc_jobs/journal.sqlite
+
+    python job_journal.py outputs/.amvc_jobs/journal.sqlite            # ジョブ一覧
+    python job_journal.py outputs/.amvc_jobs/journal.sqlite JOB_ID     # 単位ごとの状態
+
+GitHub: https://github.com/yusuke10151985/amvc
+"""
+
+import os
+import json
+import time
+import sqlite3
+from typing import Dict, List, Optional
+
+from content_hash import file_content_hash
+from pipeline_metrics import increment
+
+JOB_JOURNAL_ENV = "AMVC_JOB_JOURNAL"
+JOB_STATE_DIR = ".amvc_jobs"
+JOURNAL_FILE = "journal.sqlite"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    params TEXT NOT NULL,
+    status TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS units (
+    job_id TEXT NOT NULL,
+    unit TEXT NOT NULL,
+    status TEXT NOT NULL,
+    task_id TEXT,
+    artifact TEXT,
+    sha256 TEXT,
+    result TEXT,
+    updated_at TEXT NOT NULL,
+    PRIMARY KEY (job_id, unit)
+);
+"""
+
+
+def _now() -> str:
+    return time.strftime("%Y-%m-%dT%H:%M:%S")
+
+
+def job_state_dir(output_dir: str, job_id: str) -> str:
+    """再開のために残すジョブの中間ファイルの置き場所（スクラッチと違い、終了まで削除されない）"""
+    return os.path.join(output_dir, JOB_STATE_DIR, job_id)
+
+
+def default_journal_path(output_dir: str) -> str:
+    return os.environ.get(JOB_JOURNAL_ENV) or os.path.join(output_dir, JOB_STATE_DIR, JOURNAL_FILE)
+
+
+class JobJournal:
+    """ジョブ・単位の進捗を記録する SQLite ジャーナル"""
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._db = sqlite3.connect(path, timeout=30)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(_SCHEMA)
+        self._db.commit()
+
+    def close(self):
+        self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    # -- ジョブ --
+
+    def begin_job(self, job_id: str, kind: str, params: Dict) -> bool:
+        """ジョブを開始（既存のジョブなら再開として True を返す）"""
+        row = self._db.execute("SELECT status FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        with self._db:
+            if row is None:
+                self._db.execute(
+                    "INSERT INTO jobs VALUES (?, ?, ?, 'running', ?, ?)",
+                    (job_id, kind, json.dumps(params, ensure_ascii=False, default=str), _now(), _now()),
+                )
+                return False
+            self._db.execute("UPDATE jobs SET status = 'running', updated_at = ? WHERE job_id = ?", (_now(), job_id))
+        increment("amvc_job_resumes_total", kind=kind)
+        return True
+
+    def finish_job(self, job_id: str, status: str = "done"):
+        with self._db:
+            self._db.execute("UPDATE jobs SET status = ?, updated_at = ? WHERE job_id = ?", (status, _now(), job_id))
+
+    def jobs(self) -> List[Dict]:
+        return [dict(row) for row in self._db.execute("SELECT * FROM jobs ORDER BY created_at")]
+
+    # -- 単位 --
+
+    def units(self, job_id: str) -> List[Dict]:
+        return [dict(row) for row in self._db.execute("SELECT * FROM units WHERE job_id = ? ORDER BY unit", (job_id,))]
+
+    def _unit(self, job_id: str, unit: str) -> Optional[sqlite3.Row]:
+        return self._db.execute("SELECT * FROM units WHERE job_id = ? AND unit = ?", (job_id, unit)).fetchone()
+
+    def record_task(self, job_id: str, unit: str, task_id: str):
+        """外部タスク（Runway など）の投入を記録 - 中断後はこの ID で再接続"""
+        with self._db:
+            self._db.execute(
+                "INSERT INTO units (job_id, unit, status, task_id, updated_at) VALUES (?, ?, 'submitted', ?, ?) "
+                "ON CONFLICT (job_id, unit) DO UPDATE SET status = 'submitted', task_id = excluded.task_id, "
+                "artifact = NULL, sha256 = NULL, result = NULL, updated_at = excluded.updated_at",
+                (job_id, unit, task_id, _now()),
+            )
+
+    def pending_task(self, job_id: str, unit: str) -> Optional[str]:
+        """投入済みで未完了のタスクID"""
+        row = self._unit(job_id, unit)
+        return row["task_id"] if row is not None and row["status"] == "submitted" else None
+
+    def complete(self, job_id: str, unit: str, artifact: Optional[str] = None, result=None):
+        """単位の完了を記録（成果物は内容ハッシュも保存）"""
+        digest = file_content_hash(artifact) if artifact else None
+        with self._db:
+            self._db.execute(
+                "INSERT INTO units (job_id, unit, status, artifact, sha256, result, updated_at) "
+                "VALUES (?, ?, 'done', ?, ?, ?, ?) "
+                "ON CONFLICT (job_id, unit) DO UPDATE SET status = 'done', artifact = excluded.artifact, "
+                "sha256 = excluded.sha256, result = excluded.result, updated_at = excluded.updated_at",
+                (job_id, unit, artifact, digest, json.dumps(result, ensure_ascii=False, default=str), _now()),
+            )
+
+    def completed(self, job_id: str, unit: str) -> Optional[Dict]:
+        """
+        完了済みの単位（{"artifact", "result"}）- 未完了、または成果物が消えた・変わった場合は None
+        """
+        row = self._unit(job_id, unit)
+        if row is None or row["status"] != "done":
+            return None
+        artifact = row["artifact"]
+        if artifact and (not os.path.exists(artifact) or file_content_hash(artifact) != row["sha256"]):
+            print(f"⚠️ {unit} の成果物が見つからないか変更されているため再実行します: {artifact}")
+            return None
+        increment("amvc_job_units_reused_total")
+        return {"artifact": artifact, "result": json.loads(row["result"]) if row["result"] else None}
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="ジョブジャーナルの確認")
+    parser.add_argument("journal")
+    parser.add_argument("job_id", nargs="?")
+    args = parser.parse_args()
+
+    with JobJournal(args.journal) as journal:
+        if args.job_id:
+            for unit in journal.units(args.job_id):
+                detail = unit["artifact"] or unit["task_id"] or ""
+                print(f"{unit['unit']:<16} {unit['status']:<10} {unit['updated_at']}  {detail}")
+        else:
+            for job in journal.jobs():
+                print(f"{job['job_id']}  {job['kind']:<8} {job['status']:<8} {job['updated_at']}")
@@ -0,0 +1,436 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🛰️ ローカル HTTP ジョブサーバー
+フロントエンドからアライメント・動画生成・Runway 統合のジョブを受け付け、プロセスワーカーのプールで実行します。
+
+- ワーカーは常駐プロセスなので、モジュールの import・Whisper モデル・各キャッシュが次のジョブでもそのまま使えます
+- 進捗はステージ単位で Server-Sent Events として配信
+- 成果物は Range リクエスト対応で配信（動画のシーク再生やダウンロード再開が可能）
+
+エンドポイント:
+    POST /jobs                          ジョブ投入（multipart: type, params(JSON), audio, lyrics, srt / JSON: ファイルはパス指定）
+    GET  /jobs/{job_id}                 状態と結果
+    GET  /jobs/{job_id}/events          進捗（text/event-stream）
+    GET  /jobs/{job_id}/artifacts/{name} 成果物
+    GET  /health                        ワーカー数・キュー状況
+
+ブラウザからのリクエスト（Origin ヘッダーあり）:
+    - 許可するのは AMVC_CORS_ORIGIN（既定はフロントエンドの開発サーバー）からのものだけ
+    - ファイルは multipart のアップロードのみ（サーバー上のパスは指定できない）
+    - runway ジョブは params.api_key が必須（サーバーの RUNWAY_API_KEY はローカルのスクリプトからのジョブにだけ使う）
+
+使い方:
+    pip install aiohttp
+    python job_server.py --port 8765 --workers 2
+
+GitHub: https://github.com/yusuke10151985/amvc
+"""
+
+import os
+import json
+import time
+import uuid
+import asyncio
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+from aiohttp import web
+
+from pipeline_metrics import job_metrics, stage_listener
+
+DEFAULT_PORT = 8765
+DEFAULT_WORKERS = 2
+MAX_QUEUED_JOBS = 16                 # 実行中 + 待機中の上限（超えると 503）
+PROGRESS_INTERVAL = 0.5              # 同じステージの進捗イベントを送る最短間隔（秒）
+HEARTBEAT_SECONDS = 15
+JOBS_DIR = "jobs"
+UPLOAD_FIELDS = ("audio", "lyrics", "srt", "words")
+CORS_ORIGIN_ENV = "AMVC_CORS_ORIGIN"
+DEFAULT_CORS_ORIGIN = "http://localhost:5173"   # フロントエンドの開発サーバー（vite）
+
+JOB_TYPES = ("align", "render", "runway")
+FINISHED_STATES = ("done", "error")
+
+# ---- ワーカープロセス側 ----
+
+_progress_queue = None
+
+
+def _init_worker(progress_queue, preload_backend: Optional[str]):
+    """ワーカー起動時に重いモジュールを読み込み、必要ならモデルも読み込んでおく"""
+    global _progress_queue
+    _progress_queue = progress_queue
+
+    import music_video_pipeline  # noqa: F401 - moviepy などの import を最初のジョブから外す
+
+    if preload_backend:
+        from transcription_backends import get_transcription_backend
+        get_transcription_backend(preload_backend).load()
+
+
+class _ProgressReporter:
+    """
+    ステージの開始・終了をサーバーへ送信
+
+    フレーム単位のステージ（同じステージが続けて何度も呼ばれる）は PROGRESS_INTERVAL ごとに間引きますが、
+    間引いた最後のイベントはステージが変わったとき・ジョブの終了時（flush）に必ず送るので、
+    どのステージも "start" のあとに "ok" / "error" が届きます。
+    """
+
+    def __init__(self, job_id: str):
+        self.job_id = job_id
+        self.last_stage = None
+        self.last_sent = 0.0
+        self.pending = None
+
+    def _send(self, stage: str, event: str, elapsed: float):
+        self.last_stage = stage
+        self.last_sent = time.monotonic()
+        _progress_queue.put({"job_id": self.job_id, "type": "stage", "stage": stage, "event": event,
+                             "elapsed": elapsed})
+
+    def __call__(self, stage: str, event: str, elapsed: float):
+        if stage != self.last_stage:
+            self.flush()
+        elif event != "error" and time.monotonic() - self.last_sent < PROGRESS_INTERVAL:
+            self.pending = (stage, event, elapsed)
+            return
+        self.pending = None
+        self._send(stage, event, elapsed)
+
+    def flush(self):
+        """間引いて保留しているイベントを送信"""
+        if self.pending is not None:
+            pending, self.pending = self.pending, None
+            self._send(*pending)
+
+
+def _run_job(job_id: str, job_type: str, params: Dict, job_dir: str) -> Dict:
+    """ワーカープロセスでジョブを実行し、結果とステージ内訳を返す"""
+    import music_video_pipeline as pipeline
+
+    _progress_queue.put({"job_id": job_id, "type": "status", "status": "running"})
+    reporter = _ProgressReporter(job_id)
+    with job_metrics(job_id, job_type=job_type) as job, stage_listener(reporter):
+        try:
+            if job_type == "align":
+                if params.get("aligner") == "whisper":
+                    srt_file, json_file = pipeline.advanced_align_with_whisper(
+                        params["audio"], params["lyrics"], job_dir, params.get("backend"))
+                else:
+                    srt_file, json_file = pipeline.simple_align_subtitles(
+                        params["audio"], params["lyrics"], job_dir)
+                result = {"srt_file": srt_file, "json_file": json_file}
+            elif job_type == "render" and params.get("renditions"):
+                from rendition_ladder import generate_video_ladder
+                outputs = generate_video_ladder(
+                    params["audio"], params["srt"], job_dir, renditions=params["renditions"],
+                    encoding_profile=params.get("encoding_profile"),
+                    background=params.get("background", "gradient"),
+                )
+                result = {f"video_file_{name}": path for name, path in outputs.items()}
+            elif job_type == "render":
+                result = {"video_file": pipeline.generate_video(
+                    params["audio"], params["srt"], job_dir,
+                    render_mode=params.get("render_mode", "full"),
+                    encoding_profile=params.get("encoding_profile"),
+                    renderer=params.get("renderer", "moviepy"),
+                    background=params.get("background", "gradient"),
+                    hls=bool(params.get("hls")),
+                    previews=bool(params.get("previews")),
+                    preview_times=params.get("preview_times"),
+                    long_form=bool(params.get("long_form")),
+                    memory_cap_mb=params.get("memory_cap_mb"),
+                    words_file=params.get("words"),
+                )}
+            else:
+                from runway_api_integration import create_runway_integrated_video
+                result = {"video_file": create_runway_integrated_video(
+                    params["prompts"], params["audio"], params["srt"],
+                    params.get("api_key") or os.environ.get("RUNWAY_API_KEY"),
+                    output_dir=job_dir,
+                    render_mode=params.get("render_mode", "full"),
+                    encoding_profile=params.get("encoding_profile"),
+                )}
+        finally:
+            reporter.flush()
+
+    if not any(result.values()):
+        raise RuntimeError(f"{job_type} ジョブは出力を生成できませんでした")
+    return {"result": result, "stages": job["stages"], "total_seconds": job["total_seconds"]}
+
+
+# ---- サーバー側 ----
+
+class JobServer:
+    """ジョブの受付・実行・進捗配信"""
+
+    def __init__(self, output_dir: str = "./outputs", workers: int = DEFAULT_WORKERS,
+                 max_queued: int = MAX_QUEUED_JOBS, preload_backend: Optional[str] = None):
+        self.output_dir = os.path.abspath(output_dir)
+        self.workers = workers
+        self.max_queued = max_queued
+        self.jobs: Dict[str, Dict] = {}
+        self._subscribers: Dict[str, List[asyncio.Queue]] = {}
+        # spawn: 受信スレッドを持つ親プロセスを fork しない
+        context = multiprocessing.get_context("spawn")
+        self._progress_queue = context.Queue()
+        self._pool = ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_worker,
+                                         initargs=(self._progress_queue, preload_backend))
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    # -- 進捗 --
+
+    def _receive_progress(self):
+        """ワーカーからの進捗をイベントループへ転送（専用スレッド）"""
+        while True:
+            event = self._progress_queue.get()
+            if event is None:
+                return
+            self._loop.call_soon_threadsafe(self._publish, event["job_id"], event)
+
+    def _publish(self, job_id: str, event: Dict):
+        job = self.jobs.get(job_id)
+        if job is None:
+            return
+        event = dict(event, time=time.time())
+        job["events"].append(event)
+        if event["type"] == "stage":
+            job["stage"] = event["stage"]
+        elif event["type"] == "status" and job["status"] not in FINISHED_STATES:
+            # ワーカーからの running が完了通知より遅れて届いても状態を戻さない
+            job["status"] = event["status"]
+        for queue in self._subscribers.get(job_id, []):
+            queue.put_nowait(event)
+
+    # -- ジョブ --
+
+    def active_count(self) -> int:
+        return sum(1 for job in self.jobs.values() if job["status"] not in FINISHED_STATES)
+
+    def submit(self, job_type: str, params: Dict, job_id: Optional[str] = None) -> Dict:
+        if job_type not in JOB_TYPES:
+            raise ValueError(f"Unknown job type: {job_type} (choose from {', '.join(JOB_TYPES)})")
+        job_id = job_id or uuid.uuid4().hex[:12]
+        job = {
+            "job_id": job_id,
+            "type": job_type,
+            "status": "queued",
+            "stage": None,
+            "submitted_at": time.time(),
+            "events": [],
+            "result": None,
+            "error": None,
+            "dir": os.path.join(self.output_dir, JOBS_DIR, job_id),
+        }
+        os.makedirs(job["dir"], exist_ok=True)
+        self.jobs[job_id] = job
+        asyncio.ensure_future(self._execute(job, params))
+        return job
+
+    async def _execute(self, job: Dict, params: Dict):
+        self._publish(job["job_id"], {"type": "status", "status": "queued"})
+        # ワーカーが受け取った時点で running のイベントが届く
+        try:
+            outcome = await self._loop.run_in_executor(self._pool, _run_job, job["job_id"], job["type"], params,
+                                                       job["dir"])
+            job.update(result=outcome["result"], stages=outcome["stages"], total_seconds=outcome["total_seconds"])
+            self._publish(job["job_id"], {"type": "status", "status": "done"})
+        except Exception as e:
+            job["error"] = str(e)
+            self._publish(job["job_id"], {"type": "status", "status": "error", "error": job["error"]})
+
+    def describe(self, job: Dict) -> Dict:
+        return {
+            "job_id": job["job_id"],
+            "type": job["type"],
+            "status": job["status"],
+            "stage": job["stage"],
+            "error": job["error"],
+            "result": {key: os.path.basename(value) for key, value in (job["result"] or {}).items() if value},
+            "stages": job.get("stages"),
+            "total_seconds": job.get("total_seconds"),
+            "artifacts": self.artifacts(job),
+        }
+
+    def artifacts(self, job: Dict) -> List[Dict]:
+        entries = []
+        for name in sorted(os.listdir(job["dir"])):
+            path = os.path.join(job["dir"], name)
+            if os.path.isfile(path) and not name.startswith("."):
+                entries.append({"name": name, "size": os.path.getsize(path),
+                                "url": f"/jobs/{job['job_id']}/artifacts/{name}"})
+        return entries
+
+    # -- HTTP ハンドラー --
+
+    def _job_or_404(self, request) -> Dict:
+        job = self.jobs.get(request.match_info["job_id"])
+        if job is None:
+            raise web.HTTPNotFound(text="job not found")
+        return job
+
+    async def handle_submit(self, request):
+        if self.active_count() >= self.max_queued:
+            raise web.HTTPServiceUnavailable(text="job queue is full")
+
+        job_id = uuid.uuid4().hex[:12]
+        job_dir = os.path.join(self.output_dir, JOBS_DIR, job_id)
+        # ブラウザからのジョブはアップロードしたファイルだけを使う（params でサーバー上のパスを指定させない）
+        browser = "Origin" in request.headers
+        if request.content_type.startswith("multipart/"):
+            job_type, params = None, {}
+            reader = await request.multipart()
+            async for part in reader:
+                if part.name == "type":
+                    job_type = await part.text()
+                elif part.name == "params":
+                    try:
+                        fields = json.loads(await part.text())
+                    except ValueError:
+                        raise web.HTTPBadRequest(text="params must be JSON")
+                    if browser and any(name in fields for name in UPLOAD_FIELDS):
+                        raise web.HTTPBadRequest(text=f"upload files instead of passing paths ({', '.join(UPLOAD_FIELDS)})")
+                    params.update(fields)
+                elif part.name in UPLOAD_FIELDS and part.filename:
+                    os.makedirs(job_dir, exist_ok=True)
+                    path = os.path.join(job_dir, os.path.basename(part.filename))
+                    with open(path, 'wb') as f:
+                        while True:
+                            chunk = await part.read_chunk()
+                            if not chunk:
+                                break
+                            f.write(chunk)
+                    params[part.name] = path
+        else:
+            if browser:
+                raise web.HTTPBadRequest(text="browser requests must upload files as multipart/form-data")
+            body = await request.json()
+            job_type, params = body.get("type"), body.get("params", {})
+
+        if browser and job_type == "runway" and not params.get("api_key"):
+            raise web.HTTPForbidden(text="runway jobs from the browser must include params.api_key")
+        try:
+            job = self.submit(job_type, params, job_id)
+        except ValueError as e:
+            raise web.HTTPBadRequest(text=str(e))
+        return web.json_response(self.describe(job), status=202)
+
+    async def handle_status(self, request):
+        return web.json_response(self.describe(self._job_or_404(request)))
+
+    async def handle_events(self, request):
+        job = self._job_or_404(request)
+        response = web.StreamResponse(headers={
+            "Content-Type": "text/event-stream",
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",
+        })
+        await response.prepare(request)
+
+        async def send(event: Dict):
+            await response.write(f"event: {event['type']}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n".encode())
+
+        # 接続前のイベントを再送してから購読
+        queue: asyncio.Queue = asyncio.Queue()
+        self._subscribers.setdefault(job["job_id"], []).append(queue)
+        try:
+            for event in list(job["events"]):
+                await send(event)
+            while job["status"] not in FINISHED_STATES or not queue.empty():
+                try:
+                    event = await asyncio.wait_for(queue.get(), HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    await response.write(b": heartbeat\n\n")
+                    continue
+                await send(event)
+        except (ConnectionResetError, asyncio.CancelledError):
+            pass
+        finally:
+            self._subscribers[job["job_id"]].remove(queue)
+        return response
+
+    async def handle_artifact(self, request):
+        job = self._job_or_404(request)
+        name = request.match_info["name"]
+        path = os.path.join(job["dir"], os.path.basename(name))
+        if name != os.path.basename(name) or not os.path.isfile(path):
+            raise web.HTTPNotFound(text="artifact not found")
+        # FileResponse が Range / If-Range / 206 を処理
+        return web.FileResponse(path)
+
+    async def handle_health(self, request):
+        return web.json_response({
+            "workers": self.workers,
+            "active": self.active_count(),
+            "max_queued": self.max_queued,
+            "jobs": len(self.jobs),
+        })
+
+    # -- アプリケーション --
+
+    async def _on_startup(self, app):
+        self._loop = asyncio.get_running_loop()
+        threading.Thread(target=self._receive_progress, name="amvc-progress", daemon=True).start()
+
+    async def _on_cleanup(self, app):
+        self._progress_queue.put(None)
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def create_app(self) -> web.Application:
+        # 認証のないサーバーなので、許可するオリジンは明示したものだけ（* にはしない）
+        allowed = {origin.strip() for origin in os.environ.get(CORS_ORIGIN_ENV, DEFAULT_CORS_ORIGIN).split(",")
+                   if origin.strip() and origin.strip() != "*"}
+
+        def allow(request, response):
+            origin = request.headers.get("Origin")
+            if origin in allowed:
+                response.headers["Access-Control-Allow-Origin"] = origin
+                response.headers["Access-Control-Allow-Headers"] = "Content-Type, Range"
+                response.headers["Access-Control-Expose-Headers"] = "Content-Range, Accept-Ranges, Content-Length"
+                response.headers["Vary"] = "Origin"
+            return response
+
+        @web.middleware
+        async def cors(request, handler):
+            origin = request.headers.get("Origin")
+            # multipart の POST はプリフライトなしで届くため、許可していないオリジンからのジョブ投入はここで拒否
+            if origin is not None and origin not in allowed and request.method not in ("GET", "HEAD", "OPTIONS"):
+                raise web.HTTPForbidden(text=f"origin not allowed: {origin}")
+            if request.method == "OPTIONS":
+                return allow(request, web.Response())
+            try:
+                return allow(request, await handler(request))
+            except web.HTTPException as e:
+                allow(request, e)
+                raise
+
+        app = web.Application(middlewares=[cors], client_max_size=1024 ** 3)
+        app.router.add_post("/jobs", self.handle_submit)
+        app.router.add_get("/jobs/{job_id}", self.handle_status)
+        app.router.add_get("/jobs/{job_id}/events", self.handle_events)
+        app.router.add_get("/jobs/{job_id}/artifacts/{name}", self.handle_artifact)
+        app.router.add_get("/health", self.handle_health)
+        app.on_startup.append(self._on_startup)
+        app.on_cleanup.append(self._on_cleanup)
+        return app
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="パイプラインのローカル HTTP ジョブサーバー")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    parser.add_argument("--max-queued", type=int, default=MAX_QUEUED_JOBS)
+    parser.add_argument("--output-dir", default="./outputs")
+    parser.add_argument("--preload-backend", help="ワーカー起動時に読み込む音声認識バックエンド（whisper など）")
+    args = parser.parse_args()
+
+    server = JobServer(args.output_dir, args.workers, args.max_queued, args.preload_backend)
+    print(f"🛰️ ジョブサーバー起動: http://{args.host}:{args.port} (ワーカー {args.workers})")
+    web.run_app(server.create_app(), host=args.host, port=args.port, print=None)
@@ -0,0 +1,114 @@
+/**
+ * ローカルジョブサーバー クライアント (フロントエンド用)
+ *
+ * job_server.py にアライメント・動画生成・Runway 統合のジョブを投入し、
+ * 進捗を Server-Sent Events で受け取ります。
+ */
+
+export type JobType = 'align' | 'render' | 'runway';
+export type JobStatus = 'queued' | 'running' | 'done' | 'error';
+
+export interface JobFiles {
+  audio?: File;
+  lyrics?: File;
+  srt?: File;
+  words?: File;
+}
+
+export interface JobArtifact {
+  name: string;
+  size: number;
+  url: string;
+}
+
+export interface JobState {
+  job_id: string;
+  type: JobType;
+  status: JobStatus;
+  stage: string | null;
+  error: string | null;
+  result: Record<string, string>;
+  stages: Record<string, { seconds: number; count: number; errors: number }> | null;
+  total_seconds: number | null;
+  artifacts: JobArtifact[];
+}
+
+export interface JobEvent {
+  job_id: string;
+  type: 'status' | 'stage';
+  status?: JobStatus;
+  stage?: string;
+  event?: 'start' | 'ok' | 'error';
+  elapsed?: number;
+  error?: string | null;
+  time: number;
+}
+
+export const DEFAULT_JOB_SERVER_URL = 'http://127.0.0.1:8765';
+
+// ファイルは必ずアップロード（サーバーはブラウザからのパス指定を拒否）- runway ジョブは params.api_key が必要
+export async function submitJob(
+  type: JobType,
+  files: JobFiles,
+  params: Record<string, unknown> = {},
+  serverUrl: string = DEFAULT_JOB_SERVER_URL
+): Promise<JobState> {
+  const form = new FormData();
+  form.append('type', type);
+  form.append('params', JSON.stringify(params));
+  for (const [field, file] of Object.entries(files)) {
+    if (file) form.append(field, file, file.name);
+  }
+
+  const response = await fetch(`${serverUrl}/jobs`, { method: 'POST', body: form });
+  if (!response.ok) {
+    throw new Error(`Job server error: ${response.status} - ${await response.text()}`);
+  }
+  return response.json();
+}
+
+export async function getJob(jobId: string, serverUrl: string = DEFAULT_JOB_SERVER_URL): Promise<JobState> {
+  const response = await fetch(`${serverUrl}/jobs/${jobId}`);
+  if (!response.ok) {
+    throw new Error(`Job server error: ${response.status} - ${response.statusText}`);
+  }
+  return response.json();
+}
+
+// 進捗を購読（完了・失敗で自動的に閉じる）。戻り値の関数で購読を中止
+export function watchJob(
+  jobId: string,
+  onEvent: (event: JobEvent) => void,
+  serverUrl: string = DEFAULT_JOB_SERVER_URL
+): () => void {
+  const source = new EventSource(`${serverUrl}/jobs/${jobId}/events`);
+  const handle = (message: MessageEvent) => {
+    const event: JobEvent = JSON.parse(message.data);
+    onEvent(event);
+    if (event.type === 'status' && (event.status === 'done' || event.status === 'error')) {
+      source.close();
+    }
+  };
+  source.addEventListener('status', handle);
+  source.addEventListener('stage', handle);
+  return () => source.close();
+}
+
+// 成果物の URL（<video> や波形ピークの Range 読み込みにそのまま使えます）
+export const artifactUrl = (artifact: JobArtifact, serverUrl: string = DEFAULT_JOB_SERVER_URL): string =>
+  `${serverUrl}${artifact.url}`;
+
+// レンダリング中の HLS プレイリスト（params.hls を指定した render ジョブ）- 最初のセグメントが書かれるまでは null
+// Safari は <video src> でそのまま再生、それ以外のブラウザは hls.js などの MSE プレイヤーが必要です
+export const hlsPlaylistUrl = (job: JobState, serverUrl: string = DEFAULT_JOB_SERVER_URL): string | null => {
+  const playlist = job.artifacts.find((artifact) => artifact.name.endsWith('.m3u8'));
+  return playlist ? artifactUrl(playlist, serverUrl) : null;
+};
+
+export default {
+  submitJob,
+  getJob,
+  watchJob,
+  artifactUrl,
+  hlsPlaylistUrl
+};
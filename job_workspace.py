@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🗂️ ジョブ用スクラッチワークスペース
+ジョブごとに独立した作業ディレクトリを用意し、複数レンダリングの同時実行でファイルが衝突しないようにします。
+
+- 作業ルートは引数 / 環境変数 AMVC_SCRATCH_ROOT で指定（"ram" で /dev/shm などのRAMディスク）
+- 成果物はアトミックな移動で出力先に公開
+- 終了時（例外発生時を含む）に作業ディレクトリを必ず削除
+
+GitHub: https://github.com/yusuke10151985/amvc
+"""
+
+import os
+import uuid
+import shutil
+import weakref
+import tempfile
+from typing import Optional
+
+SCRATCH_ROOT_ENV = "AMVC_SCRATCH_ROOT"
+RAM_DISK_ROOTS = ["/dev/shm"]
+
+
+def resolve_scratch_root(root: Optional[str] = None) -> str:
+    """作業ルートを決定（引数 > 環境変数 > システムの一時ディレクトリ）"""
+    root = root or os.environ.get(SCRATCH_ROOT_ENV)
+
+    if root == "ram":
+        for candidate in RAM_DISK_ROOTS:
+            if os.path.isdir(candidate) and os.access(candidate, os.W_OK):
+                return candidate
+        print("⚠️ RAMディスクが見つかりません - 通常の一時ディレクトリを使用します")
+        return tempfile.gettempdir()
+
+    if root:
+        os.makedirs(root, exist_ok=True)
+        return root
+    return tempfile.gettempdir()
+
+
+def publish_file(source: str, destination: str) -> str:
+    """
+    ファイルを出力先へアトミックに公開
+
+    同一ファイルシステムなら os.replace、異なる場合（tmpfs → ディスクなど）は
+    出力先ディレクトリ内の一時ファイルへコピーしてから os.replace します。
+    読み手が書きかけのファイルを見ることはありません。
+    """
+    destination_dir = os.path.dirname(os.path.abspath(destination))
+    os.makedirs(destination_dir, exist_ok=True)
+
+    try:
+        os.replace(source, destination)
+    except OSError:
+        fd, staging = tempfile.mkstemp(prefix=".publish_", suffix=os.path.splitext(destination)[1], dir=destination_dir)
+        os.close(fd)
+        try:
+            shutil.copyfile(source, staging)
+            os.replace(staging, destination)
+        except Exception:
+            if os.path.exists(staging):
+                os.remove(staging)
+            raise
+        os.remove(source)
+
+    return destination
+
+
+class JobWorkspace:
+    """ジョブ単位のスクラッチディレクトリ"""
+
+    def __init__(self, job_id: Optional[str] = None, root: Optional[str] = None):
+        self.job_id = job_id or uuid.uuid4().hex[:12]
+        self.root = resolve_scratch_root(root)
+        self.dir = tempfile.mkdtemp(prefix=f"amvc_{self.job_id}_", dir=self.root)
+        # with を使わなかった場合やプロセス終了時も確実に削除
+        self._finalizer = weakref.finalize(self, shutil.rmtree, self.dir, True)
+
+    def __enter__(self) -> "JobWorkspace":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.cleanup()
+
+    def file(self, name: str) -> str:
+        """ワークスペース内のファイルパス"""
+        return os.path.join(self.dir, name)
+
+    def subdir(self, name: str) -> str:
+        """ワークスペース内のサブディレクトリ（作成済み）"""
+        path = os.path.join(self.dir, name)
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def publish(self, scratch_file: str, destination: str) -> str:
+        """ワークスペース内の成果物を出力先へアトミックに公開"""
+        return publish_file(scratch_file, destination)
+
+    def cleanup(self):
+        """作業ディレクトリを削除"""
+        self._finalizer()
@@ -0,0 +1,389 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🕰️ ロングフォーム レンダリング（1時間以上のミックス・ライブ用）
+メモリ使用量が曲の長さ・字幕の数に比例して増えないよう、次のように描画します。
+
+- 字幕は表示の少し前（LOOKAHEAD_SECONDS）に1行ずつラスタライズし、表示が終わったら解放
+  （TextClip を最初に全部作らず、CompositeVideoClip のレイヤーも持たない）
+- 背景と字幕は使い回す1枚のバッファに合成し、raw フレームをそのまま ffmpeg へパイプ
+- 音声は WAV をメモリマップで参照（長さの取得・特徴量の計算）し、エンコード・結合は ffmpeg がストリーム処理
+- 一定間隔で常駐メモリを確認し、上限を超えたら先読みした字幕を捨てて GC（上限: 引数 > AMVC_LONGFORM_MEMORY_MB）
+
+上限は Python プロセスの常駐メモリです（ffmpeg のエンコーダーは別プロセスで、使用量は長さによらず一定）。
+
+    python longform_render.py --soak 60 --render-mode proxy     # 60分の合成音声・字幕で上限内に収まるかを確認
+
+GitHub: https://github.com/yusuke10151985/amvc
+"""
+
+import gc
+import os
+import time
+import tempfile
+import numpy as np
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence
+
+from render_settings import get_render_mode, subtitle_style
+from encoding_profiles import ffmpeg_encode_args, resolve_encoding_profile
+from subtitle_timeline import SubtitleTimeline
+from audio_cache import get_encoded_audio, prepare_audio_track
+from audio_visualizer import DEFAULT_BACKGROUND, make_background
+from beat_analysis import WavMemmap
+from ffmpeg_utils import FFmpegPipe, raw_video_input_args
+from hls_output import hls_playlist_path, write_hls_frames, remux_hls_to_mp4
+from frame_taps import preview_taps
+from job_workspace import JobWorkspace
+from memory_guard import PeakRssSampler, current_rss_mb, stage_memory
+from pipeline_metrics import stage_timer, increment
+from sample_data import stream_sample_audio
+
+LONGFORM_MEMORY_ENV = "AMVC_LONGFORM_MEMORY_MB"
+DEFAULT_MEMORY_CAP_MB = 1024
+LOOKAHEAD_SECONDS = 1.0        # 字幕を表示の何秒前にラスタライズするか
+MEMORY_CHECK_SECONDS = 10.0    # 常駐メモリを確認する間隔（動画内の秒数）
+MEMORY_CAP_STRIKES = 3         # 解放しても上限を超えた確認がこの回数続いたら中止
+
+SOAK_CUES_PER_MINUTE = 20
+SOAK_GROWTH_TOLERANCE_MB = 32  # 最初の 10% 以降に許容する常駐メモリの増加
+
+
+def resolve_memory_cap(memory_cap_mb: Optional[float] = None) -> float:
+    return float(memory_cap_mb or os.environ.get(LONGFORM_MEMORY_ENV) or DEFAULT_MEMORY_CAP_MB)
+
+
+def rasterize_subtitle(text: str, style: Dict):
+    """字幕1行を RGB と不透明度（uint8）の配列にラスタライズ（TextClip は作成後すぐに閉じる）"""
+    from music_video_pipeline import _rasterize_text
+
+    clip = _rasterize_text(text, style, style["color"])
+    try:
+        rgb = np.ascontiguousarray(clip.get_frame(0), dtype=np.uint8)
+        if clip.mask is not None:
+            alpha = np.round(clip.mask.get_frame(0) * 255).astype(np.uint8)
+        else:
+            alpha = np.full(rgb.shape[:2], 255, dtype=np.uint8)
+    finally:
+        clip.close()
+    return rgb, alpha
+
+
+class LazySubtitleLayer:
+    """
+    表示する字幕だけをラスタライズして保持する字幕レイヤー
+
+    フレームは時刻順に要求される前提です（逆方向のシークでは状態を作り直します）。
+    同時に保持するラスターは「表示中 + 先読み中」の行だけなので、字幕の総数に関係なく一定です。
+    """
+
+    def __init__(self, subtitles: SubtitleTimeline, style: Dict, width: int, height: int,
+                 lookahead: float = LOOKAHEAD_SECONDS,
+                 rasterize: Optional[Callable] = None):
+        """
+        Args:
+            rasterize: (テキスト, スタイル) → (rgb, alpha)（省略時は rasterize_subtitle）
+        """
+        self.subtitles = subtitles.sorted()
+        self.style = style
+        self.width = width
+        self.height = height
+        self.lookahead = lookahead
+        self.rasterize = rasterize or rasterize_subtitle
+        self._starts = self.subtitles.starts
+        self._ends = self.subtitles.ends
+        self._next = 0
+        self._last_t = -np.inf
+        self._live: Dict[int, tuple] = {}
+        self.rasterized = 0
+
+    def _reset(self):
+        self._live.clear()
+        self._next = 0
+
+    def _load(self, index: int) -> tuple:
+        """ラスタライズして、下端中央に置いたときの範囲に切り詰める（moviepy 版の set_position(('center', 'bottom'))）"""
+        with stage_timer("subtitle_rasterize"):
+            rgb, alpha = self.rasterize(self.subtitles.text(index), self.style)
+        self.rasterized += 1
+        height, width = alpha.shape
+        x0 = (self.width - width) // 2
+        y0 = self.height - height
+        # フレームからはみ出す部分は切り取る
+        left, top = max(0, -x0), max(0, -y0)
+        right, bottom = min(width, self.width - x0), min(height, self.height - y0)
+        rgb = np.ascontiguousarray(rgb[top:bottom, left:right])
+        alpha = np.ascontiguousarray(alpha[top:bottom, left:right])[:, :, None].astype(np.uint16)
+        return rgb.astype(np.uint16) * alpha, 255 - alpha, max(0, x0), max(0, y0)
+
+    def active(self, t: float) -> List[tuple]:
+        """時刻 t に表示する字幕のラスター（開始順）- 先読みと解放もここで行う"""
+        if t < self._last_t:
+            self._reset()
+        self._last_t = t
+
+        # 表示の LOOKAHEAD_SECONDS 前になった行をラスタライズ（すでに終わった行は飛ばす）
+        while self._next < len(self._starts) and self._starts[self._next] <= t + self.lookahead:
+            index = self._next
+            self._next += 1
+            if self._ends[index] > t and self._ends[index] > self._starts[index]:
+                self._live[index] = self._load(index)
+
+        # 表示が終わった行を解放
+        for index in [index for index in self._live if self._ends[index] <= t]:
+            del self._live[index]
+        return [raster for index, raster in self._live.items() if self._starts[index] <= t]
+
+    def trim(self, t: float) -> int:
+        """まだ表示していない先読み分を捨てる（メモリ上限を超えたとき）- 捨てた行は表示時に作り直す"""
+        pending = [index for index in self._live if self._starts[index] > t]
+        for index in pending:
+            del self._live[index]
+        if pending:
+            self._next = min(pending)
+        return len(pending)
+
+
+def longform_frames(make_background_frame: Callable, layer: Optional[LazySubtitleLayer]) -> Callable:
+    """背景に表示中の字幕をアルファ合成する make_frame(t)（字幕のある範囲だけを計算し、背景のバッファに上書き）"""
+    def make_frame(t):
+        frame = make_background_frame(t)
+        if layer is not None:
+            for premultiplied, inverse, x0, y0 in layer.active(t):
+                height, width = inverse.shape[:2]
+                region = frame[y0:y0 + height, x0:x0 + width]
+                region[:] = (premultiplied + region * inverse + 127) // 255
+        return frame
+
+    return make_frame
+
+
+class MemoryCap:
+    """
+    一定間隔で常駐メモリを確認し、上限を超えたら先読みした字幕を捨てて GC
+
+    解放しても上限を超えたままの確認が strikes 回続いたら MemoryError でレンダリングを中止する
+    （確認の間に一時的に超えることはあるので、上限は確認間隔の粒度で守られる）
+    """
+
+    def __init__(self, cap_mb: float, layer: Optional[LazySubtitleLayer], fps: float,
+                 interval: float = MEMORY_CHECK_SECONDS, strikes: int = MEMORY_CAP_STRIKES):
+        self.cap_mb = cap_mb
+        self.layer = layer
+        self.every = max(1, int(interval * fps))
+        self.strikes = strikes
+        self.peak_mb = current_rss_mb()
+        self.exceeded = 0
+        self.consecutive = 0
+
+    def check(self, index: int, t: float):
+        if index % self.every:
+            return
+        rss = current_rss_mb()
+        if rss > self.cap_mb:
+            trimmed = self.layer.trim(t) if self.layer is not None else 0
+            gc.collect()
+            rss = current_rss_mb()
+            increment("amvc_longform_memory_trims_total")
+        self.peak_mb = max(self.peak_mb, rss)
+        if rss <= self.cap_mb:
+            self.consecutive = 0
+            return
+        if not self.exceeded:
+            print(f"⚠️ 常駐メモリ {rss:.0f} MB が上限 {self.cap_mb:.0f} MB を超えています"
+                  f"（先読みの字幕 {trimmed} 行を解放済み）")
+        self.exceeded += 1
+        self.consecutive += 1
+        increment("amvc_longform_memory_exceeded_total")
+        if self.consecutive >= self.strikes:
+            increment("amvc_longform_memory_aborts_total")
+            raise MemoryError(f"常駐メモリ {rss:.0f} MB が上限 {self.cap_mb:.0f} MB を"
+                              f" {self.consecutive} 回続けて超えたため中止しました（{t:.0f}秒）")
+
+
+def iter_longform_frames(make_frame: Callable, duration: float, fps: float, guard: Optional[MemoryCap] = None,
+                         frame_taps=None):
+    """先頭から順にフレームを生成（フレームタップとメモリ確認もここで行う）"""
+    frame_count = max(1, int(round(duration * fps)))
+    for index in range(frame_count):
+        t = index / fps
+        frame = make_frame(t)
+        if frame_taps is not None:
+            frame_taps.capture(frame, t)
+        if guard is not None:
+            guard.check(index, t)
+        yield frame
+
+
+def render_longform(wav_file: str, srt_file: Optional[str], output_dir: str = "./outputs", render_mode: str = "full",
+                    encoding_profile: Optional[str] = None, target_render_time: Optional[float] = None,
+                    workspace_root: Optional[str] = None, container: str = "mp4",
+                    background: str = DEFAULT_BACKGROUND, hls: bool = False, previews: bool = False,
+                    preview_times: Optional[Sequence[float]] = None,
+                    memory_cap_mb: Optional[float] = None) -> Optional[str]:
+    """
+    ロングフォームモードで動画を生成（generate_video(..., long_form=True) から呼ばれます）
+
+    Returns:
+        生成された動画ファイルパス（失敗時は None）
+    """
+    mode = get_render_mode(render_mode)
+    width, height, fps = mode["width"], mode["height"], mode["fps"]
+    duration = WavMemmap(wav_file).duration
+    cap_mb = resolve_memory_cap(memory_cap_mb)
+    profile = resolve_encoding_profile(render_mode, encoding_profile, target_render_time, duration)
+    output_file = os.path.join(output_dir, f"{Path(wav_file).stem}_final_video{mode['file_suffix']}.{container}")
+    os.makedirs(output_dir, exist_ok=True)
+    print(f"\n🕰️ ロングフォームで動画生成開始... ({render_mode}: {width}x{height} @ {fps}fps, "
+          f"{duration / 60:.1f}分, メモリ上限 {cap_mb:.0f} MB)")
+
+    layer = None
+    if srt_file:
+        layer = LazySubtitleLayer(SubtitleTimeline.read(srt_file), subtitle_style(mode), width, height)
+    make_frame = longform_frames(make_background(background, wav_file, width, height, fps), layer)
+    guard = MemoryCap(cap_mb, layer, fps)
+    taps = preview_taps(srt_file, duration, fps, preview_times) if previews else None
+    frames = iter_longform_frames(make_frame, duration, fps, guard, taps)
+
+    try:
+        with JobWorkspace(root=workspace_root) as workspace, stage_memory("render"):
+            scratch_output = workspace.file(os.path.basename(output_file))
+            if hls:
+                playlist_file = hls_playlist_path(output_file)
+                with stage_timer("encode"):
+                    write_hls_frames(frames, width, height, fps, get_encoded_audio(wav_file), playlist_file, profile)
+                remux_hls_to_mp4(playlist_file, scratch_output)
+            else:
+                args = raw_video_input_args(width, height, fps) + [
+                    "-i", prepare_audio_track(wav_file, output_file),
+                    "-map", "0:v:0",
+                    "-map", "1:a:0",
+                ] + ffmpeg_encode_args(profile) + ["-c:a", "copy", "-shortest"]
+                if output_file.lower().endswith((".mp4", ".mov", ".m4v")):
+                    args += ["-movflags", "+faststart"]
+                print(f"💾 動画エクスポート中: {output_file} (プロファイル: {profile})")
+                with stage_timer("encode"), FFmpegPipe(args + [scratch_output]) as pipe:
+                    for frame in frames:
+                        pipe.write(frame)
+            workspace.publish(scratch_output, output_file)
+    except Exception as e:
+        print(f"❌ 動画エクスポートエラー: {e}")
+        return None
+
+    print(f"✅ 動画生成完了: {output_file}（ピーク常駐メモリ {guard.peak_mb:.0f} MB、"
+          f"字幕 {layer.rasterized if layer else 0} 行をラスタライズ）")
+    if taps:
+        try:
+            taps.write(output_file)
+        except Exception as e:
+            print(f"⚠️ プレビュー作成エラー: {e}")
+    return output_file
+
+
+# ===== ソークテスト =====
+
+def soak_test(minutes: float = 60.0, render_mode: str = "proxy", background: str = "spectrum",
+              memory_cap_mb: Optional[float] = None, cues_per_minute: int = SOAK_CUES_PER_MINUTE,
+              encode: bool = False, rasterize: Optional[Callable] = None) -> Dict:
+    """
+    長時間の合成音声・字幕で全フレームを生成し、常駐メモリが上限内に収まり長さに比例して増えないことを確認
+
+    Args:
+        encode: True なら ffmpeg でエンコードして捨てる（-f null）、False ならフレーム生成だけ
+        rasterize: 字幕のラスタライズ関数（省略時は TextClip）
+
+    Returns:
+        {"passed", "peak_rss_mb", "rss_after_warmup_mb", "rss_end_mb", "growth_mb", "cap_mb", "aborted", ...}
+    """
+    mode = get_render_mode(render_mode)
+    width, height, fps = mode["width"], mode["height"], mode["fps"]
+    duration = minutes * 60
+    cap_mb = resolve_memory_cap(memory_cap_mb)
+    print(f"🧪 ソークテスト: {minutes:.0f}分 / {render_mode} / {background} / 上限 {cap_mb:.0f} MB")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # 0.5 秒ごとに音程が変わるメロディー（チャンクごとに書き出すので長時間でもメモリは一定）
+        wav_file = stream_sample_audio(os.path.join(tmp_dir, "soak.wav"), duration, note_duration=0.5)
+        cue_count = int(minutes * cues_per_minute)
+        starts = np.arange(cue_count) * (60.0 / cues_per_minute)
+        subtitles = SubtitleTimeline(starts, starts + 0.8 * 60.0 / cues_per_minute,
+                                     [f"Soak test line {i + 1} / {cue_count}" for i in range(cue_count)])
+
+        start = time.perf_counter()
+        layer = LazySubtitleLayer(subtitles, subtitle_style(mode), width, height, rasterize=rasterize)
+        make_frame = longform_frames(make_background(background, wav_file, width, height, fps), layer)
+        guard = MemoryCap(cap_mb, layer, fps)
+        warmup_frames = max(1, int(duration * fps) // 10)
+        rss_after_warmup = None
+        aborted = None
+
+        with PeakRssSampler(interval=0.05) as sampler:
+            pipe = FFmpegPipe(raw_video_input_args(width, height, fps) + ["-f", "null", "-"]) if encode else None
+            try:
+                for index, frame in enumerate(iter_longform_frames(make_frame, duration, fps, guard)):
+                    if pipe is not None:
+                        pipe.write(frame)
+                    if index == warmup_frames:
+                        gc.collect()
+                        rss_after_warmup = current_rss_mb()
+            except MemoryError as e:
+                aborted = str(e)
+                print(f"❌ {aborted}")
+            finally:
+                if pipe is not None:
+                    pipe.close()
+        gc.collect()
+        rss_end = current_rss_mb()
+
+    growth = rss_end - (rss_after_warmup or rss_end)
+    result = {
+        "minutes": minutes,
+        "render_mode": render_mode,
+        "background": background,
+        "frames": int(round(duration * fps)),
+        "cues": cue_count,
+        "cues_rasterized": layer.rasterized,
+        "elapsed": time.perf_counter() - start,
+        "cap_mb": cap_mb,
+        "peak_rss_mb": max(sampler.peak_mb, guard.peak_mb),
+        "rss_after_warmup_mb": rss_after_warmup,
+        "rss_end_mb": rss_end,
+        "growth_mb": growth,
+        "aborted": aborted,
+    }
+    result["passed"] = (not aborted and result["peak_rss_mb"] <= cap_mb
+                        and growth <= SOAK_GROWTH_TOLERANCE_MB)
+
+    print(f"   ピーク {result['peak_rss_mb']:.0f} MB / 上限 {cap_mb:.0f} MB、"
+          f"最初の 10% 以降の増加 {growth:+.1f} MB（{result['elapsed']:.0f}秒）")
+    print("✅ 上限内で一定でした" if result["passed"] else "❌ 上限を超えたか、メモリが増え続けています")
+    return result
+
+
+if __name__ == "__main__":
+    import sys
+    import json
+    import argparse
+
+    parser = argparse.ArgumentParser(description="ロングフォーム レンダリング / ソークテスト")
+    parser.add_argument("wav_file", nargs="?")
+    parser.add_argument("srt_file", nargs="?")
+    parser.add_argument("--output-dir", default="./outputs")
+    parser.add_argument("--render-mode", default="full")
+    parser.add_argument("--encoding-profile")
+    parser.add_argument("--background", help="省略時は gradient（ソークテストは spectrum）")
+    parser.add_argument("--memory-cap-mb", type=float)
+    parser.add_argument("--hls", action="store_true")
+    parser.add_argument("--soak", type=float, metavar="MINUTES", help="指定した長さのソークテストを実行")
+    parser.add_argument("--encode", action="store_true", help="ソークテストでエンコードも行う")
+    args = parser.parse_args()
+
+    if args.soak:
+        result = soak_test(args.soak, args.render_mode, args.background or "spectrum", args.memory_cap_mb,
+                           encode=args.encode)
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+        sys.exit(0 if result["passed"] else 1)
+    if not args.wav_file:
+        parser.error("wav_file is required (or use --soak)")
+    render_longform(args.wav_file, args.srt_file, args.output_dir, args.render_mode, args.encoding_profile,
+                    background=args.background or DEFAULT_BACKGROUND, hls=args.hls, memory_cap_mb=args.memory_cap_mb)
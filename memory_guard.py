@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🧠 メモリ計測・ガードレールモジュール
+ステージごとのピークRSS / tracemalloc スナップショットをジョブ記録に保存し、
+空きメモリが予算を下回るステージは省メモリ版（チャンク処理・低並列度）に自動で切り替えます。
+
+- 予算の変更: set_memory_budget("whisper_transcribe", 3000) または環境変数 AMVC_MEMORY_BUDGETS='{"render": 2048}'
+- tracemalloc: enable_tracemalloc() または環境変数 AMVC_TRACEMALLOC=1
+
+GitHub: https://github.com/yusuke10151985/amvc
+"""
+
+import os
+import sys
+import json
+import threading
+import tracemalloc
+from contextlib import contextmanager
+from typing import Optional
+
+from pipeline_metrics import current_job, is_enabled, observe
+
+# 通常版を安全に実行するために必要な空きメモリ（MB）
+MEMORY_BUDGETS = {
+    "whisper_transcribe": 2048,
+    "render": 1536,
+}
+MEMORY_BUDGETS.update(json.loads(os.environ.get("AMVC_MEMORY_BUDGETS", "{}")))
+
+TRACEMALLOC_TOP = 5
+
+_tracemalloc_enabled = os.environ.get("AMVC_TRACEMALLOC", "") not in ("", "0")
+
+
+def set_memory_budget(stage: str, megabytes: float):
+    """ステージのメモリ予算を設定"""
+    MEMORY_BUDGETS[stage] = megabytes
+
+
+def enable_tracemalloc(enabled: bool = True):
+    """ステージごとの tracemalloc スナップショット記録を切り替え（Pythonの割り当て追跡は低速）"""
+    global _tracemalloc_enabled
+    _tracemalloc_enabled = enabled
+
+
+def current_rss_mb() -> float:
+    """現在の常駐メモリ（MB）"""
+    try:
+        with open("/proc/self/statm") as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError):
+        import resource
+        # /proc がない環境（macOS など）はプロセス全体のピークで代用
+        maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return maxrss / (1024 * 1024) if sys.platform == "darwin" else maxrss / 1024
+
+
+def _read_int(path: str) -> Optional[int]:
+    try:
+        with open(path) as f:
+            value = f.read().strip()
+        return None if value == "max" else int(value)
+    except (OSError, ValueError):
+        return None
+
+
+def available_memory_mb() -> Optional[float]:
+    """利用可能なメモリ（MB）- cgroup の上限があればそちらを優先（コンテナのOOM killerはcgroup単位）"""
+    candidates = []
+
+    limit = _read_int("/sys/fs/cgroup/memory.max")
+    usage = _read_int("/sys/fs/cgroup/memory.current")
+    if limit is not None and usage is not None:
+        candidates.append((limit - usage) / (1024 * 1024))
+
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    candidates.append(int(line.split()[1]) / 1024)
+                    break
+    except OSError:
+        pass
+
+    return min(candidates) if candidates else None
+
+
+def should_use_low_memory(stage: str) -> bool:
+    """空きメモリがステージの予算を下回る場合 True（省メモリ版に切り替える）"""
+    budget = MEMORY_BUDGETS.get(stage)
+    available = available_memory_mb()
+    if budget is None or available is None:
+        return False
+    if available < budget:
+        print(f"🧠 空きメモリ {available:.0f} MB < 予算 {budget:.0f} MB - {stage} を省メモリモードで実行します")
+        job = current_job()
+        if job is not None:
+            job.setdefault("low_memory_stages", []).append(stage)
+        return True
+    return False
+
+
+class PeakRssSampler:
+    """ステージ実行中の常駐メモリを別スレッドでサンプリングしてピークを記録"""
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.start_mb = 0.0
+        self.peak_mb = 0.0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak_mb = max(self.peak_mb, current_rss_mb())
+            self._stop.wait(self.interval)
+
+    def __enter__(self) -> "PeakRssSampler":
+        self.start_mb = self.peak_mb = current_rss_mb()
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._stop.set()
+        self._thread.join()
+        self.peak_mb = max(self.peak_mb, current_rss_mb())
+
+
+def _top_allocations(snapshot, limit: int = TRACEMALLOC_TOP):
+    return [
+        {"location": str(stat.traceback), "size_mb": stat.size / (1024 * 1024), "count": stat.count}
+        for stat in snapshot.statistics("lineno")[:limit]
+    ]
+
+
+@contextmanager
+def stage_memory(stage: str):
+    """
+    ステージのメモリ使用量をジョブ記録（job["memory"][stage]）に保存
+
+    計測無効かつジョブ外では何もしません。
+    """
+    job = current_job()
+    if job is None and not is_enabled():
+        yield None
+        return
+
+    started_tracemalloc = False
+    if _tracemalloc_enabled and not tracemalloc.is_tracing():
+        tracemalloc.start()
+        started_tracemalloc = True
+    elif tracemalloc.is_tracing():
+        tracemalloc.reset_peak()
+
+    record = {}
+    try:
+        with PeakRssSampler() as sampler:
+            yield record
+    finally:
+        record.update({
+            "rss_start_mb": sampler.start_mb,
+            "rss_end_mb": current_rss_mb(),
+            "peak_rss_mb": sampler.peak_mb,
+        })
+        if tracemalloc.is_tracing():
+            _, traced_peak = tracemalloc.get_traced_memory()
+            record["tracemalloc_peak_mb"] = traced_peak / (1024 * 1024)
+            record["top_allocations"] = _top_allocations(tracemalloc.take_snapshot())
+            if started_tracemalloc:
+                tracemalloc.stop()
+
+        observe("amvc_stage_peak_rss_mb", sampler.peak_mb,
+                buckets=(128, 256, 512, 1024, 2048, 4096, 8192, 16384), stage=stage)
+        if job is not None:
+            job.setdefault("memory", {})[stage] = record
@@ -0,0 +1,647 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🎵 AI音楽ビデオジェネレーター - パイプラインモジュール
+アライメント・字幕プレビュー・動画生成の関数群（インポート可能版）
+
+Colabスクリプトと同じ処理を、他のモジュールやツールから呼び出せるようにまとめたものです。
+
+GitHub: https://github.com/yusuke10151985/amvc
+"""
+
+import os
+import json
+import numpy as np
+import moviepy.editor as mp
+from pathlib import Path
+from typing import Tuple, Optional, Sequence
+
+from render_settings import get_render_mode, subtitle_style
+from encoding_profiles import resolve_encoding_profile, write_videofile_kwargs
+from job_workspace import JobWorkspace
+from audio_cache import get_encoded_audio, prepare_audio_track, mux_audio
+from pipeline_metrics import stage_timer, increment, timed_frames
+from memory_guard import should_use_low_memory, stage_memory
+from ffmpeg_utils import read_ffmpeg_output, concat_videos
+from subtitle_timeline import SubtitleTimeline, format_timestamps
+from filtergraph_renderer import render_filtergraph
+from transcription_backends import get_transcription_backend
+from transcription_cache import transcription_key, load_transcription, store_transcription
+from alignment_format import AlignmentFile, ALIGNMENT_EXTENSION, read_alignment, write_alignment_arrays
+from waveform_peaks import waveform_peaks_path, write_waveform_peaks
+from audio_visualizer import BACKGROUNDS, DEFAULT_BACKGROUND, make_background
+from hls_output import hls_playlist_path, write_hls_frames, remux_hls_to_mp4
+from frame_taps import preview_taps
+from longform_render import render_longform
+
+# 省メモリモード: 時間チャンクの長さ（秒）とエンコーダーのスレッド数
+LOW_MEMORY_CHUNK_SECONDS = 300
+LOW_MEMORY_THREADS = 2
+WHISPER_SAMPLE_RATE = 16000
+
+# 動画の描画方法: moviepy（Pythonでフレーム合成）/ ffmpeg（フィルターグラフで完結）
+RENDERERS = ("moviepy", "ffmpeg")
+
+
+# ===== アライメント =====
+def _transcribe_chunked(backend, wav_file: str, chunk_seconds: float = LOW_MEMORY_CHUNK_SECONDS, **options):
+    """省メモリ版の音声認識: 音声全体を展開せず、チャンクごとにデコードして認識"""
+    segments = []
+    offset = 0.0
+
+    while True:
+        pcm = read_ffmpeg_output([
+            "-ss", str(offset), "-t", str(chunk_seconds), "-i", wav_file,
+            "-f", "s16le", "-ac", "1", "-ar", str(WHISPER_SAMPLE_RATE), "-"
+        ])
+        if not pcm:
+            break
+        audio = np.frombuffer(pcm, np.int16).astype(np.float32) / 32768.0
+        result = backend.transcribe(audio, **options)
+        for segment in result["segments"]:
+            segment["start"] += offset
+            segment["end"] += offset
+            for word in segment.get("words", []):
+                word["start"] += offset
+                word["end"] += offset
+            segments.append(segment)
+        offset += chunk_seconds
+
+    return {"segments": segments, "text": "".join(segment["text"] for segment in segments)}
+
+
+def _write_waveform_sidecar(wav_file: str, output_dir: str) -> Optional[str]:
+    """プレイヤー用の波形ピークをアライメント出力と並べて保存（失敗してもアライメントは続行）"""
+    try:
+        return write_waveform_peaks(wav_file, waveform_peaks_path(wav_file, output_dir))
+    except Exception as e:
+        print(f"⚠️ 波形ピークの作成をスキップ: {e}")
+        return None
+
+
+def simple_align_subtitles(wav_file: str, lyrics_file: str, output_dir: str = "./outputs"):
+    """シンプルな時間ベースアライメント（フォールバック）"""
+    print("\n🎯 シンプルアライメント開始...")
+
+    os.makedirs(output_dir, exist_ok=True)
+
+    try:
+        with stage_timer("audio_probe"):
+            audio_clip = mp.AudioFileClip(wav_file)
+            audio_duration = audio_clip.duration
+            audio_clip.close()
+        print(f"🎵 音声の長さ: {audio_duration:.2f}秒")
+    except Exception as e:
+        print(f"❌ 音声ファイル読み込みエラー: {e}")
+        return None, None
+
+    try:
+        with open(lyrics_file, 'r', encoding='utf-8') as f:
+            lyrics_lines = [line.strip() for line in f.readlines() if line.strip()]
+        print(f"📝 歌詞行数: {len(lyrics_lines)}")
+    except Exception as e:
+        print(f"❌ 歌詞ファイル読み込みエラー: {e}")
+        return None, None
+
+    if len(lyrics_lines) == 0:
+        print("❌ 歌詞が見つかりません")
+        return None, None
+
+    time_per_line = audio_duration / len(lyrics_lines)
+
+    base_name = Path(wav_file).stem
+    srt_output = os.path.join(output_dir, f"{base_name}_subtitles.srt")
+    json_output = os.path.join(output_dir, f"{base_name}_alignment.json")
+    binary_output = os.path.join(output_dir, f"{base_name}_alignment{ALIGNMENT_EXTENSION}")
+
+    starts = np.arange(len(lyrics_lines)) * time_per_line
+    subtitles = SubtitleTimeline(starts, starts + time_per_line, lyrics_lines)
+    json_data = {
+        "words": [
+            {"case": "success", "start": cue.start, "end": cue.end, "word": cue.text}
+            for cue in subtitles
+        ],
+        "audio_duration": audio_duration,
+    }
+
+    try:
+        with stage_timer("alignment_write"):
+            subtitles.write(srt_output)
+            with open(json_output, 'w', encoding='utf-8') as f:
+                json.dump(json_data, f, ensure_ascii=False, indent=2)
+            write_alignment_arrays(binary_output, subtitles.starts, subtitles.ends, lyrics_lines, audio_duration)
+        peaks_output = _write_waveform_sidecar(wav_file, output_dir)
+
+        print(f"✅ シンプルアライメント完了！")
+        print(f"   • SRT: {srt_output}")
+        print(f"   • JSON: {json_output}")
+        print(f"   • バイナリ: {binary_output}")
+        if peaks_output:
+            print(f"   • 波形: {peaks_output}")
+        return srt_output, json_output
+    except Exception as e:
+        print(f"❌ ファイル保存エラー: {e}")
+        return None, None
+
+
+def advanced_align_with_whisper(wav_file: str, lyrics_file: str, output_dir: str = "./outputs",
+                                backend: Optional[str] = None) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Whisperを使用した高度なアライメント
+
+    Args:
+        backend: 音声認識バックエンド（"whisper" / "faster-whisper"、省略時は AMVC_TRANSCRIPTION_BACKEND または whisper）
+    """
+    print("\n🎯 Whisper高度アライメント開始...")
+
+    os.makedirs(output_dir, exist_ok=True)
+
+    try:
+        transcriber = get_transcription_backend(backend)
+
+        # word_timestamps: カラオケ表示用の単語単位タイミング
+        options = {"word_timestamps": True}
+
+        # 空きメモリが少なければチャンクごとに認識（分割条件もキャッシュキーに含める）
+        low_memory = should_use_low_memory("whisper_transcribe")
+        chunking = None
+        if low_memory:
+            chunking = {"chunk_seconds": LOW_MEMORY_CHUNK_SECONDS, "sample_rate": WHISPER_SAMPLE_RATE}
+
+        # 同じ音声・モデル・オプション・分割条件の認識結果があれば、モデルの読み込みも音声認識も省略
+        cache_key = transcription_key(wav_file, transcriber.cache_name, options, chunking)
+        result = load_transcription(cache_key)
+
+        if result is None:
+            # Whisperモデル読み込み
+            print(f"🤖 Whisperモデル読み込み中... ({transcriber.name})")
+            with stage_timer("whisper_load"):
+                transcriber.load()
+
+            # 音声認識
+            print("🎵 音声認識中...")
+            with stage_timer("whisper_transcribe"), stage_memory("whisper_transcribe"):
+                if low_memory:
+                    result = _transcribe_chunked(transcriber, wav_file, LOW_MEMORY_CHUNK_SECONDS, **options)
+                else:
+                    result = transcriber.transcribe(wav_file, **options)
+            store_transcription(cache_key, result)
+
+        # 歌詞読み込み
+        with open(lyrics_file, 'r', encoding='utf-8') as f:
+            lyrics_lines = [line.strip() for line in f.readlines() if line.strip()]
+
+        # セグメント作成
+        segments = result["segments"]
+
+        base_name = Path(wav_file).stem
+        srt_output = os.path.join(output_dir, f"{base_name}_whisper_subtitles.srt")
+        json_output = os.path.join(output_dir, f"{base_name}_whisper_alignment.json")
+        binary_output = os.path.join(output_dir, f"{base_name}_whisper_alignment{ALIGNMENT_EXTENSION}")
+        words_output = os.path.join(output_dir, f"{base_name}_whisper_words{ALIGNMENT_EXTENSION}")
+
+        # セグメントを字幕に変換（対応する歌詞があればそちらを使用）
+        texts = [
+            lyrics_lines[i] if i < len(lyrics_lines) else segment["text"].strip()
+            for i, segment in enumerate(segments)
+        ]
+        subtitles = SubtitleTimeline(
+            [segment["start"] for segment in segments], [segment["end"] for segment in segments], texts
+        )
+        json_data = {
+            "words": [
+                {
+                    "case": "success",
+                    "start": segment["start"],
+                    "end": segment["end"],
+                    "word": text,
+                    "confidence": segment.get("confidence", 0.0)
+                }
+                for segment, text in zip(segments, texts)
+            ],
+            "audio_duration": result["segments"][-1]["end"] if segments else 0,
+        }
+
+        # 保存
+        with stage_timer("alignment_write"):
+            subtitles.write(srt_output)
+            with open(json_output, 'w', encoding='utf-8') as f:
+                json.dump(json_data, f, ensure_ascii=False, indent=2)
+            write_alignment_arrays(
+                binary_output, subtitles.starts, subtitles.ends, texts, json_data["audio_duration"],
+                confidence=[segment.get("confidence", 0.0) for segment in segments]
+            )
+            words = [word for segment in segments for word in segment.get("words", [])]
+            write_alignment_arrays(
+                words_output,
+                [word["start"] for word in words],
+                [word["end"] for word in words],
+                [word["word"].strip() for word in words],
+                json_data["audio_duration"],
+                confidence=[word.get("probability", 0.0) for word in words]
+            )
+        peaks_output = _write_waveform_sidecar(wav_file, output_dir)
+
+        print(f"✅ Whisperアライメント完了！")
+        print(f"   • SRT: {srt_output}")
+        print(f"   • JSON: {json_output}")
+        print(f"   • バイナリ: {binary_output}")
+        print(f"   • 単語タイミング: {words_output} ({len(words)} 語)")
+        if peaks_output:
+            print(f"   • 波形: {peaks_output}")
+        return srt_output, json_output
+
+    except Exception as e:
+        print(f"❌ Whisperアライメントエラー: {e}")
+        print("   シンプルアライメントに切り替えます...")
+        return simple_align_subtitles(wav_file, lyrics_file, output_dir)
+
+
+# ===== プレビュー =====
+def preview_subtitles(srt_file: str, lines_to_show: int = 5):
+    """字幕のプレビュー表示"""
+    print(f"\n📖 字幕プレビュー (最初の{lines_to_show}行):")
+    print("="*50)
+
+    try:
+        subtitles = SubtitleTimeline.read(srt_file)
+        preview = subtitles[:lines_to_show]
+        for cue, start, end in zip(preview, format_timestamps(preview.starts), format_timestamps(preview.ends)):
+            print(f"{cue.index}")
+            print(f"{start} --> {end}")
+            print(f"{cue.text}")
+            print()
+
+        if len(subtitles) > lines_to_show:
+            print(f"... 他 {len(subtitles) - lines_to_show} エントリ")
+    except Exception as e:
+        print(f"❌ SRTファイル読み込みエラー: {e}")
+
+
+# ===== 動画生成 =====
+def _rasterize_text(text: str, style: dict, color: str):
+    """字幕テキストをラスタライズ（TextClip作成時にImageMagickで画像化される）"""
+    try:
+        return mp.TextClip(
+            text,
+            fontsize=style["fontsize"],
+            color=color,
+            font='Arial-Bold',
+            stroke_color='black',
+            stroke_width=style["stroke_width"],
+            size=(style["text_width"], None)
+        )
+    except Exception as e:
+        print(f"⚠️ 字幕クリップ作成エラー: {e}")
+        return mp.TextClip(
+            text,
+            fontsize=style["fallback_fontsize"],
+            color=color
+        )
+
+
+def load_word_timeline(words_file: str) -> SubtitleTimeline:
+    """単語単位のアライメント（.aln / .json）をタイムラインとして読み込み"""
+    if words_file.endswith(ALIGNMENT_EXTENSION):
+        with AlignmentFile(words_file) as alignment:
+            return SubtitleTimeline(alignment.starts, alignment.ends, alignment.words)
+    words = [word for word in read_alignment(words_file)["words"] if "start" in word and "end" in word]
+    return SubtitleTimeline([w["start"] for w in words], [w["end"] for w in words], [w["word"] for w in words])
+
+
+def _karaoke_clip(text: str, start_time: float, duration: float, word_starts: np.ndarray,
+                  word_ends: np.ndarray, word_texts, style: dict):
+    """
+    カラオケ字幕クリップ
+
+    行を通常色・ハイライト色で1回ずつラスタライズしておき、各フレームでは単語の境界から
+    np.interp で求めた位置までハイライト側の列をコピーするだけにします（フレームごとの再ラスタライズなし）。
+    単語タイミングがない行は行全体の長さで均等に進めます。
+    """
+    base_clip = _rasterize_text(text, style, style["color"])
+    highlight_clip = _rasterize_text(text, style, style["highlight_color"])
+    base = base_clip.get_frame(0)
+    highlight = highlight_clip.get_frame(0)
+    if highlight.shape != base.shape:
+        highlight = base
+    mask = base_clip.mask.set_duration(duration) if base_clip.mask is not None else None
+
+    # 文字が描かれている列の範囲（size 指定でテキストは中央寄せされる）
+    if mask is not None:
+        ink_columns = np.flatnonzero(mask.get_frame(0).max(axis=0) > 0)
+    else:
+        ink_columns = np.flatnonzero(base.max(axis=(0, 2)) > 0)
+    left, right = (int(ink_columns[0]), int(ink_columns[-1]) + 1) if len(ink_columns) else (0, base.shape[1])
+
+    # 時刻 → 進捗（0〜1）の折れ線: 単語ごとに文字数の比率で幅を割り当て
+    if len(word_starts):
+        lengths = np.array([max(1, len(word)) for word in word_texts], dtype=np.float64)
+        edges = np.concatenate([[0.0], np.cumsum(lengths)]) / lengths.sum()
+        knot_times = np.maximum.accumulate(np.column_stack([word_starts, word_ends]).ravel() - start_time)
+        knot_progress = np.column_stack([edges[:-1], edges[1:]]).ravel()
+    else:
+        knot_times = np.array([0.0, duration])
+        knot_progress = np.array([0.0, 1.0])
+
+    frame = base.copy()
+
+    def make_frame(t):
+        cut = left + int(round(np.interp(t, knot_times, knot_progress) * (right - left)))
+        frame[:, :cut] = highlight[:, :cut]
+        frame[:, cut:] = base[:, cut:]
+        return frame
+
+    base_clip.close()
+    highlight_clip.close()
+    clip = mp.VideoClip(make_frame, duration=duration)
+    if mask is not None:
+        clip = clip.set_mask(mask)
+    return clip.set_position(('center', 'bottom')).set_start(start_time)
+
+
+def _create_subtitle_clips(subtitles, style: dict, window_start: float = 0.0, window_end: Optional[float] = None,
+                           words: Optional[SubtitleTimeline] = None):
+    """
+    字幕クリップを作成（window 指定時はその区間に重なる字幕だけを区間の先頭基準で作成）
+
+    words（単語単位のタイムライン）を渡すとカラオケ表示になります。
+    """
+    subtitle_clips = []
+
+    if window_end is not None:
+        subtitles = subtitles.select(subtitles.window(window_start, window_end))
+        subtitles = subtitles.clamp(window_start, window_end).shift(-window_start)
+        if words is not None:
+            words = words.select(words.window(window_start, window_end)).shift(-window_start)
+
+    if words is not None:
+        # 単語の中点が含まれる行に割り当て（単語は時刻順）
+        words = words.sorted()
+        word_texts = words.texts
+        word_line = np.searchsorted(subtitles.starts, (words.starts + words.ends) / 2, side='right') - 1
+
+    for i, subtitle in enumerate(subtitles):
+        start_time = subtitle.start
+        duration = subtitle.end - subtitle.start
+
+        if duration > 0:
+            if words is not None:
+                first, last = np.searchsorted(word_line, [i, i + 1])
+                txt_clip = _karaoke_clip(subtitle.text, start_time, duration, words.starts[first:last],
+                                         words.ends[first:last], word_texts[first:last], style)
+            else:
+                txt_clip = _rasterize_text(subtitle.text, style, style["color"]).set_position(
+                    ('center', 'bottom')).set_start(start_time).set_duration(duration)
+            subtitle_clips.append(txt_clip)
+
+    increment("amvc_subtitle_clips_total", len(subtitle_clips))
+    return subtitle_clips
+
+
+def add_subtitles_to_video(video_clip, srt_file: str, render_mode: str = "full", words_file: Optional[str] = None):
+    """動画に字幕を焼き込み（出力解像度でネイティブにラスタライズ、words_file 指定時はカラオケ表示）"""
+    style = subtitle_style(get_render_mode(render_mode))
+    try:
+        subtitles = SubtitleTimeline.read(srt_file)
+        words = load_word_timeline(words_file) if words_file else None
+
+        # テキストのラスタライズ（TextClip作成時にImageMagickで画像化される）
+        with stage_timer("subtitle_rasterize"):
+            subtitle_clips = _create_subtitle_clips(subtitles, style, words=words)
+
+        if subtitle_clips:
+            print(f"📝 {len(subtitle_clips)} 個の字幕クリップを追加中...")
+            with stage_timer("composite_setup"):
+                return mp.CompositeVideoClip([video_clip] + subtitle_clips)
+        else:
+            return video_clip
+    except Exception as e:
+        print(f"⚠️ 字幕追加エラー: {e}")
+        return video_clip
+
+
+def _iter_chunk_clips(make_frame, duration: float, srt_file: str, render_mode: str,
+                      chunk_seconds: float = LOW_MEMORY_CHUNK_SECONDS, words_file: Optional[str] = None,
+                      frame_taps=None):
+    """
+    時間チャンクごとの合成クリップ（字幕レイヤーはチャンク内の分だけ作成し、次のチャンクへ進むときに閉じる）
+
+    Args:
+        frame_taps: 書き出し中のフレームを取り出す FrameTaps（frame_taps.py）
+    """
+    mode = get_render_mode(render_mode)
+    style = subtitle_style(mode)
+    subtitles = SubtitleTimeline.read(srt_file)
+    words = load_word_timeline(words_file) if words_file else None
+
+    chunk_start = 0.0
+    while chunk_start < duration:
+        chunk_end = min(duration, chunk_start + chunk_seconds)
+        background = mp.VideoClip(lambda t, offset=chunk_start: make_frame(t + offset),
+                                  duration=chunk_end - chunk_start)
+
+        with stage_timer("subtitle_rasterize"):
+            subtitle_clips = _create_subtitle_clips(subtitles, style, chunk_start, chunk_end, words)
+        chunk = mp.CompositeVideoClip([background] + subtitle_clips) if subtitle_clips else background
+        yield frame_taps.attach(chunk, offset=chunk_start) if frame_taps else chunk
+
+        for clip in subtitle_clips:
+            clip.close()
+        chunk.close()
+        chunk_start = chunk_end
+
+
+def _write_video_chunked(make_frame, duration: float, srt_file: str, render_mode: str, profile: str,
+                         workspace, output_file: str, chunk_seconds: float = LOW_MEMORY_CHUNK_SECONDS,
+                         words_file: Optional[str] = None, frame_taps=None):
+    """
+    省メモリ版の書き出し: 時間チャンクごとに字幕を作成・エンコードし、ストリームコピーで結合
+
+    同時に保持する字幕レイヤーはチャンク内の分だけになり、エンコーダーのスレッド数も抑えます。
+    """
+    mode = get_render_mode(render_mode)
+    kwargs = dict(write_videofile_kwargs(profile), threads=LOW_MEMORY_THREADS)
+    extension = os.path.splitext(output_file)[1]
+
+    chunk_files = []
+    for chunk in _iter_chunk_clips(make_frame, duration, srt_file, render_mode, chunk_seconds, words_file,
+                                   frame_taps):
+        chunk_file = workspace.file(f"chunk_{len(chunk_files):04d}{extension}")
+        timed_frames(chunk).write_videofile(
+            chunk_file,
+            fps=mode["fps"],
+            audio=False,
+            verbose=False,
+            logger=None,
+            **kwargs
+        )
+        chunk_files.append(chunk_file)
+
+    concat_videos(chunk_files, output_file)
+    for chunk_file in chunk_files:
+        os.remove(chunk_file)
+    return output_file
+
+
+def generate_video(wav_file: str, srt_file: str, output_dir: str = "./outputs", render_mode: str = "full",
+                   encoding_profile: Optional[str] = None, target_render_time: Optional[float] = None,
+                   workspace_root: Optional[str] = None, container: str = "mp4", words_file: Optional[str] = None,
+                   renderer: str = "moviepy", background: str = DEFAULT_BACKGROUND, hls: bool = False,
+                   previews: bool = False, preview_times: Optional[Sequence[float]] = None,
+                   long_form: bool = False, memory_cap_mb: Optional[float] = None):
+    """
+    最終的な音楽ビデオを生成
+
+    Args:
+        wav_file: 音声ファイルパス
+        srt_file: 字幕ファイルパス
+        output_dir: 出力ディレクトリ
+        render_mode: "full"（1920x1080・24fps）または "proxy"（字幕タイミング確認用の低解像度プレビュー）
+        encoding_profile: "draft" / "standard" / "archive"（省略時はモードの既定値）
+        target_render_time: 目標エンコード時間（秒）- キャリブレーション結果からプロファイルを自動選択
+        workspace_root: 中間ファイル用の作業ルート（"ram" でRAMディスク）
+        container: 出力コンテナ（"mp4"、または音声をPCMのままパススルーする "mov" / "mkv"）
+        words_file: 単語単位のアライメント（*_whisper_words.aln）- 指定するとカラオケ表示
+        renderer: "moviepy" または "ffmpeg"（フィルターグラフ版、カラオケ表示は非対応）
+        background: "gradient" / "pulse" / "spectrum"（pulse・spectrum は音声に反応、audio_visualizer.py）
+        hls: エンコードしながら HLS（{動画名}.m3u8 + fMP4 セグメント）を出力ディレクトリに書き出し、
+             レンダリング中から再生できるようにする（完成後の MP4 はセグメントのリマックスで作成、hls_output.py）
+        previews: 書き出し中のフレームからサムネイル・コンタクトシート・プレビュー GIF を作成（frame_taps.py）
+        preview_times: サムネイルの時刻（秒）- 省略時はサビの開始と等間隔の時刻
+        long_form: 1時間以上の動画向け - 字幕を表示直前にラスタライズして終了後に解放し、常駐メモリを
+                   memory_cap_mb（省略時は AMVC_LONGFORM_MEMORY_MB）以下に保つ（longform_render.py、カラオケ表示は非対応）
+
+    Returns:
+        生成された動画ファイルパス
+    """
+    if renderer not in RENDERERS:
+        raise ValueError(f"Unknown renderer: {renderer} (choose from {', '.join(RENDERERS)})")
+    if background not in BACKGROUNDS:
+        raise ValueError(f"Unknown background: {background} (choose from {', '.join(BACKGROUNDS)})")
+    if long_form:
+        if words_file:
+            print("⚠️ ロングフォームモードはカラオケ表示に対応していないため、行単位の字幕で描画します")
+        return render_longform(wav_file, srt_file, output_dir, render_mode, encoding_profile, target_render_time,
+                               workspace_root, container, background, hls, previews, preview_times, memory_cap_mb)
+    mode = get_render_mode(render_mode)
+    width, height = mode["width"], mode["height"]
+
+    print(f"\n🎬 動画生成開始... ({render_mode}: {width}x{height} @ {mode['fps']}fps)")
+    os.makedirs(output_dir, exist_ok=True)
+
+    try:
+        audio = mp.AudioFileClip(wav_file)
+        audio_duration = audio.duration
+        print(f"🎵 音声の長さ: {audio_duration:.2f}秒")
+    except Exception as e:
+        print(f"❌ 音声読み込みエラー: {e}")
+        return None
+
+    profile = resolve_encoding_profile(render_mode, encoding_profile, target_render_time, audio_duration)
+    output_file = os.path.join(output_dir, f"{Path(wav_file).stem}_final_video{mode['file_suffix']}.{container}")
+    playlist_file = hls_playlist_path(output_file) if hls else None
+
+    if renderer == "ffmpeg" and words_file:
+        print("⚠️ フィルターグラフ版はカラオケ表示に対応していないため moviepy で描画します")
+        renderer = "moviepy"
+    if renderer == "ffmpeg" and previews:
+        print("⚠️ フィルターグラフ版はフレームを Python に通さないため、プレビュー作成時は moviepy で描画します")
+        renderer = "moviepy"
+    if renderer == "ffmpeg" and background != "gradient":
+        print(f"⚠️ フィルターグラフ版は {background} 背景に対応していないため moviepy で描画します")
+        renderer = "moviepy"
+
+    if renderer == "ffmpeg":
+        audio.close()
+        print(f"🧵 フィルターグラフで動画エクスポート中: {output_file} (プロファイル: {profile})")
+        try:
+            with JobWorkspace(root=workspace_root) as workspace, stage_memory("render"):
+                scratch_output = workspace.file(os.path.basename(output_file))
+                render_filtergraph(wav_file, srt_file, scratch_output, audio_duration, render_mode, profile, workspace,
+                                   hls_playlist=playlist_file)
+                workspace.publish(scratch_output, output_file)
+            print(f"✅ 動画生成完了: {output_file}")
+            return output_file
+        except Exception as e:
+            print(f"❌ 動画エクスポートエラー: {e}")
+            return None
+
+    print(f"🎨 背景を作成中... ({background})")
+
+    # 出力解像度で直接生成（リサイズ処理なし）。音声に反応する背景は特徴量をここで一括計算
+    make_background_frame = make_background(background, wav_file, width, height, mode["fps"])
+    video_clip = mp.VideoClip(make_background_frame, duration=audio_duration)
+
+    # 空きメモリが予算を下回る場合は、字幕レイヤーを全て保持せずチャンク単位で書き出す
+    low_memory = should_use_low_memory("render")
+
+    if low_memory:
+        video_with_subs = video_clip
+    else:
+        print("📝 字幕追加中...")
+        try:
+            video_with_subs = add_subtitles_to_video(video_clip, srt_file, render_mode, words_file)
+        except Exception as e:
+            print(f"⚠️ 字幕追加エラー: {e}")
+            video_with_subs = video_clip
+
+    # 書き出し中のフレーム合成時間を "composite" として内訳に記録（計測無効時はそのまま）
+    final_video = timed_frames(video_with_subs)
+    # プレビュー用のフレームは書き出しで合成されたものをそのまま取り出す（MP4 のデコードなし）
+    taps = preview_taps(srt_file, audio_duration, mode["fps"], preview_times) if previews else None
+    if taps and not low_memory:
+        final_video = taps.attach(final_video)
+    print(f"💾 動画エクスポート中: {output_file} (プロファイル: {profile})")
+
+    try:
+        # ジョブ専用の作業ディレクトリでエンコードし、完成後にアトミックに公開
+        with JobWorkspace(root=workspace_root) as workspace, stage_memory("render"):
+            # 映像のみエンコード → キャッシュ済み音声トラックをストリームコピーで結合
+            video_only = workspace.file(f"video_only.{container}")
+            with stage_timer("encode"):
+                if hls:
+                    if low_memory:
+                        frames = (frame for chunk in _iter_chunk_clips(make_background_frame, audio_duration, srt_file,
+                                                                       render_mode, words_file=words_file,
+                                                                       frame_taps=taps)
+                                  for frame in chunk.iter_frames(fps=mode["fps"], dtype="uint8"))
+                    else:
+                        frames = final_video.iter_frames(fps=mode["fps"], dtype="uint8")
+                    write_hls_frames(frames, width, height, mode["fps"], get_encoded_audio(wav_file), playlist_file,
+                                     profile)
+                elif low_memory:
+                    _write_video_chunked(make_background_frame, audio_duration, srt_file, render_mode, profile,
+                                         workspace, video_only, words_file=words_file, frame_taps=taps)
+                else:
+                    final_video.write_videofile(
+                        video_only,
+                        fps=mode["fps"],
+                        audio=False,
+                        verbose=False,
+                        logger=None,
+                        **write_videofile_kwargs(profile)
+                    )
+            scratch_output = workspace.file(os.path.basename(output_file))
+            if hls:
+                # 音声入りのセグメントを連結してストリームコピー（2回目のエンコードなし）
+                remux_hls_to_mp4(playlist_file, scratch_output)
+            else:
+                with stage_timer("audio_mux"):
+                    mux_audio(video_only, prepare_audio_track(wav_file, output_file), scratch_output)
+            workspace.publish(scratch_output, output_file)
+        print(f"✅ 動画生成完了: {output_file}")
+
+        if taps:
+            try:
+                taps.write(output_file)
+            except Exception as e:
+                print(f"⚠️ プレビュー作成エラー: {e}")
+
+        video_clip.close()
+        if video_with_subs != video_clip:
+            video_with_subs.close()
+        audio.close()
+        return output_file
+    except Exception as e:
+        print(f"❌ 動画エクスポートエラー: {e}")
+        return None
@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+📈 パイプライン計測モジュール
+ステージごとのタイマー・カウンター・ヒストグラムと、ジョブ単位のステージ内訳記録
+
+- 無効時（既定）は stage_timer が共有の no-op を返すだけなので、オーバーヘッドはほぼゼロ
+- 有効化: enable_metrics() または環境変数 AMVC_METRICS=1
+- 出力: JSON / Prometheus テキスト形式、ジョブ記録は JSON Lines で追記（大量ジョブの集計用）
+
+GitHub: https://github.com/yusuke10151985/amvc
+"""
+
+import os
+import json
+import time
+import threading
+import contextvars
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Tuple
+
+# ヒストグラムのバケット境界（秒）
+DEFAULT_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800)
+
+STAGE_DURATION_METRIC = "amvc_stage_duration_seconds"
+
+_enabled = os.environ.get("AMVC_METRICS", "") not in ("", "0")
+_lock = threading.Lock()
+_counters: Dict[Tuple[str, Tuple], float] = {}
+_histograms: Dict[Tuple[str, Tuple], Dict] = {}
+_current_job: contextvars.ContextVar = contextvars.ContextVar("amvc_current_job", default=None)
+_stage_listener: contextvars.ContextVar = contextvars.ContextVar("amvc_stage_listener", default=None)
+
+
+def enable_metrics(enabled: bool = True):
+    """計測の有効/無効を切り替え"""
+    global _enabled
+    _enabled = enabled
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def reset_metrics():
+    """集計済みのメトリクスを破棄"""
+    with _lock:
+        _counters.clear()
+        _histograms.clear()
+
+
+def _label_key(labels: Dict) -> Tuple:
+    return tuple(sorted(labels.items()))
+
+
+def increment(name: str, value: float = 1, **labels):
+    """カウンターを加算"""
+    if not _enabled:
+        return
+    key = (name, _label_key(labels))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def observe(name: str, value: float, buckets: Tuple = DEFAULT_BUCKETS, **labels):
+    """ヒストグラムに値を記録"""
+    if not _enabled:
+        return
+    key = (name, _label_key(labels))
+    with _lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = {"buckets": buckets, "counts": [0] * len(buckets), "sum": 0.0, "count": 0}
+            _histograms[key] = histogram
+        for i, bound in enumerate(histogram["buckets"]):
+            if value <= bound:
+                histogram["counts"][i] += 1
+        histogram["sum"] += value
+        histogram["count"] += 1
+
+
+class _NullTimer:
+    """無効時に返す共有の no-op タイマー"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class _StageTimer:
+    def __init__(self, stage: str, job: Optional[Dict], listener: Optional[Callable] = None):
+        self.stage = stage
+        self.job = job
+        self.listener = listener
+        self.start = 0.0
+
+    def __enter__(self):
+        if self.listener is not None:
+            self.listener(self.stage, "start", 0.0)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self.start
+        status = "error" if exc_type else "ok"
+        if _enabled:
+            observe(STAGE_DURATION_METRIC, elapsed, stage=self.stage)
+            increment("amvc_stage_runs_total", stage=self.stage, status=status)
+        if self.job is not None:
+            stage = self.job["stages"].setdefault(self.stage, {"seconds": 0.0, "count": 0, "errors": 0})
+            stage["seconds"] += elapsed
+            stage["count"] += 1
+            if exc_type:
+                stage["errors"] += 1
+        if self.listener is not None:
+            self.listener(self.stage, status, elapsed)
+        return False
+
+
+def stage_timer(stage: str):
+    """
+    ステージの処理時間を計測するコンテキストマネージャー
+
+        with stage_timer("encode"):
+            clip.write_videofile(...)
+    """
+    job = _current_job.get()
+    listener = _stage_listener.get()
+    if not _enabled and job is None and listener is None:
+        return _NULL_TIMER
+    return _StageTimer(stage, job, listener)
+
+
+def timed_frames(clip, stage: str = "composite"):
+    """
+    クリップのフレーム生成時間をステージとして計測（書き出し中の合成時間の内訳用）
+
+    計測が無効でジョブ外の場合はクリップをそのまま返します。
+    """
+    if not _enabled and _current_job.get() is None and _stage_listener.get() is None:
+        return clip
+
+    def timed_get_frame(get_frame, t):
+        with stage_timer(stage):
+            return get_frame(t)
+
+    return clip.fl(timed_get_frame, keep_duration=True)
+
+
+def current_job() -> Optional[Dict]:
+    """実行中のジョブ記録（job_metrics の外では None）"""
+    return _current_job.get()
+
+
+@contextmanager
+def stage_listener(callback: Callable):
+    """
+    ブロック内のステージの開始・終了を callback(stage, event, elapsed) で通知（進捗表示用）
+
+    event は "start" / "ok" / "error"。フレーム単位のステージ（composite など）は高頻度で呼ばれるため、
+    callback 側で間引いてください。
+    """
+    token = _stage_listener.set(callback)
+    try:
+        yield
+    finally:
+        _stage_listener.reset(token)
+
+
+@contextmanager
+def job_metrics(job_id: str, record_file: Optional[str] = None, **attributes):
+    """
+    ジョブ単位でステージ内訳を記録
+
+    ブロック内で実行された stage_timer の時間をジョブ記録に集計し、
+    record_file が指定されていれば終了時に JSON Lines で追記します。
+    """
+    job = {
+        "job_id": job_id,
+        "started_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "attributes": attributes,
+        "stages": {},
+        "status": "ok",
+    }
+    token = _current_job.set(job)
+    start = time.perf_counter()
+    try:
+        yield job
+    except Exception:
+        job["status"] = "error"
+        raise
+    finally:
+        job["total_seconds"] = time.perf_counter() - start
+        _current_job.reset(token)
+        if record_file:
+            os.makedirs(os.path.dirname(record_file) or ".", exist_ok=True)
+            with _lock, open(record_file, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(job, ensure_ascii=False) + "\n")
+
+
+def snapshot() -> Dict:
+    """現在のメトリクスを辞書で取得"""
+    with _lock:
+        return {
+            "counters": [
+                {"name": name, "labels": dict(labels), "value": value}
+                for (name, labels), value in sorted(_counters.items())
+            ],
+            "histograms": [
+                {"name": name, "labels": dict(labels), "buckets": list(h["buckets"]),
+                 "counts": list(h["counts"]), "sum": h["sum"], "count": h["count"]}
+                for (name, labels), h in sorted(_histograms.items())
+            ],
+        }
+
+
+def export_json(path: str) -> str:
+    """メトリクスをJSONファイルに出力"""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(snapshot(), f, ensure_ascii=False, indent=2)
+    return path
+
+
+def _escape_label(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels: Dict, extra: Optional[Dict] = None) -> str:
+    merged = dict(labels, **(extra or {}))
+    if not merged:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape_label(value)}"' for key, value in sorted(merged.items())) + "}"
+
+
+def prometheus_text() -> str:
+    """Prometheus テキスト形式（exposition format）"""
+    data = snapshot()
+    lines: List[str] = []
+    typed = set()
+
+    for counter in data["counters"]:
+        if counter["name"] not in typed:
+            lines.append(f"# TYPE {counter['name']} counter")
+            typed.add(counter["name"])
+        lines.append(f"{counter['name']}{_format_labels(counter['labels'])} {counter['value']}")
+
+    for histogram in data["histograms"]:
+        name = histogram["name"]
+        if name not in typed:
+            lines.append(f"# TYPE {name} histogram")
+            typed.add(name)
+        for bound, count in zip(histogram["buckets"], histogram["counts"]):
+            lines.append(f"{name}_bucket{_format_labels(histogram['labels'], {'le': bound})} {count}")
+        lines.append(f"{name}_bucket{_format_labels(histogram['labels'], {'le': '+Inf'})} {histogram['count']}")
+        lines.append(f"{name}_sum{_format_labels(histogram['labels'])} {histogram['sum']}")
+        lines.append(f"{name}_count{_format_labels(histogram['labels'])} {histogram['count']}")
+
+    return "\n".join(lines) + "\n"
+
+
+def export_prometheus(path: str) -> str:
+    """メトリクスを Prometheus テキスト形式で出力（node_exporter の textfile collector 用）"""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    staging = f"{path}.tmp"
+    with open(staging, 'w', encoding='utf-8') as f:
+        f.write(prometheus_text())
+    os.replace(staging, path)
+    return path
+
+
+def aggregate_job_records(record_file: str) -> Dict:
+    """JSON Lines のジョブ記録をステージごとに集計（件数・平均・p50・p95・エラー数）"""
+    stage_seconds: Dict[str, List[float]] = {}
+    stage_errors: Dict[str, int] = {}
+    jobs = 0
+
+    with open(record_file, 'r', encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            job = json.loads(line)
+            jobs += 1
+            for stage, record in job.get("stages", {}).items():
+                stage_seconds.setdefault(stage, []).append(record["seconds"])
+                stage_errors[stage] = stage_errors.get(stage, 0) + record.get("errors", 0)
+
+    def percentile(values: List[float], q: float) -> float:
+        ordered = sorted(values)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    return {
+        "jobs": jobs,
+        "stages": {
+            stage: {
+                "jobs": len(values),
+                "mean": sum(values) / len(values),
+                "p50": percentile(values, 0.5),
+                "p95": percentile(values, 0.95),
+                "total": sum(values),
+                "errors": stage_errors.get(stage, 0),
+            }
+            for stage, values in sorted(stage_seconds.items())
+        },
+    }
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) != 2:
+        print("使い方: python pipeline_metrics.py <job_records.jsonl>")
+        sys.exit(1)
+    print(json.dumps(aggregate_job_records(sys.argv[1]), ensure_ascii=False, indent=2))
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🎛️ レンダリング設定モジュール
+フル品質レンダリングとプロキシ（低解像度プレビュー）レンダリングの設定
+
+GitHub: https://github.com/yusuke10151985/amvc
+"""
+
+from typing import Dict
+
+# 字幕スタイルの基準値（1080p）
+BASE_HEIGHT = 1080
+BASE_SUBTITLE_STYLE = {
+    "fontsize": 48,
+    "fallback_fontsize": 40,
+    "stroke_width": 2,
+    "text_width": 1800,
+}
+
+# 字幕の文字色（karaoke 時は歌い終わった部分を highlight_color で表示）
+SUBTITLE_COLOR = "white"
+KARAOKE_HIGHLIGHT_COLOR = "yellow"
+
+# レンダリングモード
+# encoding_profile: 既定のエンコードプロファイル（encoding_profiles.py）
+# proxy: 画素数1/16・フレーム数1/2・draftプロファイルで、フルレンダリングと同じタイムラインを約10倍速で生成
+RENDER_MODES = {
+    "full": {
+        "width": 1920,
+        "height": 1080,
+        "fps": 24,
+        "encoding_profile": "standard",
+        "file_suffix": "",
+    },
+    "proxy": {
+        "width": 480,
+        "height": 270,
+        "fps": 12,
+        "encoding_profile": "draft",
+        "file_suffix": "_proxy",
+    },
+}
+
+
+def get_render_mode(render_mode: str = "full") -> Dict:
+    """レンダリングモード名から設定を取得"""
+    if render_mode not in RENDER_MODES:
+        raise ValueError(f"Unknown render mode: {render_mode} (choose from {', '.join(RENDER_MODES)})")
+    return dict(RENDER_MODES[render_mode], name=render_mode)
+
+
+def subtitle_style(mode: Dict) -> Dict:
+    """出力解像度に合わせた字幕スタイル（縮小後ではなくネイティブサイズでラスタライズ）"""
+    scale = mode["height"] / BASE_HEIGHT
+    return {
+        "fontsize": max(8, round(BASE_SUBTITLE_STYLE["fontsize"] * scale)),
+        "fallback_fontsize": max(8, round(BASE_SUBTITLE_STYLE["fallback_fontsize"] * scale)),
+        "stroke_width": max(1, round(BASE_SUBTITLE_STYLE["stroke_width"] * scale)),
+        "text_width": round(BASE_SUBTITLE_STYLE["text_width"] * scale),
+        "color": SUBTITLE_COLOR,
+        "highlight_color": KARAOKE_HIGHLIGHT_COLOR,
+    }
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🪜 マルチレンディション出力
+背景を1回だけ Python で合成し、raw フレームを1つの ffmpeg プロセスへパイプで送って、
+split → scale / crop → 字幕（ASS）で複数の出力（1080p・720p・9:16 縦型など）を同時にエンコードします。
+
+- 合成はフレームごとに1回だけ（レンディションの数だけ generate_video を実行する必要がない）
+- 字幕はレンディションごとの解像度・配置で作った ASS を libass で重ねるだけ（再合成なし、縮小による文字のつぶれもなし）
+- 音声はキャッシュ済みのトラックを各出力へストリームコピー
+
+    python rendition_ladder.py song.wav song_subtitles.srt --renditions 1080p 720p vertical
+
+GitHub: https://github.com/yusuke10151985/amvc
+"""
+
+import os
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Optional, Sequence
+
+from render_settings import get_render_mode, subtitle_style
+from encoding_profiles import ffmpeg_encode_args, resolve_encoding_profile
+from subtitle_timeline import SubtitleTimeline
+from audio_cache import prepare_audio_track
+from audio_visualizer import DEFAULT_BACKGROUND, make_background
+from beat_analysis import WavMemmap
+from ffmpeg_utils import FFmpegPipe, raw_video_input_args
+from filtergraph_renderer import escape_filter_value
+from job_workspace import JobWorkspace
+from pipeline_metrics import stage_timer, increment
+
+# レンディション
+# crop: 合成したフレームから切り出すアスペクト比（幅, 高さ）- None なら全体を縮小
+# subtitle_margin: 字幕の下端からの余白（出力の高さに対する割合）- 縦型は各アプリの操作ボタンを避けて高めに配置
+RENDITIONS = {
+    "1080p": {
+        "width": 1920,
+        "height": 1080,
+        "crop": None,
+        "subtitle_margin": 0.0,
+    },
+    "720p": {
+        "width": 1280,
+        "height": 720,
+        "crop": None,
+        "subtitle_margin": 0.0,
+    },
+    "vertical": {
+        "width": 1080,
+        "height": 1920,
+        "crop": (9, 16),
+        "subtitle_margin": 0.18,
+    },
+}
+DEFAULT_LADDER = ("1080p", "720p", "vertical")
+
+# 合成は full モードの解像度・fps で行い、各レンディションはそこから縮小・切り出し
+SOURCE_RENDER_MODE = "full"
+
+
+def get_rendition(name: str) -> Dict:
+    """レンディション名から設定を取得"""
+    if name not in RENDITIONS:
+        raise ValueError(f"Unknown rendition: {name} (choose from {', '.join(RENDITIONS)})")
+    return dict(RENDITIONS[name], name=name)
+
+
+def _check_unique_renditions(names: Sequence[str]):
+    """同じレンディション名が2回あると出力ファイルが重なり、split の出力が1つ未接続になるので先に弾く"""
+    duplicates = sorted(name for name, count in Counter(names).items() if count > 1)
+    if duplicates:
+        raise ValueError(f"Duplicate rendition: {', '.join(duplicates)} (each rendition can be requested once)")
+
+
+def write_rendition_ass(srt_file: str, ass_file: str, rendition: Dict) -> str:
+    """レンディションの解像度・字幕配置に合わせた ASS を作成"""
+    width, height = rendition["width"], rendition["height"]
+    # 文字の大きさは短辺を基準にする（縦型でも横型と同じ見た目の大きさ）
+    style = subtitle_style({"height": min(width, height)})
+    return SubtitleTimeline.read(srt_file).write_ass(
+        ass_file,
+        play_res=(width, height),
+        style={"fontsize": style["fontsize"], "stroke_width": style["stroke_width"],
+               "margin_v": round(height * rendition["subtitle_margin"])},
+    )
+
+
+def build_ladder_filtergraph(source_size: Sequence[int], renditions: Sequence[Dict],
+                             ass_files: Sequence[Optional[str]]) -> str:
+    """入力 [0:v] を split し、レンディションごとに切り出し → 縮小 → 字幕 → yuv420p（出力 [v0], [v1], ...）"""
+    _check_unique_renditions([rendition["name"] for rendition in renditions])
+    source_width, source_height = source_size
+    labels = [f"[src{i}]" for i in range(len(renditions))]
+    chains = [f"[0:v]split={len(renditions)}{''.join(labels)}"]
+    for i, (rendition, ass_file) in enumerate(zip(renditions, ass_files)):
+        width, height = source_width, source_height
+        filters = []
+        if rendition["crop"]:
+            aspect_width, aspect_height = rendition["crop"]
+            # 中央を切り出す（偶数に揃える）
+            if source_width * aspect_height > source_height * aspect_width:
+                width = source_height * aspect_width // aspect_height // 2 * 2
+            else:
+                height = source_width * aspect_height // aspect_width // 2 * 2
+            filters.append(f"crop={width}:{height}")
+        if (width, height) != (rendition["width"], rendition["height"]):
+            filters.append(f"scale={rendition['width']}:{rendition['height']}")
+        if ass_file:
+            filters.append(f"ass=filename={escape_filter_value(os.path.abspath(ass_file))}")
+        filters.append("format=yuv420p")
+        chains.append(f"{labels[i]}{','.join(filters)}[v{i}]")
+    return ";".join(chains)
+
+
+def generate_video_ladder(wav_file: str, srt_file: Optional[str], output_dir: str = "./outputs",
+                          renditions: Sequence[str] = DEFAULT_LADDER, encoding_profile: Optional[str] = None,
+                          background: str = DEFAULT_BACKGROUND, workspace_root: Optional[str] = None,
+                          container: str = "mp4") -> Dict[str, str]:
+    """
+    背景を1回だけ合成し、複数のレンディションを1つの ffmpeg プロセスで同時にエンコード
+
+    Args:
+        renditions: 出力するレンディション名（RENDITIONS）
+        background: "gradient" / "pulse" / "spectrum"（audio_visualizer.py）
+
+    Returns:
+        {レンディション名: 動画ファイルパス}
+    """
+    specs = [get_rendition(name) for name in renditions]
+    if not specs:
+        raise ValueError("No renditions requested")
+    _check_unique_renditions(renditions)
+    mode = get_render_mode(SOURCE_RENDER_MODE)
+    width, height, fps = mode["width"], mode["height"], mode["fps"]
+    profile = resolve_encoding_profile(SOURCE_RENDER_MODE, encoding_profile)
+    duration = WavMemmap(wav_file).duration
+    frame_count = max(1, int(round(duration * fps)))
+
+    os.makedirs(output_dir, exist_ok=True)
+    stem = Path(wav_file).stem
+    output_files = {spec["name"]: os.path.join(output_dir, f"{stem}_final_video_{spec['name']}.{container}")
+                    for spec in specs}
+    print(f"\n🪜 {len(specs)} 種類の動画を1パスで生成中... ({', '.join(output_files)}, {duration:.2f}秒)")
+
+    make_frame = make_background(background, wav_file, width, height, fps)
+    audio_track = prepare_audio_track(wav_file, next(iter(output_files.values())))
+
+    with JobWorkspace(root=workspace_root) as workspace:
+        ass_files = [None] * len(specs)
+        if srt_file:
+            with stage_timer("subtitle_rasterize"):
+                ass_files = [write_rendition_ass(srt_file, workspace.file(f"subtitles_{spec['name']}.ass"), spec)
+                             for spec in specs]
+
+        scratch_files = {name: workspace.file(os.path.basename(path)) for name, path in output_files.items()}
+        args = raw_video_input_args(width, height, fps) + [
+            "-i", audio_track,
+            "-filter_complex", build_ladder_filtergraph((width, height), specs, ass_files),
+        ]
+        for i, scratch_file in enumerate(scratch_files.values()):
+            args += ["-map", f"[v{i}]", "-map", "1:a:0"] + ffmpeg_encode_args(profile) + ["-c:a", "copy", "-shortest"]
+            if scratch_file.lower().endswith((".mp4", ".mov", ".m4v")):
+                args += ["-movflags", "+faststart"]
+            args.append(scratch_file)
+
+        # 合成したフレームをそのままパイプへ（合成とエンコードは並行して進む）
+        with stage_timer("encode"), FFmpegPipe(args) as pipe:
+            for index in range(frame_count):
+                pipe.write(make_frame(index / fps))
+        increment("amvc_ladder_renditions_total", len(specs))
+
+        for name, scratch_file in scratch_files.items():
+            workspace.publish(scratch_file, output_files[name])
+
+    for name, path in output_files.items():
+        print(f"✅ {name}: {path}")
+    return output_files
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="1回の合成で複数のレンディションを生成")
+    parser.add_argument("wav_file")
+    parser.add_argument("srt_file", nargs="?")
+    parser.add_argument("--output-dir", default="./outputs")
+    parser.add_argument("--renditions", nargs="+", default=list(DEFAULT_LADDER), choices=list(RENDITIONS))
+    parser.add_argument("--encoding-profile")
+    parser.add_argument("--background", default=DEFAULT_BACKGROUND)
+    parser.add_argument("--workspace-root")
+    args = parser.parse_args()
+
+    generate_video_ladder(args.wav_file, args.srt_file, args.output_dir, args.renditions, args.encoding_profile,
+                          args.background, args.workspace_root)
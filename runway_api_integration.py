@@ -9,11 +9,27 @@ GitHub: https://github.com/yusuke10151985/amvc
 
 import os
 import json
+import math
 import time
+import shutil
 import requests
-from typing import List, Dict, Optional
+from typing import Callable, List, Dict, Optional
 from pathlib import Path
 
+from render_settings import get_render_mode
+from encoding_profiles import resolve_encoding_profile, write_videofile_kwargs
+from job_workspace import JobWorkspace
+from audio_cache import prepare_audio_track, mux_audio
+from pipeline_metrics import stage_timer, increment
+from memory_guard import stage_memory
+from beat_analysis import beat_absorb_failed_scenes, beat_scene_durations, snap_scene_durations
+from content_hash import file_content_hash, params_hash
+from job_journal import JobJournal, default_journal_path, job_state_dir
+from clip_normalizer import normalize_clips
+from ffmpeg_utils import concat_videos
+
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+
 class RunwayAPIClient:
     """Runway Gen-4 API クライアント"""
     
@@ -28,7 +44,11 @@ class RunwayAPIClient:
     def generate_video_from_prompts(self, 
                                    prompts: List[str], 
                                    duration_per_scene: int = 4,
-                                   style: str = "cinematic") -> List[str]:
+                                   style: str = "cinematic",
+                                   output_dir: str = "./outputs",
+                                   scene_durations: Optional[List[float]] = None,
+                                   journal: Optional[JobJournal] = None,
+                                   job_id: Optional[str] = None) -> List[str]:
         """
         プロンプトリストから複数の映像を生成
         
@@ -36,6 +56,10 @@ class RunwayAPIClient:
             prompts: 映像生成プロンプトのリスト
             duration_per_scene: 各シーンの長さ（秒）
             style: 映像スタイル
+            output_dir: シーン映像の保存先（ジョブのワークスペースなど）
+            scene_durations: シーンごとの長さ（秒）- 指定時は各シーンをその長さ以上の整数秒で生成
+            journal: ジョブジャーナル（指定時は完了済みシーンを再利用し、投入済みタスクに再接続）
+            job_id: ジャーナル上のジョブID
             
         Returns:
             生成された映像ファイルのパスリスト
@@ -46,16 +70,30 @@ class RunwayAPIClient:
         
         for i, prompt in enumerate(prompts):
             print(f"📹 シーン {i+1}/{len(prompts)}: {prompt[:50]}...")
+            unit = f"scene:{i:03d}"
+            
+            if journal is not None:
+                completed = journal.completed(job_id, unit)
+                if completed:
+                    video_paths.append(completed["artifact"])
+                    print(f"♻️ シーン {i+1} は生成済み: {completed['artifact']}")
+                    continue
             
             try:
                 video_path = self._generate_single_video(
                     prompt=prompt,
-                    duration=duration_per_scene,
+                    duration=int(math.ceil(scene_durations[i])) if scene_durations else duration_per_scene,
                     style=style,
-                    scene_index=i
+                    scene_index=i,
+                    output_dir=output_dir,
+                    task_id=journal.pending_task(job_id, unit) if journal is not None else None,
+                    on_submit=(lambda task_id, unit=unit: journal.record_task(job_id, unit, task_id))
+                    if journal is not None else None
                 )
                 
                 if video_path:
+                    if journal is not None:
+                        journal.complete(job_id, unit, video_path)
                     video_paths.append(video_path)
                     print(f"✅ シーン {i+1} 完了: {video_path}")
                 else:
@@ -72,8 +110,28 @@ class RunwayAPIClient:
                               prompt: str, 
                               duration: int, 
                               style: str,
-                              scene_index: int) -> Optional[str]:
-        """単一映像を生成"""
+                              scene_index: int,
+                              output_dir: str = "./outputs",
+                              task_id: Optional[str] = None,
+                              on_submit: Optional[Callable[[str], None]] = None) -> Optional[str]:
+        """
+        単一映像を生成
+        
+        Args:
+            task_id: 中断前に投入済みのタスクID（指定時は再投入せずに完了を待つ）
+            on_submit: タスク投入直後にタスクIDを受け取るコールバック（ジャーナルへの記録用）
+        """
+        
+        if task_id:
+            print(f"🔌 投入済みのタスクに再接続: {task_id}")
+            try:
+                video_path = self._collect_task(task_id, scene_index, output_dir)
+            except Exception as e:
+                print(f"❌ 再接続エラー: {e}")
+                video_path = None
+            if video_path:
+                return video_path
+            print("   タスクを取得できなかったため再投入します")
         
         # リクエストペイロード
         payload = {
@@ -90,12 +148,13 @@ class RunwayAPIClient:
         
         try:
             # 生成リクエスト
-            response = requests.post(
-                f"{self.base_url}/generate",
-                headers=self.headers,
-                json=payload,
-                timeout=30
-            )
+            with stage_timer("runway_submit"):
+                response = requests.post(
+                    f"{self.base_url}/generate",
+                    headers=self.headers,
+                    json=payload,
+                    timeout=30
+                )
             
             if response.status_code != 200:
                 print(f"❌ API エラー: {response.status_code} - {response.text}")
@@ -107,20 +166,26 @@ class RunwayAPIClient:
             if not task_id:
                 print("❌ タスクID取得失敗")
                 return None
+            if on_submit:
+                on_submit(task_id)
             
-            # 生成完了まで待機
-            video_url = self._wait_for_completion(task_id)
-            
-            if video_url:
-                # 動画ダウンロード
-                return self._download_video(video_url, scene_index)
-            else:
-                return None
+            return self._collect_task(task_id, scene_index, output_dir)
                 
         except Exception as e:
             print(f"❌ 生成エラー: {e}")
             return None
     
+    def _collect_task(self, task_id: str, scene_index: int, output_dir: str) -> Optional[str]:
+        """タスクの完了を待ってダウンロード"""
+        with stage_timer("runway_poll"):
+            video_url = self._wait_for_completion(task_id)
+        
+        if not video_url:
+            return None
+        # 動画ダウンロード
+        with stage_timer("runway_download"), stage_memory("runway_download"):
+            return self._download_video(video_url, scene_index, output_dir)
+    
     def _wait_for_completion(self, task_id: str, timeout: int = 300) -> Optional[str]:
         """生成完了まで待機"""
         
@@ -128,6 +193,7 @@ class RunwayAPIClient:
         
         while time.time() - start_time < timeout:
             try:
+                increment("amvc_runway_polls_total")
                 response = requests.get(
                     f"{self.base_url}/tasks/{task_id}",
                     headers=self.headers,
@@ -157,26 +223,33 @@ class RunwayAPIClient:
         print("⏰ タイムアウト - 生成が完了しませんでした")
         return None
     
-    def _download_video(self, video_url: str, scene_index: int) -> Optional[str]:
+    def _download_video(self, video_url: str, scene_index: int, output_dir: str = "./outputs") -> Optional[str]:
         """動画ファイルをダウンロード"""
         
         try:
-            response = requests.get(video_url, timeout=60)
-            
-            if response.status_code == 200:
+            # 動画全体をメモリに載せず、チャンク単位でディスクへ書き込む
+            with requests.get(video_url, timeout=60, stream=True) as response:
+                if response.status_code != 200:
+                    print(f"❌ ダウンロードエラー: {response.status_code}")
+                    return None
+                
                 filename = f"runway_scene_{scene_index:02d}.mp4"
-                filepath = os.path.join("./outputs", filename)
+                filepath = os.path.join(output_dir, filename)
                 
-                os.makedirs("./outputs", exist_ok=True)
+                os.makedirs(output_dir, exist_ok=True)
                 
-                with open(filepath, 'wb') as f:
-                    f.write(response.content)
+                # 途中で中断しても不完全なファイルがシーンとして残らないよう、書き終えてから配置
+                downloaded = 0
+                staging = f"{filepath}.part"
+                with open(staging, 'wb') as f:
+                    for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                        f.write(chunk)
+                        downloaded += len(chunk)
+                os.replace(staging, filepath)
+                increment("amvc_runway_download_bytes_total", downloaded)
                 
                 print(f"📥 ダウンロード完了: {filename}")
                 return filepath
-            else:
-                print(f"❌ ダウンロードエラー: {response.status_code}")
-                return None
                 
         except Exception as e:
             print(f"❌ ダウンロードエラー: {e}")
@@ -186,7 +259,13 @@ def create_runway_integrated_video(prompts: List[str],
                                   audio_file: str,
                                   srt_file: str,
                                   api_key: str,
-                                  output_dir: str = "./outputs") -> Optional[str]:
+                                  output_dir: str = "./outputs",
+                                  render_mode: str = "full",
+                                  encoding_profile: Optional[str] = None,
+                                  target_render_time: Optional[float] = None,
+                                  workspace_root: Optional[str] = None,
+                                  job_id: Optional[str] = None,
+                                  journal_path: Optional[str] = None) -> Optional[str]:
     """
     Runway Gen-4統合映像生成
     
@@ -196,9 +275,19 @@ def create_runway_integrated_video(prompts: List[str],
         srt_file: 字幕ファイルパス
         api_key: Runway APIキー
         output_dir: 出力ディレクトリ
+        render_mode: "full" または "proxy"（低解像度プレビュー）
+        encoding_profile: "draft" / "standard" / "archive"（省略時はモードの既定値）
+        target_render_time: 目標エンコード時間（秒）- キャリブレーション結果からプロファイルを自動選択
+        workspace_root: 中間ファイル用の作業ルート（"ram" でRAMディスク）
+        job_id: ジョブID（省略時は入力内容から決定 - 同じ入力で呼び直すと中断した所から再開）
+        journal_path: ジョブジャーナル（省略時は AMVC_JOB_JOURNAL または {output_dir}/.amvc_jobs/journal.sqlite）
         
     Returns:
         最終映像ファイルパス
+    
+    シーン映像と結合映像は {output_dir}/.amvc_jobs/{job_id}/ に置き、完了ごとにジャーナルへ記録します。
+    ランタイムのリセットなどで中断しても、再実行時は完了済みのシーン・結合をハッシュ確認のうえ再利用し、
+    投入済みの Runway タスクにはタスクIDで再接続します。完成後に中間ファイルは削除されます。
     """
     
     if not api_key:
@@ -220,46 +309,155 @@ def create_runway_integrated_video(prompts: List[str],
         print(f"❌ 音声ファイル読み込みエラー: {e}")
         return None
     
-    # 各シーンの長さを計算
-    duration_per_scene = int(total_duration / len(prompts)) if prompts else 4
+    # エンコードプロファイル決定（結合と最終出力の2回エンコードするため目標時間を等分）
+    profile = resolve_encoding_profile(render_mode, encoding_profile,
+                                       target_render_time / 2 if target_render_time else None,
+                                       total_duration)
+    
+    # ジョブの記録（同じ入力なら同じジョブID）
+    job_params = {
+        "audio": file_content_hash(audio_file),
+        "srt": file_content_hash(srt_file),
+        "prompts": prompts,
+        "render_mode": render_mode,
+        "encoding_profile": profile,
+    }
+    job_id = job_id or params_hash(job_params)[:16]
+    state_dir = job_state_dir(output_dir, job_id)
+    
+    with JobJournal(journal_path or default_journal_path(output_dir)) as journal:
+        if journal.begin_job(job_id, "runway", job_params):
+            print(f"♻️ 中断したジョブを再開します: {job_id}")
+        
+        final_video = _run_runway_job(client, journal, job_id, state_dir, prompts, audio_file, srt_file,
+                                      total_duration, render_mode, profile, output_dir, workspace_root)
+        journal.finish_job(job_id, "done" if final_video else "failed")
+    
+    if final_video:
+        # 完成したら再開用の中間ファイルは不要（ジャーナルには final の記録が残る）
+        shutil.rmtree(state_dir, ignore_errors=True)
+        print(f"🎉 Runway統合映像生成完了: {final_video}")
+    return final_video
+
+def _run_runway_job(client: RunwayAPIClient, journal: JobJournal, job_id: str, state_dir: str, prompts: List[str],
+                    audio_file: str, srt_file: str, total_duration: float, render_mode: str, profile: str,
+                    output_dir: str, workspace_root: Optional[str]) -> Optional[str]:
+    """create_runway_integrated_video の本体（完了した単位ごとにジャーナルへ記録）"""
+    
+    completed = journal.completed(job_id, "final")
+    if completed:
+        print(f"♻️ 完成済みの映像があります: {completed['artifact']}")
+        return completed["artifact"]
+    
+    # 各シーンの長さ（切り替えを小節頭に揃え、合計を音声の長さに一致させる）
+    completed = journal.completed(job_id, "scene_durations")
+    if completed:
+        scene_durations = completed["result"]
+    else:
+        scene_durations = beat_scene_durations(audio_file, len(prompts), total_duration)
+        journal.complete(job_id, "scene_durations", result=scene_durations)
     
-    # 映像生成
+    # シーン映像は再開できるよう状態ディレクトリに保存
     video_paths = client.generate_video_from_prompts(
         prompts=prompts,
-        duration_per_scene=duration_per_scene,
-        style="cinematic synthwave"
+        style="cinematic synthwave",
+        output_dir=state_dir,
+        scene_durations=scene_durations,
+        journal=journal,
+        job_id=job_id
     )
     
     if not video_paths:
         print("❌ 映像生成に失敗しました")
         return None
     
-    # 映像を結合
-    print("🔗 生成した映像を結合中...")
-    combined_video = combine_runway_videos(video_paths, total_duration)
+    # 成功したシーン（ジャーナルに記録済み）は元の長さのまま残し、失敗したシーンの時間だけを前後のシーンに割り当てる
+    kept = [i for i in range(len(prompts)) if journal.completed(job_id, f"scene:{i:03d}")]
+    kept_durations = [scene_durations[i] for i in kept]
+    if len(kept) != len(scene_durations):
+        print(f"⚠️ 失敗した {len(scene_durations) - len(kept)} シーンの時間を前後のシーンに割り当てます")
+        scene_durations = beat_absorb_failed_scenes(audio_file, scene_durations, kept)
     
-    if not combined_video:
-        print("❌ 映像結合に失敗しました")
-        return None
+    # 映像を結合（同じシーンが成功していて結合済みなら再利用）
+    combine_key = params_hash({"scenes": kept, "durations": kept_durations})
+    completed = journal.completed(job_id, "combine")
+    if completed and completed["result"] == combine_key:
+        combined_video = completed["artifact"]
+        print(f"♻️ 結合済みの映像を再利用: {combined_video}")
+    else:
+        print("🔗 生成した映像を結合中...")
+        combined_video = combine_runway_videos(video_paths, total_duration, render_mode, profile,
+                                               output_dir=state_dir, scene_durations=scene_durations)
+        if not combined_video:
+            print("❌ 映像結合に失敗しました")
+            return None
+        journal.complete(job_id, "combine", combined_video, result=combine_key)
     
-    # 音声と字幕を追加
-    print("🎵 音声と字幕を追加中...")
-    final_video = add_audio_and_subtitles(combined_video, audio_file, srt_file)
+    # 最終出力の中間ファイルはジョブ専用のワークスペースに作成
+    with JobWorkspace(root=workspace_root) as workspace:
+        # 音声と字幕を追加
+        print("🎵 音声と字幕を追加中...")
+        scratch_video = add_audio_and_subtitles(combined_video, audio_file, srt_file, render_mode, profile,
+                                                output_dir=workspace.dir)
+        
+        if not scratch_video:
+            print("❌ 最終映像生成に失敗しました")
+            return None
+        
+        # 完成した映像だけを出力ディレクトリへアトミックに公開
+        mode = get_render_mode(render_mode)
+        final_video = workspace.publish(
+            scratch_video,
+            os.path.join(output_dir, f"{Path(audio_file).stem}_runway_final_music_video{mode['file_suffix']}.mp4")
+        )
     
-    if final_video:
-        print(f"🎉 Runway統合映像生成完了: {final_video}")
-        return final_video
-    else:
-        print("❌ 最終映像生成に失敗しました")
-        return None
+    journal.complete(job_id, "final", final_video)
+    return final_video
 
-def combine_runway_videos(video_paths: List[str], target_duration: float) -> Optional[str]:
-    """生成された映像を結合"""
+def combine_runway_videos(video_paths: List[str], target_duration: float, render_mode: str = "full",
+                          encoding_profile: Optional[str] = None,
+                          output_dir: str = "./outputs",
+                          scene_durations: Optional[List[float]] = None) -> Optional[str]:
+    """
+    生成された映像を結合
+    
+    各クリップをシーン長（省略時は target_duration の均等分割）に合わせてから1回だけ結合します。
+    シーン長の合計は target_duration と一致するため、最後のクリップのループや再結合は不要です。
+    形式の異なるクリップだけを並列に変換（clip_normalizer）し、結合はストリームコピーで行います。
+    ffmpeg での結合に失敗した場合は MoviePy で合成します。
+    """
     
+    video_paths = [video_path for video_path in video_paths if os.path.exists(video_path)]
     if not video_paths:
+        print("❌ 有効な映像ファイルがありません")
         return None
     
+    mode = get_render_mode(render_mode)
+    profile = resolve_encoding_profile(render_mode, encoding_profile)
+    if not scene_durations or len(scene_durations) != len(video_paths):
+        scene_durations = snap_scene_durations(target_duration, len(video_paths), [])
+    
     print(f"🔗 {len(video_paths)} 個の映像を結合中...")
+    os.makedirs(output_dir, exist_ok=True)
+    output_path = os.path.join(output_dir, f"runway_combined_video{mode['file_suffix']}.mp4")
+    
+    try:
+        normalized = normalize_clips(video_paths, scene_durations, render_mode, profile, output_dir)
+        # 全クリップが同じ形式・同じパラメーターセットなので、各シーン長で打ち切りながらストリームコピーで結合
+        with stage_timer("runway_concat"):
+            concat_videos(normalized, output_path, durations=scene_durations, video_only=True)
+        print(f"✅ 映像結合完了: {output_path}")
+        return output_path
+    except Exception as e:
+        print(f"⚠️ ストリームコピーでの結合に失敗したため MoviePy で結合します: {e}")
+    
+    return _combine_with_moviepy(video_paths, scene_durations, render_mode, profile, output_path)
+
+def _combine_with_moviepy(video_paths: List[str], scene_durations: List[float], render_mode: str, profile: str,
+                          output_path: str) -> Optional[str]:
+    """MoviePy でクリップを合成して結合（フォールバック）"""
+    
+    mode = get_render_mode(render_mode)
     
     try:
         import moviepy.editor as mp
@@ -267,37 +465,33 @@ def combine_runway_videos(video_paths: List[str], target_duration: float) -> Opt
         # 動画クリップを読み込み
         clips = []
         for video_path in video_paths:
-            if os.path.exists(video_path):
+            # プロキシ時はデコード直後に縮小（以降の結合・合成は低解像度で処理）
+            if render_mode == "full":
                 clip = mp.VideoFileClip(video_path)
-                clips.append(clip)
+            else:
+                clip = mp.VideoFileClip(video_path, target_resolution=(mode["height"], None))
+            clips.append(clip)
         
-        if not clips:
-            print("❌ 有効な映像ファイルがありません")
-            return None
+        # 各クリップをシーン長に合わせる（長い分は切り詰め、短いクリップはわずかにスローにして切り替えを拍に残す）
+        scenes = []
+        for clip, scene_duration in zip(clips, scene_durations):
+            if clip.duration >= scene_duration:
+                scenes.append(clip.subclip(0, scene_duration))
+            else:
+                scenes.append(clip.fx(mp.vfx.speedx, final_duration=scene_duration))
         
         # 映像を結合
-        combined = mp.concatenate_videoclips(clips)
-        
-        # 長さを調整
-        if combined.duration > target_duration:
-            combined = combined.subclip(0, target_duration)
-        elif combined.duration < target_duration:
-            # 最後のクリップを繰り返し
-            if clips:
-                last_clip = clips[-1]
-                needed_duration = target_duration - combined.duration
-                extended_last = last_clip.loop(duration=needed_duration)
-                combined = mp.concatenate_videoclips([combined, extended_last])
+        combined = mp.concatenate_videoclips(scenes)
         
         # 保存
-        output_path = os.path.join("./outputs", "runway_combined_video.mp4")
-        combined.write_videofile(
-            output_path,
-            fps=24,
-            codec='libx264',
-            verbose=False,
-            logger=None
-        )
+        with stage_timer("runway_combine_encode"):
+            combined.write_videofile(
+                output_path,
+                fps=mode["fps"],
+                verbose=False,
+                logger=None,
+                **write_videofile_kwargs(profile)
+            )
         
         # クリップを閉じる
         for clip in clips:
@@ -311,74 +505,45 @@ def combine_runway_videos(video_paths: List[str], target_duration: float) -> Opt
         print(f"❌ 映像結合エラー: {e}")
         return None
 
-def add_audio_and_subtitles(video_file: str, audio_file: str, srt_file: str) -> Optional[str]:
+def add_audio_and_subtitles(video_file: str, audio_file: str, srt_file: str, render_mode: str = "full",
+                            encoding_profile: Optional[str] = None,
+                            output_dir: str = "./outputs") -> Optional[str]:
     """映像に音声と字幕を追加"""
     
     try:
         import moviepy.editor as mp
-        import pysrt
-        
-        # 映像読み込み
-        video = mp.VideoFileClip(video_file)
+        from music_video_pipeline import add_subtitles_to_video
         
-        # 音声読み込み
-        audio = mp.AudioFileClip(audio_file)
+        mode = get_render_mode(render_mode)
+        profile = resolve_encoding_profile(render_mode, encoding_profile)
         
-        # 音声を映像に追加
-        video_with_audio = video.set_audio(audio)
+        # 映像読み込み（音声は最後にストリームコピーで結合）
+        video = mp.VideoFileClip(video_file, audio=False)
         
-        # 字幕を追加
-        subtitles = pysrt.open(srt_file)
-        subtitle_clips = []
-        
-        for subtitle in subtitles:
-            start_time = subtitle.start.ordinal / 1000.0
-            end_time = subtitle.end.ordinal / 1000.0
-            duration = end_time - start_time
-            
-            if duration > 0:
-                try:
-                    txt_clip = mp.TextClip(
-                        subtitle.text,
-                        fontsize=48,
-                        color='white',
-                        font='Arial-Bold',
-                        stroke_color='black',
-                        stroke_width=2,
-                        size=(1800, None)
-                    ).set_position(('center', 'bottom')).set_start(start_time).set_duration(duration)
-                    subtitle_clips.append(txt_clip)
-                except:
-                    txt_clip = mp.TextClip(
-                        subtitle.text,
-                        fontsize=40,
-                        color='white'
-                    ).set_position(('center', 'bottom')).set_start(start_time).set_duration(duration)
-                    subtitle_clips.append(txt_clip)
-        
-        # 最終合成
-        if subtitle_clips:
-            final_video = mp.CompositeVideoClip([video_with_audio] + subtitle_clips)
-        else:
-            final_video = video_with_audio
+        # 字幕を追加（出力解像度でラスタライズ）
+        final_video = add_subtitles_to_video(video, srt_file, render_mode)
         
         # 出力
-        output_path = os.path.join("./outputs", "runway_final_music_video.mp4")
-        final_video.write_videofile(
-            output_path,
-            fps=24,
-            codec='libx264',
-            audio_codec='aac',
-            verbose=False,
-            logger=None
-        )
+        os.makedirs(output_dir, exist_ok=True)
+        video_only = os.path.join(output_dir, f"runway_subtitled_video{mode['file_suffix']}.mp4")
+        with stage_timer("encode"):
+            final_video.write_videofile(
+                video_only,
+                fps=mode["fps"],
+                audio=False,
+                verbose=False,
+                logger=None,
+                **write_videofile_kwargs(profile)
+            )
+        
+        # キャッシュ済みAAC音声をストリームコピーで結合
+        output_path = os.path.join(output_dir, f"runway_final_music_video{mode['file_suffix']}.mp4")
+        with stage_timer("audio_mux"):
+            mux_audio(video_only, prepare_audio_track(audio_file, output_path), output_path)
+        os.remove(video_only)
         
         # クリップを閉じる
         video.close()
-        audio.close()
-        if subtitle_clips:
-            for clip in subtitle_clips:
-                clip.close()
         final_video.close()
         
         print(f"✅ 最終映像生成完了: {output_path}")
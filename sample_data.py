@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🧪 テスト用サンプルデータ生成モジュール
+サンプル音声・歌詞ファイルの作成（キャリブレーション・ベンチマーク・ソークテスト用）
+
+音声は固定サイズのチャンクごとに生成してWAVへ書き込むため、1時間を超える音声でもメモリ使用量は一定です。
+
+使い方:
+    python sample_data.py --duration 3600 --lines 900 --output-dir ./soak
+
+GitHub: https://github.com/yusuke10151985/amvc
+"""
+
+import os
+import json
+import wave
+import numpy as np
+from typing import Dict, List, Optional, Sequence
+
+SAMPLE_RATE = 22050
+CHUNK_SECONDS = 10
+AMPLITUDE = 0.3
+FADE_SECONDS = 0.1
+
+SAMPLE_FREQUENCIES = [440, 523, 659, 783, 659, 523]  # A-C-E-G-E-C
+
+SAMPLE_LYRICS_LINES = [
+    "Hello beautiful world",
+    "Music flows through my soul",
+    "Dancing with the melody",
+    "Creating magic together",
+    "Harmony fills the air",
+    "Peace and love forever",
+]
+
+CHORUS_LINES = [
+    "Sing it loud tonight",
+    "We are shining bright",
+]
+
+
+def write_tone_schedule(filename: str,
+                        duration: float,
+                        starts: Sequence[float],
+                        ends: Sequence[float],
+                        frequencies: Sequence[float],
+                        sample_rate: int = SAMPLE_RATE,
+                        chunk_seconds: float = CHUNK_SECONDS,
+                        amplitude: float = AMPLITUDE,
+                        fade_seconds: float = FADE_SECONDS) -> str:
+    """
+    音程スケジュール（開始・終了・周波数）を16-bit PCMのWAVへストリーミング書き込み
+
+    チャンクごとに絶対時刻から波形を計算するので、チャンク境界で位相は連続し、
+    メモリ使用量はチャンクサイズ分だけです。スケジュール外の区間は無音になります。
+    """
+    starts = np.asarray(starts, dtype=np.float64)
+    ends = np.asarray(ends, dtype=np.float64)
+    frequencies = np.asarray(frequencies, dtype=np.float64)
+
+    total_samples = int(sample_rate * duration)
+    chunk_samples = max(1, int(sample_rate * chunk_seconds))
+    fade_samples = max(1, int(fade_seconds * sample_rate))
+
+    with wave.open(filename, 'wb') as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+
+        for chunk_start in range(0, total_samples, chunk_samples):
+            index = np.arange(chunk_start, min(chunk_start + chunk_samples, total_samples))
+            t = index / sample_rate
+
+            note = np.searchsorted(starts, t, side='right') - 1
+            safe_note = np.clip(note, 0, None)
+            active = (note >= 0) & (t < ends[safe_note])
+            audio = np.where(active, amplitude * np.sin(2 * np.pi * frequencies[safe_note] * t), 0.0)
+
+            # フェードイン・フェードアウト
+            audio *= np.clip(index / fade_samples, 0, 1) * np.clip((total_samples - 1 - index) / fade_samples, 0, 1)
+
+            wav.writeframes((audio * 32767).astype('<i2').tobytes())
+
+    return filename
+
+
+def stream_sample_audio(filename: str = "sample_audio.wav",
+                        duration: float = 6,
+                        frequencies: Optional[List[float]] = None,
+                        note_duration: Optional[float] = None,
+                        sample_rate: int = SAMPLE_RATE,
+                        chunk_seconds: float = CHUNK_SECONDS) -> str:
+    """
+    任意の長さのメロディーをストリーミング生成
+
+    note_duration を省略すると、音符を全体に均等に割り当てます（create_sample_audio と同じ構成）。
+    指定した場合は frequencies を繰り返して duration まで埋めます。
+    """
+    frequencies = frequencies or SAMPLE_FREQUENCIES
+    if note_duration is None:
+        note_duration = duration / len(frequencies)
+
+    note_count = int(np.ceil(duration / note_duration))
+    starts = np.arange(note_count) * note_duration
+    ends = starts + note_duration
+    notes = np.resize(np.asarray(frequencies, dtype=np.float64), note_count)
+
+    return write_tone_schedule(filename, duration, starts, ends, notes, sample_rate, chunk_seconds)
+
+
+def create_sample_audio(filename="sample_audio.wav", duration=6):
+    """テスト用のサンプル音声ファイルを作成"""
+    stream_sample_audio(filename, duration)
+    print(f"✅ サンプル音声ファイル作成: {filename}")
+    return filename
+
+
+def create_sample_lyrics(filename="sample_lyrics.txt", line_count=6):
+    """テスト用のサンプル歌詞ファイルを作成（line_count 行までサンプル歌詞を繰り返す）"""
+    lines = [SAMPLE_LYRICS_LINES[i % len(SAMPLE_LYRICS_LINES)] for i in range(line_count)]
+
+    with open(filename, 'w', encoding='utf-8') as f:
+        f.write("\n".join(lines))
+    print(f"✅ サンプル歌詞ファイル作成: {filename}")
+    return filename
+
+
+def synthetic_lyrics(line_count: int, verse_length: int = 4, chorus_lines: Optional[List[str]] = None) -> List[str]:
+    """ヴァースとコーラス（同じ歌詞の繰り返し）を交互に並べた歌詞"""
+    chorus_lines = CHORUS_LINES if chorus_lines is None else chorus_lines
+    lines = []
+    verse_index = 0
+    while len(lines) < line_count:
+        for _ in range(verse_length):
+            base = SAMPLE_LYRICS_LINES[verse_index % len(SAMPLE_LYRICS_LINES)]
+            lines.append(f"{base} {verse_index // len(SAMPLE_LYRICS_LINES) + 1}")
+            verse_index += 1
+        lines.extend(chorus_lines)
+    return lines[:line_count]
+
+
+def create_synthetic_song(output_dir: str,
+                          duration: float,
+                          line_count: int,
+                          verse_length: int = 4,
+                          chorus_lines: Optional[List[str]] = None,
+                          gap_ratio: float = 0.2,
+                          notes_per_line: int = 3,
+                          name: Optional[str] = None) -> Dict[str, str]:
+    """
+    音声・歌詞・正解タイミングがそろった合成楽曲を作成（ソークテスト・アライメント精度検証用）
+
+    各歌詞行は区間の先頭 (1 - gap_ratio) の間だけ音が鳴り、残りは無音になります。
+    コーラス行は同じ歌詞・同じメロディーで繰り返されます。
+
+    Returns:
+        {"wav": ..., "lyrics": ..., "ground_truth": ..., "srt": ...}
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    name = name or f"synthetic_{int(duration)}s_{line_count}lines"
+    lines = synthetic_lyrics(line_count, verse_length, chorus_lines)
+
+    line_duration = duration / line_count
+    line_starts = np.arange(line_count) * line_duration
+    line_ends = line_starts + line_duration * (1 - gap_ratio)
+
+    # 行ごとのメロディー（同じ歌詞には同じメロディー）
+    melodies = {}
+    note_starts, note_ends, note_freqs = [], [], []
+    for line, start, end in zip(lines, line_starts, line_ends):
+        if line not in melodies:
+            offset = len(melodies)
+            melodies[line] = [SAMPLE_FREQUENCIES[(offset + k) % len(SAMPLE_FREQUENCIES)] for k in range(notes_per_line)]
+        step = (end - start) / notes_per_line
+        for k, freq in enumerate(melodies[line]):
+            note_starts.append(start + k * step)
+            note_ends.append(start + (k + 1) * step)
+            note_freqs.append(freq)
+
+    paths = {
+        "wav": os.path.join(output_dir, f"{name}.wav"),
+        "lyrics": os.path.join(output_dir, f"{name}.txt"),
+        "ground_truth": os.path.join(output_dir, f"{name}_ground_truth.json"),
+        "srt": os.path.join(output_dir, f"{name}_ground_truth.srt"),
+    }
+
+    write_tone_schedule(paths["wav"], duration, note_starts, note_ends, note_freqs)
+
+    with open(paths["lyrics"], 'w', encoding='utf-8') as f:
+        f.write("\n".join(lines))
+
+    # 正解タイミング（アライメントJSONと同じ形式）
+    ground_truth = {
+        "words": [
+            {"case": "success", "start": float(start), "end": float(end), "word": line}
+            for line, start, end in zip(lines, line_starts, line_ends)
+        ],
+        "audio_duration": float(duration),
+    }
+    with open(paths["ground_truth"], 'w', encoding='utf-8') as f:
+        json.dump(ground_truth, f, ensure_ascii=False)
+
+    with open(paths["srt"], 'w', encoding='utf-8') as f:
+        for i, (line, start, end) in enumerate(zip(lines, line_starts, line_ends)):
+            f.write(f"{i + 1}\n{_srt_time(start)} --> {_srt_time(end)}\n{line}\n\n")
+
+    print(f"✅ 合成楽曲作成: {paths['wav']} ({duration:.0f}秒 / {line_count}行)")
+    return paths
+
+
+def _srt_time(seconds: float) -> str:
+    milliseconds = int(round(seconds * 1000))
+    hours, milliseconds = divmod(milliseconds, 3600000)
+    minutes, milliseconds = divmod(milliseconds, 60000)
+    secs, milliseconds = divmod(milliseconds, 1000)
+    return f"{hours:02d}:{minutes:02d}:{secs:02d},{milliseconds:03d}"
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="合成楽曲（音声・歌詞・正解タイミング）の生成")
+    parser.add_argument("--duration", type=float, default=60, help="音声の長さ（秒）")
+    parser.add_argument("--lines", type=int, default=16, help="歌詞の行数")
+    parser.add_argument("--verse-length", type=int, default=4, help="コーラス間のヴァース行数")
+    parser.add_argument("--output-dir", default="./test-data/synthetic")
+    args = parser.parse_args()
+
+    create_synthetic_song(args.output_dir, args.duration, args.lines, args.verse_length)
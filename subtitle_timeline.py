@@ -0,0 +1,667 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+📜 字幕タイムラインモジュール
+開始・終了時刻を NumPy 配列、テキストを1本の文字列テーブルで保持する字幕タイムラインと、
+SRT / WebVTT / ASS のストリーミング読み書き
+
+- 1キューごとのオブジェクトを作らないため、10万キューでも数MBで保持できます
+- shift / scale / clamp / fill_gaps などの一括操作は配列演算で行います
+- SRT / WebVTT の読み込みと全形式の書き込みは、バイト列を NumPy でまとめて処理します（10万キューで数十ミリ秒）
+  - 標準の固定幅でないタイミング行（WebVTT の MM:SS.mmm やキュー設定付きなど）を含むファイルは1行ずつ読み込みます
+
+    timeline = SubtitleTimeline.read("song_subtitles.srt")
+    timeline.shift(0.5).fill_gaps(0.3).write("song_subtitles.ass")
+
+GitHub: https://github.com/yusuke10151985/amvc
+"""
+
+import re
+import numpy as np
+from pathlib import Path
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+# 書き込み時にまとめて出力するキュー数
+WRITE_BATCH_SIZE = 65536
+# 読み込み時に1回に読むバイト数（空行の位置で区切って処理し、残りは次のチャンクへ）
+READ_CHUNK_BYTES = 1 << 22
+
+ASS_PLAY_RES = (1920, 1080)
+ASS_DEFAULT_STYLE = {
+    "fontname": "Arial",
+    "fontsize": 48,
+    "stroke_width": 2,
+    "margin_v": 40,
+}
+
+_TIMESTAMP_RE = re.compile(r"(?:(\d+):)?(\d{1,2}):(\d{1,2})[,.](\d{1,3})")
+_ASS_TAG_RE = re.compile(r"\{[^}]*\}")
+
+
+class Cue(NamedTuple):
+    index: int
+    start: float
+    end: float
+    text: str
+
+
+class SubtitleTimeline:
+    """配列ベースの字幕タイムライン（時刻は秒、float64）"""
+
+    def __init__(self, starts: Sequence[float], ends: Sequence[float], texts: Iterable[str]):
+        self.starts = np.asarray(starts, dtype=np.float64).copy()
+        self.ends = np.asarray(ends, dtype=np.float64).copy()
+        texts = list(texts)
+        if not (len(self.starts) == len(self.ends) == len(texts)):
+            raise ValueError("starts, ends and texts must have the same length")
+
+        lengths = np.fromiter((len(text) for text in texts), dtype=np.int64, count=len(texts))
+        self._offsets = np.zeros(len(texts) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=self._offsets[1:])
+        self._text_table = "".join(texts)
+
+    @classmethod
+    def _from_parts(cls, starts: np.ndarray, ends: np.ndarray, text_table: str, offsets: np.ndarray):
+        timeline = cls.__new__(cls)
+        timeline.starts = starts
+        timeline.ends = ends
+        timeline._text_table = text_table
+        timeline._offsets = offsets
+        return timeline
+
+    # ----- 参照 -----
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def text(self, i: int) -> str:
+        return self._text_table[self._offsets[i]:self._offsets[i + 1]]
+
+    @property
+    def texts(self) -> List[str]:
+        table, offsets = self._text_table, self._offsets.tolist()
+        return [table[offsets[i]:offsets[i + 1]] for i in range(len(self))]
+
+    @property
+    def durations(self) -> np.ndarray:
+        return self.ends - self.starts
+
+    @property
+    def duration(self) -> float:
+        """最後のキューの終了時刻"""
+        return float(self.ends.max()) if len(self) else 0.0
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return self.select(np.arange(len(self))[key])
+        if key < 0:
+            key += len(self)
+        return Cue(key + 1, float(self.starts[key]), float(self.ends[key]), self.text(key))
+
+    def __iter__(self) -> Iterator[Cue]:
+        table, offsets = self._text_table, self._offsets.tolist()
+        for i, (start, end) in enumerate(zip(self.starts.tolist(), self.ends.tolist())):
+            yield Cue(i + 1, start, end, table[offsets[i]:offsets[i + 1]])
+
+    def select(self, indices) -> "SubtitleTimeline":
+        """インデックス配列（またはブールマスク）で抽出した新しいタイムライン"""
+        indices = np.asarray(indices)
+        if indices.dtype == bool:
+            indices = np.flatnonzero(indices)
+        indices = indices.astype(np.int64, copy=False)
+        if len(indices) and (np.diff(indices) == 1).all():
+            # 連続した区間は文字列テーブルを共有し、オフセットの範囲だけを切り出す（テキストをコピーしない）
+            first, last = int(indices[0]), int(indices[-1]) + 1
+            return SubtitleTimeline._from_parts(self.starts[first:last].copy(), self.ends[first:last].copy(),
+                                                self._text_table, self._offsets[first:last + 1])
+        # 選んだキューのテキストだけを取り出して新しいテーブルを作る（全キューの文字列は作らない）
+        table, offsets = self._text_table, self._offsets
+        text_starts, text_ends = offsets[indices].tolist(), offsets[indices + 1].tolist()
+        new_offsets = np.zeros(len(indices) + 1, dtype=np.int64)
+        np.cumsum(offsets[indices + 1] - offsets[indices], out=new_offsets[1:])
+        new_table = "".join([table[a:b] for a, b in zip(text_starts, text_ends)])
+        return SubtitleTimeline._from_parts(self.starts[indices], self.ends[indices], new_table, new_offsets)
+
+    def window(self, start: float, end: Optional[float] = None) -> np.ndarray:
+        """区間 [start, end) に重なるキューのインデックス"""
+        mask = self.ends > start
+        if end is not None:
+            mask &= self.starts < end
+        return np.flatnonzero(mask)
+
+    # ----- 一括操作（新しいタイムラインを返す） -----
+    def _with_times(self, starts: np.ndarray, ends: np.ndarray) -> "SubtitleTimeline":
+        return SubtitleTimeline._from_parts(starts, ends, self._text_table, self._offsets)
+
+    def shift(self, seconds: float) -> "SubtitleTimeline":
+        """全キューを seconds 秒ずらす"""
+        return self._with_times(self.starts + seconds, self.ends + seconds)
+
+    def scale(self, factor: float, origin: float = 0.0) -> "SubtitleTimeline":
+        """origin を基準に時間軸を factor 倍（フレームレート変換・テンポ変更用）"""
+        return self._with_times(origin + (self.starts - origin) * factor, origin + (self.ends - origin) * factor)
+
+    def sorted(self) -> "SubtitleTimeline":
+        """開始時刻順に並べ替え"""
+        return self.select(np.argsort(self.starts, kind="stable"))
+
+    def clamp(self, start: float = 0.0, end: Optional[float] = None) -> "SubtitleTimeline":
+        """時刻を [start, end] に収め、長さが0になったキューを削除"""
+        upper = np.inf if end is None else end
+        starts = np.clip(self.starts, start, upper)
+        ends = np.clip(self.ends, start, upper)
+        keep = ends > starts
+        if keep.all():
+            return self._with_times(starts, ends)
+        clamped = self._with_times(starts, ends)
+        return clamped.select(keep)
+
+    def fill_gaps(self, max_gap: Optional[float] = None) -> "SubtitleTimeline":
+        """次のキューまでの隙間（max_gap 秒以下）を前のキューの延長で埋める（開始時刻順が前提）"""
+        ends = self.ends.copy()
+        if len(self) > 1:
+            gaps = self.starts[1:] - ends[:-1]
+            fill = gaps > 0
+            if max_gap is not None:
+                fill &= gaps <= max_gap
+            ends[:-1] = np.where(fill, self.starts[1:], ends[:-1])
+        return self._with_times(self.starts.copy(), ends)
+
+    # ----- 読み込み -----
+    @classmethod
+    def read(cls, path: str) -> "SubtitleTimeline":
+        """拡張子（.srt / .vtt / .ass / .ssa）から形式を判定して読み込み"""
+        suffix = Path(path).suffix.lower()
+        if suffix == ".srt":
+            return cls.read_srt(path)
+        if suffix == ".vtt":
+            return cls.read_vtt(path)
+        if suffix in (".ass", ".ssa"):
+            return cls.read_ass(path)
+        raise ValueError(f"Unsupported subtitle format: {suffix}")
+
+    @classmethod
+    def read_srt(cls, path: str) -> "SubtitleTimeline":
+        return cls._read_blocks(path)
+
+    @classmethod
+    def read_vtt(cls, path: str) -> "SubtitleTimeline":
+        return cls._read_blocks(path)
+
+    @classmethod
+    def _read_blocks(cls, path: str) -> "SubtitleTimeline":
+        """
+        SRT / WebVTT を読み込み
+
+        READ_CHUNK_BYTES ごとに空行の位置で区切り、タイミング行・テキストの位置を配列演算で求めます。
+        標準の固定幅でないタイミング行などがあれば _read_lines で1行ずつ読み直します。
+        """
+        timing_rows, tables, offsets = [], [], []
+        carry = b""
+        with open(path, 'rb') as f:
+            first = True
+            while True:
+                data = f.read(READ_CHUNK_BYTES)
+                if first:
+                    data = data[3:] if data.startswith(b"\xef\xbb\xbf") else data
+                    first = False
+                buffer = (carry + data).replace(b"\r\n", b"\n")
+                if data:
+                    cut = buffer.rfind(b"\n\n")
+                    if cut < 0:
+                        carry = buffer
+                        continue
+                    chunk, carry = buffer[:cut + 1], buffer[cut + 1:]
+                else:
+                    chunk, carry = buffer, b""
+                scanned = _scan_blocks(chunk)
+                if scanned is None:
+                    return cls._read_lines(path)
+                timing_rows.append(scanned[0])
+                tables.append(scanned[1])
+                offsets.append(scanned[2])
+                if not data:
+                    break
+
+        timings = np.concatenate(timing_rows) if timing_rows else np.zeros((0, 29), dtype=np.uint8)
+        times = _parse_timing_rows(timings)
+        if times is None:
+            return cls._read_lines(path)
+        text_offsets = np.zeros(sum(len(o) - 1 for o in offsets) + 1, dtype=np.int64)
+        position, base = 0, 0
+        for table, table_offsets in zip(tables, offsets):
+            text_offsets[position:position + len(table_offsets)] = table_offsets + base
+            position += len(table_offsets) - 1
+            base += len(table)
+        return cls._from_parts(times[0], times[1], "".join(tables), text_offsets)
+
+    @classmethod
+    def _read_lines(cls, path: str) -> "SubtitleTimeline":
+        """SRT / WebVTT を1行ずつ読み込み（空行区切りのブロック、'-->' を含む行がタイミング）"""
+        timings: List[str] = []
+        texts: List[str] = []
+        current: Optional[List[str]] = None
+
+        with open(path, 'r', encoding='utf-8-sig') as f:
+            for line in f:
+                line = line.rstrip("\r\n")
+                if "-->" in line:
+                    if current is not None:
+                        texts.append("\n".join(current))
+                    timings.append(line)
+                    current = []
+                elif not line.strip():
+                    if current is not None:
+                        texts.append("\n".join(current))
+                        current = None
+                elif current is not None:
+                    current.append(line)
+        if current is not None:
+            texts.append("\n".join(current))
+
+        starts, ends = _parse_timings(timings)
+        return cls(starts, ends, texts)
+
+    @classmethod
+    def read_ass(cls, path: str) -> "SubtitleTimeline":
+        """ASS の [Events] の Dialogue 行を読み込み（上書きタグは除去、\\N は改行に変換）"""
+        starts, ends, texts = [], [], []
+        fields = ["layer", "start", "end", "style", "name", "marginl", "marginr", "marginv", "effect", "text"]
+        start_column, end_column, text_column = 1, 2, 9
+        prefix = len("Dialogue:")
+        in_events = False
+
+        with open(path, 'r', encoding='utf-8-sig') as f:
+            for line in f:
+                if line.startswith("Dialogue:"):
+                    values = line[prefix:].rstrip("\r\n").split(",", len(fields) - 1)
+                    starts.append(values[start_column])
+                    ends.append(values[end_column])
+                    text = values[text_column]
+                    if "{" in text:
+                        text = _ASS_TAG_RE.sub("", text)
+                    texts.append(text.replace("\\N", "\n").replace("\\n", "\n"))
+                elif line.startswith("["):
+                    in_events = line.strip().lower() == "[events]"
+                elif in_events and line.startswith("Format:"):
+                    fields = [field.strip().lower() for field in line[len("Format:"):].split(",")]
+                    start_column, end_column, text_column = (fields.index(name) for name in ("start", "end", "text"))
+
+        return cls(_parse_ass_times(starts), _parse_ass_times(ends), texts)
+
+    # ----- 書き込み -----
+    def write(self, path: str, **options) -> str:
+        """拡張子から形式を判定して書き込み"""
+        suffix = Path(path).suffix.lower()
+        if suffix == ".srt":
+            return self.write_srt(path)
+        if suffix == ".vtt":
+            return self.write_vtt(path)
+        if suffix in (".ass", ".ssa"):
+            return self.write_ass(path, **options)
+        raise ValueError(f"Unsupported subtitle format: {suffix}")
+
+    def _write_arrays(self, path: str, header: str, layout, time_digits, newline: Optional[str] = None) -> bool:
+        """
+        キューのバイト列を配列演算でまとめて組み立てて書き込み（タイムスタンプの桁があふれる場合は False）
+
+        Args:
+            layout: (番号の桁, 開始, 終了, テキスト) から1キュー分のフィールド（bytes の定数と配列）の並びを作る関数
+            newline: テキスト中の改行の置き換え（ASS の \\N）
+        """
+        start_digits, end_digits = time_digits(self.starts), time_digits(self.ends)
+        if start_digits is None or end_digits is None:
+            return False
+        table, offsets = self._text_table, self._offsets
+        if newline is not None and "\n" in table:
+            # 改行の前にある改行の数だけオフセットをずらす
+            line_breaks = np.flatnonzero(np.frombuffer(table.encode("utf-32-le"), dtype=np.uint32) == 10)
+            offsets = offsets + np.searchsorted(line_breaks, offsets) * (len(newline) - 1)
+            table = table.replace("\n", newline)
+        encoded, byte_offsets = _utf8_offsets(table, offsets)
+        text = np.frombuffer(encoded, dtype=np.uint8)
+
+        with open(path, 'wb') as f:
+            f.write(header.encode("utf-8"))
+            for batch_start in range(0, len(self), WRITE_BATCH_SIZE):
+                batch = slice(batch_start, min(len(self), batch_start + WRITE_BATCH_SIZE))
+                count = batch.stop - batch.start
+                text_field = (text, byte_offsets[batch], byte_offsets[batch.start + 1:batch.stop + 1] - byte_offsets[batch])
+                fields = layout(_index_digits(batch.start + 1, count), start_digits[batch], end_digits[batch],
+                                text_field)
+                f.write(_assemble(fields, count))
+        return True
+
+    def _write_batches(self, path: str, header: str, format_cue, time_format) -> str:
+        """1キューずつ文字列にして書き込み（_write_arrays で書けない場合）"""
+        starts = time_format(self.starts)
+        ends = time_format(self.ends)
+        table, offsets = self._text_table, self._offsets.tolist()
+
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(header)
+            for batch_start in range(0, len(self), WRITE_BATCH_SIZE):
+                batch_end = min(len(self), batch_start + WRITE_BATCH_SIZE)
+                f.write("".join(
+                    format_cue(i + 1, starts[i], ends[i], table[offsets[i]:offsets[i + 1]])
+                    for i in range(batch_start, batch_end)
+                ))
+        return path
+
+    def write_srt(self, path: str) -> str:
+        if self._write_arrays(path, "", lambda index, start, end, text: [index, b"\n", start, b" --> ", end, b"\n",
+                                                                          text, b"\n\n"],
+                              lambda seconds: _timestamp_digits(seconds, 1000, 2, ",")):
+            return path
+        return self._write_batches(
+            path, "",
+            lambda index, start, end, text: f"{index}\n{start} --> {end}\n{text}\n\n",
+            lambda seconds: format_timestamps(seconds, ","),
+        )
+
+    def write_vtt(self, path: str) -> str:
+        if self._write_arrays(path, "WEBVTT\n\n", lambda index, start, end, text: [start, b" --> ", end, b"\n",
+                                                                                  text, b"\n\n"],
+                              lambda seconds: _timestamp_digits(seconds, 1000, 2, ".")):
+            return path
+        return self._write_batches(
+            path, "WEBVTT\n\n",
+            lambda index, start, end, text: f"{start} --> {end}\n{text}\n\n",
+            lambda seconds: format_timestamps(seconds, "."),
+        )
+
+    def write_ass(self, path: str, play_res: Tuple[int, int] = ASS_PLAY_RES, style: Optional[dict] = None) -> str:
+        """ASS で書き込み（libass で焼き込む場合は play_res を出力解像度に合わせる）"""
+        if self._write_arrays(path, ass_header(play_res, style),
+                              lambda index, start, end, text: [b"Dialogue: 0,", start, b",", end,
+                                                               b",Default,,0,0,0,,", text, b"\n"],
+                              lambda seconds: _timestamp_digits(seconds, 100, 1, "."), newline="\\N"):
+            return path
+        return self._write_batches(
+            path, ass_header(play_res, style),
+            lambda index, start, end, text:
+                f"Dialogue: 0,{start},{end},Default,,0,0,0,,{text.replace(chr(10), chr(92) + 'N')}\n",
+            format_ass_timestamps,
+        )
+
+
+def ass_header(play_res: Tuple[int, int] = ASS_PLAY_RES, style: Optional[dict] = None) -> str:
+    """ASS の [Script Info] / [V4+ Styles] / [Events] ヘッダー（白文字・黒縁・下中央）"""
+    style = dict(ASS_DEFAULT_STYLE, **(style or {}))
+    width, height = play_res
+    return (
+        "[Script Info]\n"
+        "ScriptType: v4.00+\n"
+        f"PlayResX: {width}\n"
+        f"PlayResY: {height}\n"
+        "WrapStyle: 0\n"
+        "ScaledBorderAndShadow: yes\n"
+        "\n"
+        "[V4+ Styles]\n"
+        "Format: Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, OutlineColour, BackColour, "
+        "Bold, Italic, Underline, StrikeOut, ScaleX, ScaleY, Spacing, Angle, BorderStyle, Outline, Shadow, "
+        "Alignment, MarginL, MarginR, MarginV, Encoding\n"
+        f"Style: Default,{style['fontname']},{style['fontsize']},&H00FFFFFF,&H000000FF,&H00000000,&H00000000,"
+        f"-1,0,0,0,100,100,0,0,1,{style['stroke_width']},0,2,10,10,{style['margin_v']},1\n"
+        "\n"
+        "[Events]\n"
+        "Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text\n"
+    )
+
+
+def _timestamp_digits(seconds: np.ndarray, unit: int, hour_digits: int, separator: str) -> Optional[np.ndarray]:
+    """
+    固定幅のタイムスタンプ "HH:MM:SS,mmm" の各桁を埋めた uint8 の2次元配列（時間の桁があふれる場合は None）
+    """
+    ticks = np.round(np.maximum(seconds, 0) * unit).astype(np.int64)
+    hours, ticks = np.divmod(ticks, 3600 * unit)
+    if len(hours) and hours.max() >= 10 ** hour_digits:
+        return None
+    minutes, ticks = np.divmod(ticks, 60 * unit)
+    secs, fraction = np.divmod(ticks, unit)
+    fraction_digits = len(str(unit)) - 1
+
+    fields = [(hours, hour_digits), (minutes, 2), (secs, 2), (fraction, fraction_digits)]
+    width = sum(digits for _, digits in fields) + 3
+    raw = np.empty((len(ticks), width), dtype=np.uint8)
+    column = 0
+    for field_index, (values, digits) in enumerate(fields):
+        for power in range(digits - 1, -1, -1):
+            raw[:, column] = ord("0") + (values // 10 ** power) % 10
+            column += 1
+        if field_index < 3:
+            raw[:, column] = ord(separator if field_index == 2 else ":")
+            column += 1
+    return raw
+
+
+def _format_fixed_width(seconds: np.ndarray, unit: int, hour_digits: int, separator: str) -> Optional[List[str]]:
+    """固定幅のタイムスタンプの文字列リスト（各桁を配列で埋めてから1回でデコード）"""
+    raw = _timestamp_digits(seconds, unit, hour_digits, separator)
+    if raw is None:
+        return None
+    if not len(raw):
+        return []
+    lines = np.empty((len(raw), raw.shape[1] + 1), dtype=np.uint8)
+    lines[:, :-1] = raw
+    lines[:, -1] = ord("\n")
+    return lines.tobytes().decode("ascii").split("\n")[:-1]
+
+
+def _index_digits(first: int, count: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """キュー番号 first, first + 1, ... の10進表記（_assemble の可変長フィールド）"""
+    values = np.arange(first, first + count, dtype=np.int64)
+    width = len(str(first + count - 1)) if count else 1
+    raw = np.empty((count, width), dtype=np.uint8)
+    for column in range(width):
+        raw[:, column] = ord("0") + (values // 10 ** (width - 1 - column)) % 10
+    lengths = np.ones(count, dtype=np.int64)
+    for power in range(1, width):
+        lengths += values >= 10 ** power
+    # 右詰めの桁から先頭のゼロを除いて詰める
+    digits = raw[np.arange(width) >= (width - lengths)[:, None]]
+    starts = np.zeros(count, dtype=np.int64)
+    np.cumsum(lengths[:-1], out=starts[1:])
+    return digits, starts, lengths
+
+
+def _utf8_offsets(table: str, offsets: np.ndarray) -> Tuple[bytes, np.ndarray]:
+    """文字列テーブルの UTF-8 バイト列と、文字単位のオフセットに対応するバイト単位のオフセット"""
+    encoded = table.encode("utf-8")
+    if len(encoded) == len(table):
+        return encoded, offsets
+    # オフセットより前にある 2〜4 バイト文字の追加バイト数を足す
+    code_points = np.frombuffer(table.encode("utf-32-le"), dtype=np.uint32)
+    byte_offsets = offsets.copy()
+    for limit in (0x80, 0x800, 0x10000):
+        byte_offsets += np.searchsorted(np.flatnonzero(code_points >= limit), offsets)
+    return encoded, byte_offsets
+
+
+def _span_mask(size: int, starts: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+    """[starts, starts + lengths) の区間（重ならない）に含まれる位置が True のマスク"""
+    nonempty = lengths > 0
+    starts, lengths = starts[nonempty], lengths[nonempty]
+    # 区間外・区間内の長さを交互に並べて、False / True を繰り返す
+    runs = np.empty(2 * len(starts) + 1, dtype=np.int64)
+    runs[0:-1:2] = starts - np.concatenate([[0], (starts + lengths)[:-1]])
+    runs[1::2] = lengths
+    runs[-1] = size - (starts[-1] + lengths[-1]) if len(starts) else size
+    pattern = np.zeros(len(runs), dtype=bool)
+    pattern[1::2] = True
+    return np.repeat(pattern, runs)
+
+
+def _assemble(fields: Sequence, count: int) -> bytes:
+    """
+    count 個のキューのバイト列を1回で組み立て
+
+    fields の要素は bytes（全キュー共通の定数）、(count, 幅) の uint8 配列（固定幅）、
+    または (バッファ, 開始位置, 長さ) の組（可変長）です。
+    """
+    lengths = []
+    for field in fields:
+        if isinstance(field, bytes):
+            lengths.append(np.full(count, len(field), dtype=np.int64))
+        elif isinstance(field, np.ndarray):
+            lengths.append(np.full(count, field.shape[1], dtype=np.int64))
+        else:
+            lengths.append(np.asarray(field[2], dtype=np.int64))
+    cue_lengths = np.sum(lengths, axis=0) if count else np.zeros(0, dtype=np.int64)
+    out = np.empty(int(cue_lengths.sum()), dtype=np.uint8)
+    position = np.zeros(count, dtype=np.int64)
+    np.cumsum(cue_lengths[:-1], out=position[1:])
+
+    for field, length in zip(fields, lengths):
+        if isinstance(field, bytes):
+            if field:
+                out[position[:, None] + np.arange(len(field))] = np.frombuffer(field, dtype=np.uint8)
+        elif isinstance(field, np.ndarray):
+            out[position[:, None] + np.arange(field.shape[1])] = field
+        else:
+            buffer, starts, _ = field
+            total = int(length.sum())
+            if total:
+                # 出力先の区間をマスクにして、連続したバッファをまとめて書き込む
+                first = int(starts[0])
+                if np.array_equal(starts[1:], starts[:-1] + length[:-1]):
+                    source = buffer[first:first + total]
+                else:
+                    source = buffer[_span_mask(len(buffer), starts, length)]
+                out[_span_mask(len(out), position, length)] = source
+        position += length
+    return out.tobytes()
+
+
+def _scan_blocks(data: bytes):
+    """
+    空行で区切った SRT / WebVTT のブロックからタイミング行とテキストを配列演算で取り出す
+
+    Returns:
+        (タイミング行の uint8 配列 (n, 29), テキストの文字列テーブル, 文字単位のオフセット)
+        標準の固定幅でないタイミング行・空白だけの行・テキスト中の '-->' などがあれば None（1行ずつ読み直す）
+    """
+    if b"\r" in data:
+        return None
+    raw = np.frombuffer(data, dtype=np.uint8)
+    newlines = np.flatnonzero(raw == ord("\n"))
+    line_starts = np.concatenate([[0], newlines + 1])
+    line_ends = np.concatenate([newlines, [len(raw)]])
+    line_lengths = line_ends - line_starts
+    blank = line_lengths == 0
+
+    # 空白だけの行は空行として扱う必要があるため1行ずつ読み直す
+    first_bytes = raw[np.minimum(line_starts, len(raw) - 1)] if len(raw) else np.zeros(len(line_starts), np.uint8)
+    for line in np.flatnonzero(~blank & ((first_bytes == ord(" ")) | (first_bytes == ord("\t")))).tolist():
+        if not data[line_starts[line]:line_ends[line]].strip():
+            return None
+
+    candidates = np.flatnonzero(line_lengths == 29)
+    arrow = np.frombuffer(b" --> ", dtype=np.uint8)
+    is_timing = (raw[line_starts[candidates][:, None] + np.arange(12, 17)] == arrow).all(axis=1)
+    timing_lines = candidates[is_timing]
+    # '-->' はタイミング行の中だけ（テキスト中や固定幅でないタイミング行にあれば1行ずつ読み直す）
+    if data.count(b"-->") != len(timing_lines):
+        return None
+
+    # タイミング行はブロックの先頭、または番号行の次
+    previous_blank = np.concatenate([[True], blank])[timing_lines]
+    index_first = np.concatenate([[True, True], blank])[timing_lines] & ~np.concatenate([[True], blank])[timing_lines]
+    if not (previous_blank | (index_first & (timing_lines > 0))).all():
+        return None
+
+    blank_lines = np.flatnonzero(blank)
+    block_ends = np.append(blank_lines, len(line_starts))[np.searchsorted(blank_lines, timing_lines)]
+    has_text = block_ends > timing_lines + 1
+    text_starts = np.where(has_text, line_starts[np.minimum(timing_lines + 1, len(line_starts) - 1)], 0)
+    text_lengths = np.where(has_text, line_ends[block_ends - 1] - text_starts, 0)
+
+    timings = raw[line_starts[timing_lines][:, None] + np.arange(29)]
+    text = raw[_span_mask(len(raw), text_starts, text_lengths)]
+    # オフセットより前にある UTF-8 の継続バイトを引いて、バイト単位のオフセットを文字単位に変換
+    byte_offsets = np.zeros(len(timing_lines) + 1, dtype=np.int64)
+    np.cumsum(text_lengths, out=byte_offsets[1:])
+    continuation = np.flatnonzero((text & 0xC0) == 0x80)
+    return timings, text.tobytes().decode("utf-8"), byte_offsets - np.searchsorted(continuation, byte_offsets)
+
+
+def format_timestamps(seconds: np.ndarray, separator: str = ",") -> List[str]:
+    """秒の配列を HH:MM:SS,mmm（SRT）/ HH:MM:SS.mmm（WebVTT）にまとめて変換"""
+    formatted = _format_fixed_width(seconds, 1000, 2, separator)
+    if formatted is None:
+        formatted = []
+        for value in np.round(np.maximum(seconds, 0) * 1000).astype(np.int64).tolist():
+            hours, value = divmod(value, 3600000)
+            minutes, value = divmod(value, 60000)
+            formatted.append(f"{hours:02d}:{minutes:02d}:{value // 1000:02d}{separator}{value % 1000:03d}")
+    return formatted
+
+
+def format_ass_timestamps(seconds: np.ndarray) -> List[str]:
+    """秒の配列を ASS の H:MM:SS.cc にまとめて変換（ASS の時間は1桁まで）"""
+    formatted = _format_fixed_width(seconds, 100, 1, ".")
+    if formatted is None:
+        raise ValueError("ASS timestamps are limited to 9:59:59.99")
+    return formatted
+
+
+def _parse_ass_times(values: List[str]) -> np.ndarray:
+    """ASS の H:MM:SS.cc を秒の配列に変換（すべて固定幅なら配列演算でまとめて変換）"""
+    values = [value.strip() for value in values]
+    if values and all(len(value) == 10 for value in values):
+        raw = np.frombuffer("".join(values).encode("ascii", "replace"), dtype=np.uint8).reshape(len(values), 10)
+        d = raw[:, [0, 2, 3, 5, 6, 8, 9]].astype(np.int64) - ord("0")
+        if ((d >= 0) & (d <= 9)).all():
+            return d[:, 0] * 3600 + (d[:, 1] * 10 + d[:, 2]) * 60 + (d[:, 3] * 10 + d[:, 4]) + (d[:, 5] * 10 + d[:, 6]) / 100
+
+    seconds = np.empty(len(values))
+    for i, value in enumerate(values):
+        hours, minutes, secs = value.split(":")
+        seconds[i] = int(hours) * 3600 + int(minutes) * 60 + float(secs)
+    return seconds
+
+
+def _parse_timestamp(match) -> float:
+    hours, minutes, seconds, fraction = match.groups()
+    return int(hours or 0) * 3600 + int(minutes) * 60 + int(seconds) + int(fraction.ljust(3, "0")) / 1000
+
+
+def _parse_timing_rows(raw: np.ndarray) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+    """固定幅のタイミング行（uint8 配列 (n, 29)）を開始・終了の秒配列に変換（数字でない桁があれば None）"""
+    digit_columns = [0, 1, 3, 4, 6, 7, 9, 10, 11, 17, 18, 20, 21, 23, 24, 26, 27, 28]
+    digits = raw[:, digit_columns].astype(np.int64) - ord("0")
+    if not ((digits >= 0) & (digits <= 9)).all():
+        return None
+
+    def seconds(d):
+        return ((d[:, 0] * 10 + d[:, 1]) * 3600 + (d[:, 2] * 10 + d[:, 3]) * 60
+                + (d[:, 4] * 10 + d[:, 5]) + (d[:, 6] * 100 + d[:, 7] * 10 + d[:, 8]) / 1000)
+    return seconds(digits[:, :9]), seconds(digits[:, 9:])
+
+
+def _parse_timings(timings: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    タイミング行を開始・終了の秒配列に変換
+
+    すべて標準の固定幅（"HH:MM:SS,mmm --> HH:MM:SS,mmm"）なら数字を配列演算でまとめて変換し、
+    それ以外（WebVTT の MM:SS.mmm やキュー設定付きなど）は正規表現で1行ずつ変換します。
+    """
+    count = len(timings)
+    if count == 0:
+        return np.zeros(0), np.zeros(0)
+
+    stripped = [timing.strip() for timing in timings]
+    if all(len(timing) == 29 for timing in stripped):
+        raw = np.frombuffer("".join(stripped).encode("ascii", "replace"), dtype=np.uint8).reshape(count, 29)
+        times = _parse_timing_rows(raw)
+        if times is not None:
+            return times
+
+    starts = np.empty(count)
+    ends = np.empty(count)
+    for i, timing in enumerate(stripped):
+        matches = list(_TIMESTAMP_RE.finditer(timing))
+        if len(matches) < 2:
+            raise ValueError(f"Invalid subtitle timing line: {timing}")
+        starts[i] = _parse_timestamp(matches[0])
+        ends[i] = _parse_timestamp(matches[1])
+    return starts, ends
@@ -0,0 +1,48 @@
+import json
+
+import numpy as np
+import pytest
+
+from alignment_format import (AlignmentFile, binary_to_json, json_to_binary, read_alignment,
+                              write_alignment_arrays)
+
+ALIGNMENT = {
+    "words": [
+        {"case": "success", "start": 0.0, "end": 1.25, "word": "Hello", "confidence": 0.9},
+        {"case": "not-found-in-audio", "word": "世界"},
+        {"case": "success", "start": 2.5, "end": 3.0, "word": "", "confidence": 0.5},
+    ],
+    "audio_duration": 6.0,
+}
+
+
+def test_json_binary_round_trip(tmp_path):
+    json_file = tmp_path / "song_alignment.json"
+    json_file.write_text(json.dumps(ALIGNMENT, ensure_ascii=False), encoding="utf-8")
+    binary_file = json_to_binary(str(json_file))
+    assert binary_file.endswith(".aln")
+    assert read_alignment(binary_file) == ALIGNMENT
+
+    back = binary_to_json(binary_file, str(tmp_path / "back.json"))
+    assert read_alignment(back) == ALIGNMENT
+
+
+def test_arrays_are_memory_mapped(tmp_path):
+    path = str(tmp_path / "lines.aln")
+    starts = np.arange(1000) * 0.5
+    words = [f"line {i}" for i in range(1000)]
+    write_alignment_arrays(path, starts, starts + 0.4, words, 500.0)
+    with AlignmentFile(path) as alignment:
+        assert len(alignment) == 1000
+        assert alignment.audio_duration == 500.0
+        assert alignment.confidence is None
+        np.testing.assert_array_equal(alignment.starts, starts)
+        assert alignment.word(999) == "line 999"
+        assert alignment[-1] == {"case": "success", "start": 499.5, "end": 499.9, "word": "line 999"}
+        with pytest.raises(IndexError):
+            alignment.entry(1000)
+
+
+def test_mismatched_lengths_are_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        write_alignment_arrays(str(tmp_path / "bad.aln"), [0.0, 1.0], [1.0], ["a", "b"], 2.0)
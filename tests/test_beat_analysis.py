@@ -0,0 +1,77 @@
+import wave
+
+import numpy as np
+import pytest
+
+from beat_analysis import (MIN_SCENE_FRACTION, absorb_failed_scenes, analyze_beats, beat_scene_durations,
+                           snap_scene_durations)
+
+
+def write_click_track(path, bpm=120.0, duration=30.0, sample_rate=22050):
+    """拍ごとに短いクリック、小節頭（4拍ごと）だけ強いクリック"""
+    samples = np.zeros(int(duration * sample_rate))
+    click = np.sin(np.arange(400) * 0.6) * np.exp(-np.arange(400) / 80)
+    for beat, start in enumerate(np.arange(0, duration, 60.0 / bpm)):
+        index = int(start * sample_rate)
+        gain = 0.9 if beat % 4 == 0 else 0.4
+        samples[index:index + len(click)] += gain * click[:len(samples) - index]
+    with wave.open(str(path), "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(sample_rate)
+        f.writeframes((samples * 32767).astype("<i2").tobytes())
+
+
+@pytest.mark.parametrize("duration, scene_count, boundaries", [
+    (60.0, 3, [1.0, 50.0]),
+    (61.7, 7, np.arange(0.3, 61.7, 2.0)),
+    (10.0, 1, [5.0]),
+    (37.3, 5, []),
+])
+def test_snapped_durations_sum_to_audio_length(duration, scene_count, boundaries):
+    durations = snap_scene_durations(duration, scene_count, np.asarray(boundaries))
+    assert len(durations) == scene_count
+    assert sum(durations) == pytest.approx(duration, abs=1e-9)
+    assert min(durations) >= duration / scene_count * MIN_SCENE_FRACTION - 1e-9
+
+
+def test_far_boundaries_are_not_snapped():
+    # 均等分割の境界 20・40 の近くに小節頭がなければそのまま
+    assert snap_scene_durations(60.0, 3, np.array([1.0, 50.0])) == pytest.approx([20.0, 20.0, 20.0])
+
+
+def test_boundaries_snap_to_nearby_downbeats():
+    downbeats = np.arange(0.5, 60.0, 2.0)       # 0.5, 2.5, ... 小節 2 秒
+    durations = snap_scene_durations(60.0, 3, downbeats)
+    cuts = np.cumsum(durations)[:-1]
+    assert cuts == pytest.approx([20.5, 40.5])
+    assert sum(durations) == pytest.approx(60.0)
+
+
+def test_failed_scenes_are_absorbed_by_neighbours():
+    # シーン 0・2・5 が失敗: 先頭は 1 が、末尾は 4 が引き受け、2 の区間 20〜30 は小節頭 24.9 で分ける
+    durations = absorb_failed_scenes([10.0] * 6, [1, 3, 4], [17.0, 24.9, 33.0])
+    assert durations == pytest.approx([24.9, 15.1, 20.0])
+    assert sum(durations) == pytest.approx(60.0)
+
+
+def test_surviving_scenes_keep_their_original_span():
+    durations = absorb_failed_scenes([8.0, 12.0, 10.0, 10.0], [0, 2, 3])
+    edges = np.concatenate([[0.0], np.cumsum(durations)])
+    # シーン 0 は元の 0〜8、失敗したシーン 1（8〜20）は中央の 14 で分ける
+    assert edges.tolist() == pytest.approx([0.0, 14.0, 30.0, 40.0])
+    assert absorb_failed_scenes([10.0, 10.0], []) == []
+
+
+def test_click_track_tempo_and_scene_cuts(tmp_path):
+    wav_file = tmp_path / "clicks.wav"
+    write_click_track(wav_file)
+    analysis = analyze_beats(str(wav_file))
+    assert analysis["bpm"] == pytest.approx(120.0, rel=0.03)
+
+    durations = beat_scene_durations(str(wav_file), 4)
+    assert sum(durations) == pytest.approx(analysis["duration"], abs=1e-9)
+    # 小節は 2 秒なので、切り替えは検出した小節頭の上にある
+    cuts = np.cumsum(durations)[:-1]
+    downbeats = np.asarray(analysis["downbeats"])
+    assert all(np.min(np.abs(downbeats - cut)) < 1e-9 for cut in cuts)
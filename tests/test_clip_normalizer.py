@@ -0,0 +1,53 @@
+from fractions import Fraction
+
+from clip_normalizer import mismatch_reasons, target_spec
+
+
+def clip_info(**overrides):
+    """Runway のクリップを ffprobe した結果（probe_video の形式）"""
+    info = {
+        "codec": "h264", "profile": "High", "level": 40, "has_b_frames": 2, "extradata_hash": "sha256:aa",
+        "width": 1920, "height": 1080, "fps": Fraction(24), "pix_fmt": "yuv420p", "sar": "1:1",
+        "timescale": 12288, "duration": 6.0, "has_audio": False,
+    }
+    info.update(overrides)
+    return info
+
+
+def test_spec_follows_the_majority_of_matching_clips():
+    infos = [clip_info(), clip_info(), clip_info(timescale=90000, extradata_hash="sha256:bb"),
+             clip_info(width=1280, height=720, timescale=1000)]
+    spec = target_spec("full", infos)
+    assert (spec["width"], spec["height"], spec["fps"]) == (1920, 1080, 24)
+    assert spec["timescale"] == 12288
+    assert spec["stream_params"] == ("High", 40, 2, "sha256:aa")
+
+
+def test_matching_clips_pass_through():
+    spec = target_spec("full", [clip_info()])
+    assert mismatch_reasons(clip_info(), spec) == []
+    # Runway には切り上げた秒数で依頼するので、長いクリップは結合時の outpoint で切る
+    assert mismatch_reasons(clip_info(duration=6.0), spec, duration=5.3) == []
+    # 半フレーム未満の不足は誤差として扱う
+    assert mismatch_reasons(clip_info(duration=5.99), spec, duration=6.0) == []
+
+
+def test_mismatches_are_reported():
+    spec = target_spec("full", [clip_info()])
+    reasons = mismatch_reasons(clip_info(codec="hevc", width=1280, height=720, fps=Fraction(30000, 1001),
+                                         pix_fmt="yuv444p", sar="4:3"), spec)
+    assert reasons == ["codec hevc", "1280x720", "29.970fps", "yuv444p", "SAR 4:3"]
+    assert mismatch_reasons(clip_info(duration=4.0), spec, duration=5.3) == ["4.00秒 < 5.30秒"]
+
+
+def test_stream_parameters_matter_only_for_stream_copy():
+    spec = target_spec("full", [clip_info()])
+    other = clip_info(timescale=90000, extradata_hash="sha256:bb")
+    assert mismatch_reasons(other, spec, ignore_stream=True) == []
+    assert mismatch_reasons(other, spec) == ["timescale 90000", "H.264 パラメーター（High / level 40 / B 2）"]
+
+
+def test_proxy_mode_conforms_full_size_clips():
+    spec = target_spec("proxy", [clip_info()])
+    assert spec["stream_params"] is None
+    assert mismatch_reasons(clip_info(), spec)[:2] == ["1920x1080", "24.000fps"]
@@ -0,0 +1,21 @@
+import hashlib
+from pathlib import Path
+
+import content_hash
+from content_hash import file_content_hash, params_hash
+
+
+def test_file_hash_reads_in_chunks(tmp_path, monkeypatch):
+    monkeypatch.setattr(content_hash, "HASH_CHUNK_SIZE", 7)
+    data = bytes(range(256)) * 3
+    path = tmp_path / "audio.wav"
+    path.write_bytes(data)
+    assert file_content_hash(str(path)) == hashlib.sha256(data).hexdigest()
+
+
+def test_params_hash_ignores_key_order():
+    assert params_hash({"a": 1, "b": [1, 2]}) == params_hash({"b": [1, 2], "a": 1})
+    assert params_hash({"a": 1}) != params_hash({"a": 2})
+    assert params_hash({"scenes": [0, 2]}) != params_hash({"scenes": [0, 1]})
+    # JSON 非対応の値は文字列として扱う
+    assert params_hash({"output": Path("out")}) == params_hash({"output": "out"})
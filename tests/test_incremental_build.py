@@ -0,0 +1,100 @@
+import os
+
+import pytest
+
+from incremental_build import IncrementalBuild, _alignment_outputs
+
+
+@pytest.fixture
+def project(tmp_path):
+    source = tmp_path / "lyrics.txt"
+    source.write_text("line one\nline two\n", encoding="utf-8")
+    output = tmp_path / "out.srt"
+    runs = []
+
+    def build_stage(build, params=None):
+        def fn():
+            runs.append(params)
+            output.write_text(source.read_text(encoding="utf-8").upper(), encoding="utf-8")
+            return str(output)
+        return build.stage("align", fn, inputs=[str(source)], params=params or {"aligner": "simple"})
+
+    return {"record": str(tmp_path / ".amvc_build" / "build.json"), "source": source, "output": output,
+            "runs": runs, "build_stage": build_stage}
+
+
+def reasons_of(build):
+    return build.summary[-1]["reasons"]
+
+
+def test_first_build_runs_and_second_is_skipped(project):
+    build = IncrementalBuild(project["record"])
+    assert project["build_stage"](build) == str(project["output"])
+    assert reasons_of(build) == ["ビルド記録がありません"]
+
+    # ビルド記録はファイルに残るので、新しいプロセスでもスキップされ前回の戻り値が返る
+    build = IncrementalBuild(project["record"])
+    assert project["build_stage"](build) == str(project["output"])
+    assert build.summary[-1]["skipped"]
+    assert len(project["runs"]) == 1
+
+
+def test_rebuild_reasons(project):
+    project["build_stage"](IncrementalBuild(project["record"]))
+
+    build = IncrementalBuild(project["record"])
+    project["build_stage"](build, {"aligner": "whisper"})
+    assert reasons_of(build) == ["パラメータが変更されました: aligner"]
+
+    project["source"].write_text("line one\nline 2\n", encoding="utf-8")
+    project["build_stage"](build, {"aligner": "whisper"})
+    assert reasons_of(build) == [f"入力が変更されました: {project['source']}"]
+
+    os.remove(project["output"])
+    project["build_stage"](build, {"aligner": "whisper"})
+    assert reasons_of(build) == [f"出力がありません: {project['output']}"]
+
+    project["output"].write_text("edited by hand", encoding="utf-8")
+    project["build_stage"](build, {"aligner": "whisper"})
+    assert reasons_of(build) == [f"出力が変更されました: {project['output']}"]
+    assert len(project["runs"]) == 5
+
+
+def test_touching_an_input_without_changing_it_skips(project):
+    project["build_stage"](IncrementalBuild(project["record"]))
+    stat = os.stat(project["source"])
+    os.utime(project["source"], ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    build = IncrementalBuild(project["record"])
+    project["build_stage"](build)
+    assert build.summary[-1]["skipped"]
+
+
+def test_failed_stage_is_not_recorded(project):
+    build = IncrementalBuild(project["record"])
+    build.stage("align", lambda: (None, None), inputs=[str(project["source"])])
+    assert build.summary[-1]["failed"]
+    project["build_stage"](build)
+    assert reasons_of(build) == ["ビルド記録がありません"]
+
+
+def test_force_and_explain(project, capsys):
+    project["build_stage"](IncrementalBuild(project["record"]))
+    build = IncrementalBuild(project["record"], explain=True, force=True)
+    project["build_stage"](build)
+    assert reasons_of(build) == ["--force が指定されました"]
+    assert "--force が指定されました" in capsys.readouterr().out
+
+
+def test_alignment_sidecars_are_tracked(tmp_path):
+    wav_file = str(tmp_path / "song.wav")
+    paths = {name: tmp_path / name for name in ("song_whisper_subtitles.srt", "song_whisper_alignment.json",
+                                                 "song_whisper_alignment.aln", "song_waveform.peaks",
+                                                 "song_whisper_words.aln")}
+    for path in paths.values():
+        path.write_bytes(b"x")
+    result = (str(paths["song_whisper_subtitles.srt"]), str(paths["song_whisper_alignment.json"]))
+
+    outputs = _alignment_outputs(result, wav_file, str(tmp_path), "whisper")
+    assert sorted(outputs) == sorted(str(path) for path in paths.values())
+    assert str(paths["song_whisper_words.aln"]) not in _alignment_outputs(result, wav_file, str(tmp_path), "simple")
+    assert _alignment_outputs((None, None), wav_file, str(tmp_path), "whisper") == []
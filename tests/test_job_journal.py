@@ -0,0 +1,43 @@
+from job_journal import JobJournal
+
+
+def test_units_survive_a_restart(tmp_path):
+    path = str(tmp_path / "journal.sqlite")
+    clip = tmp_path / "scene_000.mp4"
+    clip.write_bytes(b"clip")
+
+    with JobJournal(path) as journal:
+        assert journal.begin_job("job1", "runway", {"prompts": ["a", "b"]}) is False
+        journal.record_task("job1", "scene:000", "task-0")
+        journal.record_task("job1", "scene:001", "task-1")
+        journal.complete("job1", "scene:000", str(clip), {"duration": 5.0})
+
+    # 中断後に同じジョブを開くと再開扱いになり、完了した単位と投入済みのタスクが残っている
+    with JobJournal(path) as journal:
+        assert journal.begin_job("job1", "runway", {"prompts": ["a", "b"]}) is True
+        assert journal.completed("job1", "scene:000") == {"artifact": str(clip), "result": {"duration": 5.0}}
+        assert journal.pending_task("job1", "scene:000") is None
+        assert journal.completed("job1", "scene:001") is None
+        assert journal.pending_task("job1", "scene:001") == "task-1"
+        journal.finish_job("job1")
+        assert [job["status"] for job in journal.jobs()] == ["done"]
+        assert [unit["unit"] for unit in journal.units("job1")] == ["scene:000", "scene:001"]
+
+
+def test_changed_or_missing_artifacts_are_redone(tmp_path):
+    clip = tmp_path / "scene_000.mp4"
+    clip.write_bytes(b"clip")
+    with JobJournal(str(tmp_path / "journal.sqlite")) as journal:
+        journal.begin_job("job1", "runway", {})
+        journal.complete("job1", "scene:000", str(clip))
+        journal.complete("job1", "combine", result=["a.mp4"])
+        assert journal.completed("job1", "combine") == {"artifact": None, "result": ["a.mp4"]}
+
+        clip.write_bytes(b"truncated")
+        assert journal.completed("job1", "scene:000") is None
+        clip.unlink()
+        assert journal.completed("job1", "scene:000") is None
+
+        # 再投入すると完了の記録は消える
+        journal.record_task("job1", "combine", "task-9")
+        assert journal.completed("job1", "combine") is None
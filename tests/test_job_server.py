@@ -0,0 +1,51 @@
+import pytest
+
+pytest.importorskip("aiohttp")
+
+import job_server  # noqa: E402
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def reporter(monkeypatch):
+    sent = []
+    clock = FakeClock()
+    monkeypatch.setattr(job_server, "_progress_queue", type("Queue", (), {"put": staticmethod(sent.append)}))
+    monkeypatch.setattr(job_server.time, "monotonic", clock)
+    return job_server._ProgressReporter("job1"), sent, clock
+
+
+def events(sent):
+    return [(message["stage"], message["event"]) for message in sent]
+
+
+def test_throttled_ok_is_flushed_when_the_stage_changes(reporter):
+    report, sent, clock = reporter
+    report("composite", "start", 0.0)
+    report("composite", "ok", 0.01)          # 間引かれて保留
+    assert events(sent) == [("composite", "start")]
+    report("encode", "start", 0.0)
+    assert events(sent) == [("composite", "start"), ("composite", "ok"), ("encode", "start")]
+
+
+def test_pending_event_is_sent_on_flush_and_errors_are_never_throttled(reporter):
+    report, sent, clock = reporter
+    report("encode", "start", 0.0)
+    report("encode", "error", 0.01)
+    report("encode", "ok", 0.02)
+    assert events(sent) == [("encode", "start"), ("encode", "error")]
+    report.flush()
+    assert events(sent)[-1] == ("encode", "ok")
+    report.flush()
+    assert len(sent) == 3
+
+    clock.now += job_server.PROGRESS_INTERVAL
+    report("encode", "ok", 1.0)
+    assert len(sent) == 4
@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+import longform_render
+from longform_render import MemoryCap, SOAK_GROWTH_TOLERANCE_MB, soak_test
+
+
+def box_rasterizer(text, style):
+    """TextClip の代わりに字幕の大きさの箱を返す"""
+    height = style["fontsize"] + 10
+    width = min(style["text_width"], len(text) * style["fontsize"] // 2)
+    rgb = np.full((height, width, 3), 255, np.uint8)
+    alpha = np.zeros((height, width), np.uint8)
+    alpha[5:-5, 5:-5] = 255
+    return rgb, alpha
+
+
+def test_soak_memory_stays_flat():
+    result = soak_test(minutes=2, render_mode="proxy", memory_cap_mb=2048, cues_per_minute=60,
+                       rasterize=box_rasterizer)
+    assert result["aborted"] is None
+    assert result["cues_rasterized"] == result["cues"]
+    assert result["growth_mb"] <= SOAK_GROWTH_TOLERANCE_MB
+    assert result["peak_rss_mb"] <= result["cap_mb"]
+    assert result["passed"]
+
+
+def test_memory_cap_aborts_after_sustained_overage(monkeypatch):
+    monkeypatch.setattr(longform_render, "current_rss_mb", lambda: 500.0)
+    guard = MemoryCap(100, None, fps=1, interval=1, strikes=3)
+    guard.check(0, 0.0)
+    guard.check(1, 1.0)
+    with pytest.raises(MemoryError):
+        guard.check(2, 2.0)
+    assert guard.exceeded == 3
+
+
+def test_memory_cap_resets_when_back_under(monkeypatch):
+    # 初期値、確認1回目（超過→GC 後も超過）、確認2回目（上限内）
+    readings = iter([50.0, 500.0, 500.0, 50.0])
+    monkeypatch.setattr(longform_render, "current_rss_mb", lambda: next(readings))
+    guard = MemoryCap(100, None, fps=1, interval=1, strikes=2)
+    guard.check(0, 0.0)
+    assert guard.consecutive == 1
+    guard.check(1, 1.0)
+    assert guard.consecutive == 0
+    assert guard.peak_mb == 500.0
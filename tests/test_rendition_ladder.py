@@ -0,0 +1,22 @@
+import pytest
+
+from rendition_ladder import build_ladder_filtergraph, generate_video_ladder, get_rendition
+
+
+def test_filtergraph_connects_every_rendition():
+    specs = [get_rendition(name) for name in ("1080p", "720p", "vertical")]
+    graph = build_ladder_filtergraph((1920, 1080), specs, [None] * len(specs))
+    assert graph.startswith("[0:v]split=3[src0][src1][src2]")
+    for i in range(len(specs)):
+        assert graph.count(f"[src{i}]") == 2
+        assert f"[v{i}]" in graph
+    assert "crop=606:1080" in graph
+
+
+def test_duplicate_renditions_are_rejected_up_front():
+    specs = [get_rendition(name) for name in ("720p", "720p")]
+    with pytest.raises(ValueError, match="Duplicate rendition: 720p"):
+        build_ladder_filtergraph((1920, 1080), specs, [None, None])
+    # 音声を読む前に弾く（存在しないファイルでも ValueError）
+    with pytest.raises(ValueError, match="Duplicate rendition: 720p"):
+        generate_video_ladder("missing.wav", None, renditions=("1080p", "720p", "720p"))
@@ -0,0 +1,96 @@
+import time
+
+import numpy as np
+import pytest
+
+import subtitle_timeline
+from subtitle_timeline import SubtitleTimeline
+
+# 10万キューの読み書きの目標（ミリ秒）
+LARGE_CUE_COUNT = 100_000
+LARGE_BUDGET_MS = 100
+
+
+def _timeline(count=3):
+    starts = np.arange(count) * 1.5
+    texts = ["first line\nsecond line", "歌詞 ♪", ""] + [f"line {i}" for i in range(3, count)]
+    return SubtitleTimeline(starts, starts + 1.0, texts[:count])
+
+
+def _assert_same(actual, expected, tolerance):
+    assert actual.texts == expected.texts
+    np.testing.assert_allclose(actual.starts, expected.starts, atol=tolerance)
+    np.testing.assert_allclose(actual.ends, expected.ends, atol=tolerance)
+
+
+@pytest.mark.parametrize("suffix, tolerance", [(".srt", 5e-4), (".vtt", 5e-4), (".ass", 5e-3)])
+def test_round_trip(tmp_path, suffix, tolerance):
+    timeline = _timeline(5)
+    path = str(tmp_path / f"subtitles{suffix}")
+    timeline.write(path)
+    _assert_same(SubtitleTimeline.read(path), timeline, tolerance)
+
+
+def test_array_reader_matches_line_reader(tmp_path):
+    path = tmp_path / "mixed.srt"
+    path.write_bytes("﻿1\r\n00:00:01,000 --> 00:00:02,000\r\nhello\r\nworld\r\n\r\n"
+                     "2\r\n00:00:03,000 --> 00:00:04,500\r\n歌詞\r\n".encode("utf-8"))
+    _assert_same(SubtitleTimeline.read(str(path)), SubtitleTimeline._read_lines(str(path)), 0)
+
+
+def test_small_read_chunks(tmp_path, monkeypatch):
+    timeline = _timeline(50)
+    path = str(tmp_path / "subtitles.srt")
+    timeline.write(path)
+    monkeypatch.setattr(subtitle_timeline, "READ_CHUNK_BYTES", 7)
+    _assert_same(SubtitleTimeline.read(path), timeline, 5e-4)
+
+
+def test_vtt_with_cue_settings_falls_back_to_line_reader(tmp_path):
+    path = tmp_path / "settings.vtt"
+    path.write_text("WEBVTT\n\nNOTE comment\n\n00:01.000 --> 00:02.000 align:start\nA\n\n"
+                    "00:00:03.000 --> 00:00:04.000\nB\n", encoding="utf-8")
+    timeline = SubtitleTimeline.read(str(path))
+    assert timeline.texts == ["A", "B"]
+    np.testing.assert_allclose(timeline.starts, [1.0, 3.0])
+
+
+def test_bulk_operations():
+    timeline = _timeline(3)
+    np.testing.assert_allclose(timeline.shift(0.5).starts, timeline.starts + 0.5)
+    np.testing.assert_allclose(timeline.scale(2.0).ends, timeline.ends * 2.0)
+    clamped = timeline.clamp(0.0, 2.0)
+    assert clamped.texts == timeline.texts[:2]
+    assert clamped.ends.max() == 2.0
+    np.testing.assert_allclose(timeline.fill_gaps().ends[:-1], timeline.starts[1:])
+
+
+def test_select_slices_and_gathers():
+    timeline = _timeline(6)
+    assert timeline[1:4].texts == timeline.texts[1:4]
+    assert timeline.select([5, 0]).texts == [timeline.text(5), timeline.text(0)]
+    assert timeline.select(timeline.starts > 3).texts == timeline.texts[3:]
+
+
+def _best_ms(fn, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+@pytest.mark.parametrize("suffix", [".srt", ".vtt"])
+def test_large_read_write_within_budget(tmp_path, suffix):
+    starts = np.arange(LARGE_CUE_COUNT) * 2.0
+    timeline = SubtitleTimeline(starts, starts + 1.5, [f"Line {i} of the song ♪" for i in range(LARGE_CUE_COUNT)])
+    path = str(tmp_path / f"large{suffix}")
+
+    write_ms = _best_ms(lambda: timeline.write(path))
+    read_ms = _best_ms(lambda: SubtitleTimeline.read(path))
+    assert len(SubtitleTimeline.read(path)) == LARGE_CUE_COUNT
+    assert write_ms < LARGE_BUDGET_MS, f"write took {write_ms:.0f} ms"
+    assert read_ms < LARGE_BUDGET_MS, f"read took {read_ms:.0f} ms"
+    # 小さな区間の抽出は全キュー数に比例しない
+    assert _best_ms(lambda: timeline.select(timeline.window(100.0, 200.0))) < 5
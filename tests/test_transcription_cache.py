@@ -0,0 +1,18 @@
+from transcription_cache import load_transcription, store_transcription, transcription_key
+
+
+def test_chunked_and_whole_file_results_use_different_keys(tmp_path):
+    wav_file = tmp_path / "song.wav"
+    wav_file.write_bytes(b"RIFF" + bytes(64))
+    options = {"word_timestamps": True}
+    whole = transcription_key(str(wav_file), "whisper:base", options)
+    chunked = transcription_key(str(wav_file), "whisper:base", options, {"chunk_seconds": 300, "sample_rate": 16000})
+    shorter = transcription_key(str(wav_file), "whisper:base", options, {"chunk_seconds": 60, "sample_rate": 16000})
+    assert len({whole, chunked, shorter}) == 3
+    assert whole == transcription_key(str(wav_file), "whisper:base", options, None)
+
+    cache_dir = str(tmp_path / "cache")
+    result = {"segments": [{"start": 0.0, "end": 1.5, "text": "hello"}], "text": "hello"}
+    store_transcription(chunked, result, cache_dir)
+    assert load_transcription(chunked, cache_dir) == result
+    assert load_transcription(whole, cache_dir) is None
@@ -0,0 +1,48 @@
+import wave
+
+import numpy as np
+
+from waveform_peaks import read_peak_levels, read_waveform_peaks, waveform_peaks_path, write_waveform_peaks
+
+
+def write_wav(path, samples, sample_rate=8000):
+    with wave.open(str(path), "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(sample_rate)
+        f.writeframes((samples * 32767).astype("<i2").tobytes())
+
+
+def test_peak_pyramid_levels_and_values(tmp_path):
+    # 前半は振幅 0.5、後半は無音（フレーム数はピーク幅の倍数でない）
+    frames = 8000 * 20 + 100
+    samples = np.zeros(frames)
+    half = frames // 2
+    samples[:half] = 0.5 * np.sin(np.arange(half) * 0.3)
+    wav_file = tmp_path / "song.wav"
+    write_wav(wav_file, samples)
+
+    peaks_file = waveform_peaks_path(str(wav_file), str(tmp_path))
+    assert peaks_file.endswith("song_waveform.peaks")
+    write_waveform_peaks(str(wav_file), peaks_file)
+
+    info = read_peak_levels(peaks_file)
+    assert info["frames"] == frames
+    assert abs(info["duration"] - frames / 8000) < 1e-9
+    counts = [level["count"] for level in info["levels"]]
+    assert counts[0] == -(-frames // 256)
+    for finer, coarser in zip(counts, counts[1:]):
+        assert coarser == -(-finer // 2)
+    assert counts[-1] >= 256 and counts[-1] // 2 < 256
+
+    finest = read_waveform_peaks(peaks_file, level=0)
+    assert finest["samples_per_peak"] == 256
+    assert len(finest["min"]) == counts[0]
+    assert np.all(finest["min"] <= finest["max"])
+    assert abs(finest["max"][: half // 256].max() - 0.5) < 0.02
+    assert np.all(finest["max"][half // 256 + 1:] == 0)
+
+    # 表示幅に合わせて min_peaks 以上の最も粗いレベルを選ぶ
+    coarse = read_waveform_peaks(peaks_file, min_peaks=300)
+    assert 300 <= len(coarse["max"]) < 600
+    assert abs(coarse["max"].max() - finest["max"].max()) < 1e-6
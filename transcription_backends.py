@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🗣️ 音声認識バックエンド
+Whisper アライメントで使う音声認識エンジンを切り替えるための共通インターフェース
+
+- whisper: 参照実装（PyTorch、CPU では fp32）- 既定
+- faster-whisper: CTranslate2 による CPU 向け int8 推論（GPU のないレンダリングサーバー向け）
+
+どちらも transcribe の戻り値は同じ形式です:
+    {"text": ..., "segments": [{"start", "end", "text", "words": [{"word", "start", "end", "probability"}]}]}
+
+既定のバックエンドは環境変数 AMVC_TRANSCRIPTION_BACKEND で変更できます。
+
+GitHub: https://github.com/yusuke10151985/amvc
+"""
+
+import os
+from typing import Dict, Optional
+
+TRANSCRIPTION_BACKEND_ENV = "AMVC_TRANSCRIPTION_BACKEND"
+DEFAULT_BACKEND = "whisper"
+DEFAULT_MODEL = "base"
+
+
+class WhisperBackend:
+    """openai-whisper（参照実装）"""
+
+    name = "whisper"
+
+    def __init__(self, model_name: str = DEFAULT_MODEL):
+        self.model_name = model_name
+        self._model = None
+
+    @property
+    def cache_name(self) -> str:
+        """音声認識キャッシュのキーに使う名前"""
+        return self.model_name
+
+    def load(self):
+        if self._model is None:
+            import whisper
+            self._model = whisper.load_model(self.model_name)
+        return self
+
+    def transcribe(self, audio, word_timestamps: bool = False, **options) -> Dict:
+        """audio: ファイルパス、または 16kHz モノラルの float32 配列"""
+        self.load()
+        return self._model.transcribe(audio, word_timestamps=word_timestamps, **options)
+
+
+class FasterWhisperBackend:
+    """faster-whisper（CTranslate2、CPU で int8 量子化推論）"""
+
+    name = "faster-whisper"
+
+    def __init__(self, model_name: str = DEFAULT_MODEL, compute_type: str = "int8", cpu_threads: int = 0):
+        self.model_name = model_name
+        self.compute_type = compute_type
+        self.cpu_threads = cpu_threads
+        self._model = None
+
+    @property
+    def cache_name(self) -> str:
+        return f"{self.name}:{self.model_name}:{self.compute_type}"
+
+    def load(self):
+        if self._model is None:
+            from faster_whisper import WhisperModel
+            self._model = WhisperModel(self.model_name, device="cpu", compute_type=self.compute_type,
+                                       cpu_threads=self.cpu_threads)
+        return self
+
+    def transcribe(self, audio, word_timestamps: bool = False, **options) -> Dict:
+        """audio: ファイルパス、または 16kHz モノラルの float32 配列"""
+        self.load()
+        segments, _ = self._model.transcribe(audio, word_timestamps=word_timestamps, **options)
+
+        # whisper と同じ辞書形式に変換（segments はジェネレーターなので、ここで認識が実行される）
+        converted = []
+        for segment in segments:
+            converted.append({
+                "id": len(converted),
+                "start": segment.start,
+                "end": segment.end,
+                "text": segment.text,
+                "avg_logprob": segment.avg_logprob,
+                "no_speech_prob": segment.no_speech_prob,
+                "words": [
+                    {"word": word.word, "start": word.start, "end": word.end, "probability": word.probability}
+                    for word in (segment.words or [])
+                ],
+            })
+        return {"text": "".join(segment["text"] for segment in converted), "segments": converted}
+
+
+TRANSCRIPTION_BACKENDS = {
+    WhisperBackend.name: WhisperBackend,
+    FasterWhisperBackend.name: FasterWhisperBackend,
+}
+
+# プロセス内で再利用するインスタンス（ジョブサーバーのワーカーではモデルが読み込まれたまま残る）
+_instances: Dict = {}
+
+
+def get_transcription_backend(name: Optional[str] = None, model_name: str = DEFAULT_MODEL):
+    """バックエンド名からインスタンスを取得（モデルは最初の transcribe / load で読み込み、以降は再利用）"""
+    name = name or os.environ.get(TRANSCRIPTION_BACKEND_ENV) or DEFAULT_BACKEND
+    if name not in TRANSCRIPTION_BACKENDS:
+        raise ValueError(f"Unknown transcription backend: {name} (choose from {', '.join(TRANSCRIPTION_BACKENDS)})")
+    key = (name, model_name)
+    if key not in _instances:
+        _instances[key] = TRANSCRIPTION_BACKENDS[name](model_name)
+    return _instances[key]
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+📝 Whisper 音声認識結果のキャッシュ
+音声の内容ハッシュ・モデル名・デコードオプションをキーに、transcribe の生の結果（セグメント・単語タイミング）を保存します。
+音声のハッシュ計算は transcription_key で1回だけ行い、load / store にはそのキーを渡します。
+歌詞だけを修正して再アライメントする場合は、モデルの読み込みも音声認識も行わず、歌詞との対応付けだけが再実行されます。
+
+- キャッシュ先: 引数 > 環境変数 AMVC_TRANSCRIPTION_CACHE > ~/.cache/amvc/transcriptions
+- 上限: 環境変数 AMVC_TRANSCRIPTION_CACHE_MB（既定 512MB）を超えると、最も長く使われていないものから削除
+
+GitHub: https://github.com/yusuke10151985/amvc
+"""
+
+import os
+import gzip
+import json
+import tempfile
+from typing import Dict, Optional
+
+from content_hash import file_content_hash, params_hash
+from pipeline_metrics import increment
+
+TRANSCRIPTION_CACHE_ENV = "AMVC_TRANSCRIPTION_CACHE"
+TRANSCRIPTION_CACHE_SIZE_ENV = "AMVC_TRANSCRIPTION_CACHE_MB"
+DEFAULT_TRANSCRIPTION_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "amvc", "transcriptions")
+DEFAULT_MAX_CACHE_MB = 512
+
+CACHE_SUFFIX = ".json.gz"
+
+
+def get_transcription_cache_dir(cache_dir: Optional[str] = None) -> str:
+    """キャッシュディレクトリ（引数 > 環境変数 > ~/.cache/amvc/transcriptions）"""
+    cache_dir = cache_dir or os.environ.get(TRANSCRIPTION_CACHE_ENV) or DEFAULT_TRANSCRIPTION_CACHE_DIR
+    os.makedirs(cache_dir, exist_ok=True)
+    return cache_dir
+
+
+def transcription_key(wav_file: str, model_name: str, options: Optional[Dict] = None,
+                      chunking: Optional[Dict] = None) -> str:
+    """
+    キャッシュキー（音声の内容ハッシュ + モデル名 + デコードオプション）
+
+    Args:
+        chunking: チャンクごとに認識した場合の分割条件（チャンク長・サンプルレート）。
+                  境界で結果が変わるので、音声全体の認識とは別のキーにする
+    """
+    key = {
+        "audio": file_content_hash(wav_file),
+        "model": model_name,
+        "options": options or {},
+    }
+    if chunking:
+        key["chunking"] = chunking
+    return params_hash(key)
+
+
+def load_transcription(key: str, cache_dir: Optional[str] = None) -> Optional[Dict]:
+    """キャッシュ済みの認識結果（なければ None）"""
+    cache_dir = get_transcription_cache_dir(cache_dir)
+    cached_file = os.path.join(cache_dir, key + CACHE_SUFFIX)
+
+    try:
+        with gzip.open(cached_file, 'rt', encoding='utf-8') as f:
+            result = json.load(f)
+    except (OSError, ValueError):
+        increment("amvc_transcription_cache_total", result="miss")
+        return None
+
+    # 最終使用時刻を更新（LRU 削除の順序に使用）
+    try:
+        os.utime(cached_file)
+    except OSError:
+        pass
+    increment("amvc_transcription_cache_total", result="hit")
+    print(f"♻️ キャッシュ済みの音声認識結果を再利用: {os.path.basename(cached_file)}")
+    return result
+
+
+def store_transcription(key: str, result: Dict, cache_dir: Optional[str] = None,
+                        max_size_mb: Optional[float] = None) -> str:
+    """認識結果を保存（一時ファイルに書いてからアトミックに配置）し、上限を超えた分を削除"""
+    cache_dir = get_transcription_cache_dir(cache_dir)
+    cached_file = os.path.join(cache_dir, key + CACHE_SUFFIX)
+
+    fd, staging = tempfile.mkstemp(prefix=".storing_", suffix=CACHE_SUFFIX, dir=cache_dir)
+    os.close(fd)
+    try:
+        with gzip.open(staging, 'wt', encoding='utf-8') as f:
+            # NumPy のスカラーなど JSON 非対応の値は float に変換
+            json.dump(result, f, ensure_ascii=False, default=float)
+        os.replace(staging, cached_file)
+    finally:
+        if os.path.exists(staging):
+            os.remove(staging)
+
+    evict_transcriptions(cache_dir, max_size_mb)
+    return cached_file
+
+
+def evict_transcriptions(cache_dir: Optional[str] = None, max_size_mb: Optional[float] = None) -> int:
+    """合計サイズが上限を超えている間、最終使用が古いものから削除（削除件数を返す）"""
+    cache_dir = get_transcription_cache_dir(cache_dir)
+    if max_size_mb is None:
+        max_size_mb = float(os.environ.get(TRANSCRIPTION_CACHE_SIZE_ENV, DEFAULT_MAX_CACHE_MB))
+    limit = max_size_mb * 1024 * 1024
+
+    entries = []
+    for name in os.listdir(cache_dir):
+        if not name.endswith(CACHE_SUFFIX) or name.startswith("."):
+            continue
+        path = os.path.join(cache_dir, name)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, path))
+
+    total = sum(size for _, size, _ in entries)
+    removed = 0
+    for _, size, path in sorted(entries):
+        if total <= limit:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        total -= size
+        removed += 1
+
+    if removed:
+        increment("amvc_transcription_cache_evictions_total", removed)
+        print(f"🧹 音声認識キャッシュを {removed} 件削除しました")
+    return removed
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🌊 波形ピークピラミッド（.peaks）
+オーディオプレイヤーの波形表示用に、複数のズームレベルの min/max ピークを事前計算して保存します。
+ブラウザで音声全体をデコードする代わりに、表示幅に必要なレベルだけを読み込めます。
+
+ファイル構成（リトルエンディアン）:
+    ヘッダー     magic "AMVCPKS1", version, レベル数, sample_rate, channels, frames(uint64), duration(float64)
+    レベル表     レベルごとに (samples_per_peak uint32, count uint32, offset uint64)
+    データ       レベルごとに int8[count][2]（min, max を -127〜127 に量子化、全チャンネル共通）
+
+レベル 0 が最も細かく（BASE_SAMPLES_PER_PEAK サンプルごと）、以降は 1 つ前のレベルの隣り合う 2 ピークをまとめます。
+WAV はメモリマップしてチャンク単位で1回だけ読みます。
+
+    python waveform_peaks.py song.wav                 # → song_waveform.peaks
+    python waveform_peaks.py song_waveform.peaks      # レベル一覧を表示
+
+GitHub: https://github.com/yusuke10151985/amvc
+"""
+
+import os
+import struct
+import numpy as np
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from beat_analysis import WavMemmap
+from pipeline_metrics import stage_timer
+
+MAGIC = b"AMVCPKS1"
+VERSION = 1
+PEAKS_EXTENSION = ".peaks"
+
+BASE_SAMPLES_PER_PEAK = 256
+MIN_LEVEL_PEAKS = 256         # これより少なくなるレベルは作らない
+CHUNK_PEAKS = 4096            # 1回に読むピーク数（チャンク = CHUNK_PEAKS * BASE_SAMPLES_PER_PEAK フレーム）
+
+_HEADER = struct.Struct("<8sIIIIQd")
+_LEVEL = struct.Struct("<IIQ")
+
+
+def _base_peaks(wav: WavMemmap, samples_per_peak: int) -> np.ndarray:
+    """最も細かいレベルの (min, max) を float32[count][2] で計算"""
+    count = -(-wav.frames // samples_per_peak)
+    peaks = np.empty((count, 2), dtype=np.float32)
+    chunk_frames = CHUNK_PEAKS * samples_per_peak
+
+    for start in range(0, wav.frames, chunk_frames):
+        samples = wav.samples(start, min(wav.frames, start + chunk_frames))
+        first = start // samples_per_peak
+        whole = len(samples) // samples_per_peak
+        if whole:
+            # (ピーク, サンプル × チャンネル) に並べ替えて全チャンネルの min/max を一度に取る
+            blocks = samples[:whole * samples_per_peak].reshape(whole, -1)
+            peaks[first:first + whole, 0] = blocks.min(axis=1)
+            peaks[first:first + whole, 1] = blocks.max(axis=1)
+        if len(samples) > whole * samples_per_peak:
+            tail = samples[whole * samples_per_peak:]
+            peaks[first + whole] = (tail.min(), tail.max())
+    return peaks
+
+
+def _reduce(peaks: np.ndarray) -> np.ndarray:
+    """隣り合う 2 ピークをまとめて 1 つ粗いレベルを作成"""
+    if len(peaks) % 2:
+        peaks = np.concatenate([peaks, peaks[-1:]])
+    pairs = peaks.reshape(-1, 2, 2)
+    return np.stack([pairs[:, :, 0].min(axis=1), pairs[:, :, 1].max(axis=1)], axis=1)
+
+
+def _quantize(peaks: np.ndarray) -> np.ndarray:
+    return np.clip(np.round(peaks * 127), -127, 127).astype(np.int8)
+
+
+def waveform_peaks_path(wav_file: str, output_dir: str) -> str:
+    """アライメント出力と並べて置く波形ファイルのパス"""
+    return os.path.join(output_dir, f"{Path(wav_file).stem}_waveform{PEAKS_EXTENSION}")
+
+
+def write_waveform_peaks(wav_file: str, output_file: str,
+                         samples_per_peak: int = BASE_SAMPLES_PER_PEAK,
+                         min_level_peaks: int = MIN_LEVEL_PEAKS) -> str:
+    """WAV から波形ピークピラミッドを作成（一時ファイルに書いてからアトミックに配置）"""
+    with stage_timer("waveform_peaks"):
+        wav = WavMemmap(wav_file)
+        levels = [_base_peaks(wav, samples_per_peak)]
+        while len(levels[-1]) > 1 and len(levels[-1]) // 2 >= min_level_peaks:
+            levels.append(_reduce(levels[-1]))
+
+        table = []
+        position = _HEADER.size + _LEVEL.size * len(levels)
+        for index, peaks in enumerate(levels):
+            table.append(_LEVEL.pack(samples_per_peak << index, len(peaks), position))
+            position += len(peaks) * 2        # int8 の (min, max)
+
+        staging = f"{output_file}.tmp"
+        with open(staging, 'wb') as f:
+            f.write(_HEADER.pack(MAGIC, VERSION, len(levels), wav.sample_rate, wav.channels,
+                                 wav.frames, wav.duration))
+            f.write(b"".join(table))
+            for peaks in levels:
+                f.write(_quantize(peaks).tobytes())
+        os.replace(staging, output_file)
+    return output_file
+
+
+def read_peak_levels(path: str) -> Dict:
+    """ヘッダーとレベル表だけを読み込み"""
+    with open(path, 'rb') as f:
+        magic, version, level_count, sample_rate, channels, frames, duration = _HEADER.unpack(f.read(_HEADER.size))
+        if magic != MAGIC:
+            raise ValueError(f"Not a waveform peaks file: {path}")
+        if version > VERSION:
+            raise ValueError(f"Unsupported waveform peaks version: {version}")
+        levels = [
+            dict(zip(("samples_per_peak", "count", "offset"), _LEVEL.unpack(f.read(_LEVEL.size))))
+            for _ in range(level_count)
+        ]
+    return {"sample_rate": sample_rate, "channels": channels, "frames": frames, "duration": duration,
+            "levels": levels}
+
+
+def choose_level(levels: List[Dict], min_peaks: int) -> int:
+    """min_peaks 以上のピークを持つ最も粗いレベル（なければ最も細かいレベル）"""
+    candidates = [index for index, level in enumerate(levels) if level["count"] >= min_peaks]
+    return candidates[-1] if candidates else 0
+
+
+def read_waveform_peaks(path: str, min_peaks: int = 1000, level: Optional[int] = None) -> Dict:
+    """
+    表示幅に合ったレベルだけを読み込み
+
+    Returns:
+        {"duration", "samples_per_peak", "min": float32[count], "max": float32[count]}（値は -1〜1）
+    """
+    info = read_peak_levels(path)
+    index = choose_level(info["levels"], min_peaks) if level is None else level
+    selected = info["levels"][index]
+    with open(path, 'rb') as f:
+        f.seek(selected["offset"])
+        peaks = np.fromfile(f, dtype=np.int8, count=selected["count"] * 2).reshape(-1, 2) / np.float32(127)
+    return {"duration": info["duration"], "samples_per_peak": selected["samples_per_peak"],
+            "min": peaks[:, 0].astype(np.float32), "max": peaks[:, 1].astype(np.float32)}
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="波形ピークピラミッドの作成・確認")
+    parser.add_argument("input_file", help="WAV（作成）または .peaks（確認）")
+    parser.add_argument("--output", help="出力先（省略時は WAV と同じ場所に *_waveform.peaks）")
+    args = parser.parse_args()
+
+    if args.input_file.endswith(PEAKS_EXTENSION):
+        info = read_peak_levels(args.input_file)
+        print(f"🌊 {info['duration']:.2f}秒 / {info['sample_rate']}Hz / {info['channels']}ch")
+        for index, level in enumerate(info["levels"]):
+            print(f"   レベル {index}: {level['samples_per_peak']} サンプル/ピーク × {level['count']}")
+    else:
+        output = args.output or waveform_peaks_path(args.input_file, os.path.dirname(args.input_file) or ".")
+        write_waveform_peaks(args.input_file, output)
+        print(f"💾 波形ピーク: {output} ({os.path.getsize(output) / 1024:.1f}KB)")